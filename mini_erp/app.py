@@ -1,5 +1,6 @@
 from app import create_app, db
 from app.models import *
+from app.services.search_service import ProductSearchService
 
 app = create_app()
 
@@ -7,7 +8,9 @@ app = create_app()
 def make_shell_context():
     return {'db': db, 'app': app}
 
+# Development server only; production runs gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        ProductSearchService().ensure_index()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -4,8 +4,10 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import Config
+from app.utils.json_provider import FastJSONProvider
+from app.utils.database import engine_options, configure_sqlite, ReadRouter, RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
@@ -14,9 +16,16 @@ def create_app(config_class=Config):
                 template_folder='../frontend/templates',
                 static_folder='../frontend/static')
     app.config.from_object(config_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        configure_sqlite(db.engine, app.config)
+        app.extensions['read_router'] = ReadRouter(app, db.engine)
+        from app.services.audit_log import init_audit
+        init_audit(app, db.engine)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app, 
@@ -26,7 +35,7 @@ def create_app(config_class=Config):
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     
     # Register blueprints
-    from app.routes import main_bp, auth_bp, products_bp, warehouses_bp, stock_bp, orders_bp, reports_bp, suppliers_bp, customers_bp
+    from app.routes import main_bp, auth_bp, products_bp, warehouses_bp, stock_bp, orders_bp, reports_bp, suppliers_bp, customers_bp, replenishment_bp, jobs_bp, scheduler_bp, audit_bp
     from app.routes.ai_dashboard import ai_dashboard_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -37,6 +46,10 @@ def create_app(config_class=Config):
     app.register_blueprint(reports_bp, url_prefix='/api/reports')
     app.register_blueprint(suppliers_bp, url_prefix='/api/suppliers')
     app.register_blueprint(customers_bp, url_prefix='/api/customers')
+    app.register_blueprint(replenishment_bp, url_prefix='/api/replenishment')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(scheduler_bp, url_prefix='/api/scheduler')
+    app.register_blueprint(audit_bp, url_prefix='/api/audit')
     app.register_blueprint(ai_dashboard_bp)
     
     return app
@@ -9,11 +9,21 @@ from .purchase_order import PurchaseOrder, PurchaseOrderLine
 from .sales_order import SalesOrder, SalesOrderLine
 from .reorder_rule import ReorderRule
 from .audit_log import AuditLog
+from .stock_level_event import StockLevelEvent
+from .stock_reservation import StockReservation
+from .stock_archive import StockMovementArchive, OpeningBalance
+from .product_classification import ProductClassification
+from .inventory_valuation import CostLayer, InventoryValuation
+from .job import Job
+from .scheduled_task import ScheduledTask, TaskRun, SchedulerLease
 from .user import User
 
 __all__ = [
     'BaseModel', 'Product', 'Warehouse', 'StockMovement', 'InventoryBalance',
     'Supplier', 'Customer', 'PurchaseOrder', 'PurchaseOrderLine',
-    'SalesOrder', 'SalesOrderLine', 'ReorderRule', 'AuditLog', 'User'
+    'SalesOrder', 'SalesOrderLine', 'ReorderRule', 'AuditLog', 'User',
+    'StockLevelEvent', 'StockReservation', 'Job', 'ScheduledTask', 'TaskRun',
+    'SchedulerLease', 'StockMovementArchive', 'OpeningBalance', 'ProductClassification',
+    'CostLayer', 'InventoryValuation'
 ]
 
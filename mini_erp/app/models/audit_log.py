@@ -10,6 +10,12 @@ class AuditLog(BaseModel):
     diff_json = db.Column(db.Text, nullable=True)  # JSON diff of changes
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     
+    # Monthly partitions (app/services/audit_storage.py) carry the same indexes
+    __table_args__ = (
+        db.Index('ix_audit_logs_entity', 'entity', 'entity_id', 'created_at'),
+        db.Index('ix_audit_logs_user', 'user_id', 'created_at'),
+    )
+    
     # Relationships
     user = db.relationship('User', backref='audit_logs')
 
@@ -11,6 +11,11 @@ class Customer(BaseModel):
     email = db.Column(db.String(100), nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_customers_updated_at', 'updated_at'),
+        db.Index('ix_customers_name_id', 'name', 'id'),
+    )
+    
     # Relationships
     sales_orders = db.relationship('SalesOrder', backref='customer', lazy='dynamic')
 
@@ -1,4 +1,6 @@
 from app.models.base import BaseModel
+from app.models.product import Product
+from app.models.stock_level_event import StockLevel, StockLevelEvent
 from app import db
 
 class InventoryBalance(BaseModel):
@@ -9,20 +11,59 @@ class InventoryBalance(BaseModel):
     on_hand_qty = db.Column(db.Integer, default=0, nullable=False)
     reserved_qty = db.Column(db.Integer, default=0, nullable=False)
     available_qty = db.Column(db.Integer, default=0, nullable=False)
+    stock_level = db.Column(db.Enum(StockLevel), default=StockLevel.NORMAL, nullable=False)
     
     # Unique constraint on product_id + warehouse_id
-    __table_args__ = (db.UniqueConstraint('product_id', 'warehouse_id', name='_product_warehouse_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'warehouse_id', name='_product_warehouse_uc'),
+        db.Index('ix_inventory_balances_stock_level', 'stock_level', 'warehouse_id'),
+    )
     
     @property
     def available_qty_calculated(self):
         """Calculate available quantity (on_hand - reserved)"""
         return max(0, self.on_hand_qty - self.reserved_qty)
     
+    @property
+    def is_low_stock(self):
+        return self.stock_level in (StockLevel.LOW, StockLevel.CRITICAL)
+    
+    @staticmethod
+    def classify_stock_level(available_qty, reorder_point, safety_stock):
+        """Stock level for an available quantity against the product thresholds"""
+        if available_qty < safety_stock:
+            return StockLevel.CRITICAL
+        if available_qty <= reorder_point:
+            return StockLevel.LOW
+        return StockLevel.NORMAL
+    
     def update_available_qty(self):
         """Update available quantity based on on_hand and reserved"""
         self.available_qty = self.available_qty_calculated
-
-
-
-
-
+        self.update_stock_level()
+    
+    def update_stock_level(self, product=None):
+        """Re-evaluate the stock level and record an event when a threshold is crossed"""
+        product = product or self.product or db.session.get(Product, self.product_id)
+        new_level = self.classify_stock_level(
+            self.available_qty, product.reorder_point, product.safety_stock
+        )
+        
+        # New balances start from NORMAL, so a first receipt below the reorder point is reported
+        previous_level = self.stock_level or StockLevel.NORMAL
+        if new_level == previous_level:
+            self.stock_level = new_level
+            return None
+        
+        self.stock_level = new_level
+        event = StockLevelEvent(
+            product_id=self.product_id,
+            warehouse_id=self.warehouse_id,
+            previous_level=previous_level,
+            new_level=new_level,
+            available_qty=self.available_qty,
+            reorder_point=product.reorder_point,
+            safety_stock=product.safety_stock
+        )
+        db.session.add(event)
+        return event
@@ -0,0 +1,42 @@
+from app.models.base import BaseModel
+from app import db
+
+VALUATION_METHODS = ('average', 'fifo')
+
+class CostLayer(BaseModel):
+    """Quantity of a product received into a warehouse at one unit cost; consumed oldest first"""
+    __tablename__ = 'cost_layers'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False)  # FIFO order; transfers keep the original date
+    quantity = db.Column(db.Integer, nullable=False)
+    remaining_qty = db.Column(db.Integer, nullable=False)
+    unit_cost = db.Column(db.Numeric(14, 4), nullable=False)
+    ref_document_no = db.Column(db.String(100), nullable=True)
+    ref_line_id = db.Column(db.Integer, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_cost_layers_open', 'product_id', 'warehouse_id', 'remaining_qty', 'received_at'),
+    )
+
+class InventoryValuation(BaseModel):
+    """Running quantity and value of a product in a warehouse under both valuation methods"""
+    __tablename__ = 'inventory_valuations'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    average_cost = db.Column(db.Numeric(14, 4), nullable=False, default=0)
+    average_value = db.Column(db.Numeric(16, 4), nullable=False, default=0)
+    fifo_value = db.Column(db.Numeric(16, 4), nullable=False, default=0)  # sum of open cost layers
+    last_movement_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'warehouse_id', name='_valuation_product_warehouse_uc'),
+        db.Index('ix_inventory_valuations_warehouse', 'warehouse_id'),
+    )
+    
+    # Relationships
+    product = db.relationship('Product')
+    warehouse = db.relationship('Warehouse')
@@ -0,0 +1,38 @@
+from app.models.base import BaseModel
+from app import db
+from enum import Enum
+
+class JobStatus(Enum):
+    QUEUED = 'Queued'
+    RUNNING = 'Running'
+    SUCCEEDED = 'Succeeded'
+    FAILED = 'Failed'
+    CANCELLED = 'Cancelled'
+
+FINISHED_JOB_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+class Job(BaseModel):
+    """Background job stored in the database queue and run by worker.py"""
+    __tablename__ = 'jobs'
+    
+    task = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    priority = db.Column(db.Integer, default=0, nullable=False)
+    params_json = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Integer, default=0, nullable=False)  # 0-100
+    progress_message = db.Column(db.String(200), nullable=True)
+    result_json = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    worker_id = db.Column(db.String(100), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)  # result is purged after this time
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_jobs_status_priority', 'status', 'priority', 'id'),
+        db.Index('ix_jobs_expires_at', 'expires_at'),
+    )
@@ -13,6 +13,8 @@ class Product(BaseModel):
     safety_stock = db.Column(db.Integer, default=0, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     
+    __table_args__ = (db.Index('ix_products_updated_at', 'updated_at'),)
+    
     # Relationships
     stock_movements = db.relationship('StockMovement', backref='product', lazy='dynamic')
     inventory_balances = db.relationship('InventoryBalance', backref='product', lazy='dynamic')
@@ -0,0 +1,26 @@
+from app.models.base import BaseModel
+from app import db
+
+ABC_CLASSES = ('A', 'B', 'C')  # share of consumption value: top ~80%, next ~15%, rest
+XYZ_CLASSES = ('X', 'Y', 'Z')  # demand variability: steady, fluctuating, erratic / no demand
+
+class ProductClassification(BaseModel):
+    """ABC (consumption value) and XYZ (demand variability) class of a product; rebuilt in batch"""
+    __tablename__ = 'product_classifications'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), unique=True, nullable=False)
+    abc_class = db.Column(db.String(1), nullable=False)
+    xyz_class = db.Column(db.String(1), nullable=False)
+    issued_qty = db.Column(db.Integer, nullable=False, default=0)
+    consumption_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    value_share = db.Column(db.Float, nullable=False, default=0)  # of total consumption value
+    cumulative_share = db.Column(db.Float, nullable=False, default=0)  # Pareto position
+    demand_cv = db.Column(db.Float, nullable=True)  # coefficient of variation of periodic demand
+    periods = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_product_classifications_classes', 'abc_class', 'xyz_class'),
+    )
+    
+    # Relationships
+    product = db.relationship('Product', backref=db.backref('classification', uselist=False))
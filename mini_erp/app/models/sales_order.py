@@ -17,6 +17,10 @@ class SalesOrder(BaseModel):
     order_date = db.Column(db.Date, nullable=False)
     expected_ship_date = db.Column(db.Date, nullable=True)
     note = db.Column(db.Text, nullable=True)
+    # Line aggregates, kept up to date by app/services/order_totals.py
+    total_qty = db.Column(db.Integer, default=0, nullable=False)
+    total_value = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    line_count = db.Column(db.Integer, default=0, nullable=False)
     
     # Relationships
     lines = db.relationship('SalesOrderLine', backref='sales_order', lazy='dynamic', cascade='all, delete-orphan')
@@ -0,0 +1,48 @@
+from app.models.base import BaseModel
+from app import db
+
+class ScheduledTask(BaseModel):
+    """Recurring job: ``task`` is enqueued whenever ``cron`` matches (UTC)"""
+    __tablename__ = 'scheduled_tasks'
+    
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    task = db.Column(db.String(100), nullable=False)  # job task name
+    cron = db.Column(db.String(100), nullable=False)
+    params_json = db.Column(db.Text, nullable=True)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    next_run_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_scheduled_tasks_next_run_at', 'is_active', 'next_run_at'),
+    )
+
+class TaskRun(BaseModel):
+    """Run history of a scheduled task; timings are copied from its job when it finishes"""
+    __tablename__ = 'task_runs'
+    
+    scheduled_task_id = db.Column(db.Integer, db.ForeignKey('scheduled_tasks.id'), nullable=False)
+    job_id = db.Column(db.Integer, nullable=True)
+    trigger = db.Column(db.String(20), default='schedule', nullable=False)  # schedule, manual
+    scheduled_for = db.Column(db.DateTime, nullable=True)
+    status = db.Column(db.String(20), default='Queued', nullable=False)  # JobStatus values, or Skipped
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_seconds = db.Column(db.Float, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_task_runs_task_id', 'scheduled_task_id', 'id'),
+        db.Index('ix_task_runs_job_id', 'job_id'),
+    )
+    
+    # Relationships
+    scheduled_task = db.relationship('ScheduledTask', backref=db.backref('runs', lazy='dynamic'))
+
+class SchedulerLease(BaseModel):
+    """Single-runner lease: only the holder of an unexpired lease runs the scheduler"""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,47 @@
+from app.models.base import BaseModel
+from app import db
+from app.models.stock_movement import MovementDirection, MovementType
+
+class StockMovementArchive(BaseModel):
+    """Stock movement moved out of stock_movements by archival; keeps its original id and timestamps"""
+    __tablename__ = 'stock_movements_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    direction = db.Column(db.Enum(MovementDirection), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    movement_type = db.Column(db.Enum(MovementType), nullable=False)
+    ref_document_no = db.Column(db.String(100), nullable=True)
+    ref_line_id = db.Column(db.Integer, nullable=True)
+    note = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_stock_movements_archive_product', 'product_id', 'warehouse_id', 'created_at'),
+        db.Index('ix_stock_movements_archive_created_at', 'created_at'),
+    )
+    
+    # Relationships (same names as StockMovement so both serialize alike)
+    product = db.relationship('Product')
+    warehouse = db.relationship('Warehouse')
+    user = db.relationship('User')
+
+class OpeningBalance(BaseModel):
+    """On-hand quantity of a product in a warehouse from every movement before ``as_of``.
+
+    Each archival run writes a full set carried forward from the previous one,
+    so the latest ``as_of`` at or before a date is the only set needed.
+    """
+    __tablename__ = 'stock_opening_balances'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    as_of = db.Column(db.DateTime, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    movement_count = db.Column(db.Integer, nullable=False, default=0)  # movements archived into this set
+    
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'warehouse_id', 'as_of', name='_opening_balance_uc'),
+        db.Index('ix_stock_opening_balances_as_of', 'as_of'),
+    )
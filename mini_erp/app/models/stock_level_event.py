@@ -0,0 +1,31 @@
+from app.models.base import BaseModel
+from app import db
+from enum import Enum
+
+class StockLevel(Enum):
+    NORMAL = 'Normal'
+    LOW = 'Low'  # available_qty <= reorder_point
+    CRITICAL = 'Critical'  # available_qty < safety_stock
+
+LOW_STOCK_LEVELS = (StockLevel.LOW, StockLevel.CRITICAL)
+
+class StockLevelEvent(BaseModel):
+    """Records a balance crossing its product's reorder point or safety stock"""
+    __tablename__ = 'stock_level_events'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    previous_level = db.Column(db.Enum(StockLevel), nullable=True)
+    new_level = db.Column(db.Enum(StockLevel), nullable=False)
+    available_qty = db.Column(db.Integer, nullable=False)
+    reorder_point = db.Column(db.Integer, nullable=False)
+    safety_stock = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_stock_level_events_created_at', 'created_at'),
+        db.Index('ix_stock_level_events_product_warehouse', 'product_id', 'warehouse_id'),
+    )
+    
+    # Relationships
+    product = db.relationship('Product')
+    warehouse = db.relationship('Warehouse')
@@ -0,0 +1,25 @@
+from app.models.base import BaseModel
+from app import db
+from enum import Enum
+
+class ReservationEntryType(Enum):
+    RESERVE = 'Reserve'  # stock promised to an approved sales order line
+    CONSUME = 'Consume'  # reserved stock shipped
+
+class StockReservation(BaseModel):
+    """Reservation ledger entry; a line's open reservation per warehouse is the sum of qty"""
+    __tablename__ = 'stock_reservations'
+    
+    sales_order_id = db.Column(db.Integer, db.ForeignKey('sales_orders.id'), nullable=False)
+    sales_order_line_id = db.Column(db.Integer, db.ForeignKey('sales_order_lines.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey('warehouses.id'), nullable=False)
+    entry_type = db.Column(db.Enum(ReservationEntryType), nullable=False)
+    qty = db.Column(db.Integer, nullable=False)  # positive for RESERVE, negative for CONSUME
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_stock_reservations_line_warehouse', 'sales_order_line_id', 'warehouse_id'),
+        db.Index('ix_stock_reservations_product_warehouse', 'product_id', 'warehouse_id'),
+        db.Index('ix_stock_reservations_order', 'sales_order_id'),
+    )
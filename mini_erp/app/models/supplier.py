@@ -11,6 +11,11 @@ class Supplier(BaseModel):
     email = db.Column(db.String(100), nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_suppliers_updated_at', 'updated_at'),
+        db.Index('ix_suppliers_name_id', 'name', 'id'),
+    )
+    
     # Relationships
     purchase_orders = db.relationship('PurchaseOrder', backref='supplier', lazy='dynamic')
     reorder_rules = db.relationship('ReorderRule', backref='supplier', lazy='dynamic')
@@ -9,6 +9,11 @@ class Warehouse(BaseModel):
     address = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_warehouses_updated_at', 'updated_at'),
+        db.Index('ix_warehouses_name_id', 'name', 'id'),
+    )
+    
     # Relationships
     stock_movements = db.relationship('StockMovement', backref='warehouse', lazy='dynamic')
     inventory_balances = db.relationship('InventoryBalance', backref='warehouse', lazy='dynamic')
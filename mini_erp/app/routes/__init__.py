@@ -6,4 +6,8 @@ from .stock import stock_bp
 from .orders import orders_bp
 from .reports import reports_bp
 from .suppliers import suppliers_bp
-from .customers import customers_bp
\ No newline at end of file
+from .customers import customers_bp
+from .replenishment import replenishment_bp
+from .jobs import jobs_bp
+from .scheduler import scheduler_bp
+from .audit import audit_bp
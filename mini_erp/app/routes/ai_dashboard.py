@@ -5,10 +5,17 @@ Handles AI-powered analytics and predictions
 
 from flask import Blueprint, render_template, jsonify, request, session
 from app.services.ml_service import MLService
+from app.services.job_queue import latest_result
 from app.models import User
 
 ai_dashboard_bp = Blueprint('ai_dashboard', __name__)
 
+def precomputed(task_name):
+    """Latest scheduled result for a task unless the caller asks for ?refresh=1"""
+    if request.args.get('refresh') in ('1', 'true'):
+        return None
+    return latest_result(task_name)
+
 @ai_dashboard_bp.route('/ai-dashboard')
 def ai_dashboard():
     """AI Dashboard main page"""
@@ -18,8 +25,10 @@ def ai_dashboard():
 def get_ai_summary():
     """Get AI dashboard summary data"""
     try:
-        ml_service = MLService()
-        summary = ml_service.get_ai_dashboard_summary()
+        summary = precomputed('ai_summary')
+        if summary is None:
+            ml_service = MLService()
+            summary = ml_service.get_ai_dashboard_summary()
         return jsonify({
             'success': True,
             'data': summary
@@ -34,8 +43,10 @@ def get_ai_summary():
 def predict_weekly_orders():
     """Predict orders for next week"""
     try:
-        ml_service = MLService()
-        result = ml_service.predict_weekly_orders()
+        result = precomputed('predict_weekly_orders')
+        if result is None:
+            ml_service = MLService()
+            result = ml_service.predict_weekly_orders()
         return jsonify(result)
     except Exception as e:
         return jsonify({
@@ -47,8 +58,10 @@ def predict_weekly_orders():
 def customer_segmentation():
     """Perform customer segmentation"""
     try:
-        ml_service = MLService()
-        result = ml_service.perform_customer_segmentation()
+        result = precomputed('customer_segmentation')
+        if result is None:
+            ml_service = MLService()
+            result = ml_service.perform_customer_segmentation()
         return jsonify(result)
     except Exception as e:
         return jsonify({
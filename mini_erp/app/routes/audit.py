@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import date
+from app.services.audit_log import get_audit_storage
+from app.utils.auth import admin_required
+from app.utils.pagination import get_per_page, parse_bool_arg
+
+audit_bp = Blueprint('audit', __name__)
+
+def parse_date_arg(name):
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
+
+@audit_bp.route('', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_audit_logs():
+    """Audit entries newest first; start/end (YYYY-MM-DD) limit the partitions read"""
+    try:
+        start, end = parse_date_arg('start'), parse_date_arg('end')
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    try:
+        include_archived = bool(parse_bool_arg('include_archived'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if start and end and start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+
+    entries = get_audit_storage().query(
+        entity=request.args.get('entity'),
+        entity_id=request.args.get('entity_id', type=int),
+        user_id=request.args.get('user_id', type=int),
+        action=request.args.get('action'),
+        start=start,
+        end=end,
+        limit=get_per_page(),
+        include_archived=include_archived
+    )
+    return jsonify({'audit_logs': entries})
+
+@audit_bp.route('/partitions', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_partitions():
+    """Monthly partitions in the database and months already archived to files"""
+    storage = get_audit_storage()
+    return jsonify({
+        'mode': storage.mode(),
+        'partitions': storage.partitions(),
+        'archived': storage.archives()
+    })
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app import db
 from app.models import Customer
+from app.utils.caching import conditional_get
+from app.utils.pagination import list_by_name
 from marshmallow import Schema, fields, ValidationError
 
 customers_bp = Blueprint('customers', __name__)
@@ -20,9 +22,9 @@ customers_schema = CustomerSchema(many=True)
 
 @customers_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_get(Customer)
 def get_customers():
-    customers = Customer.query.all()
-    return jsonify({'customers': customers_schema.dump(customers)})
+    return list_by_name(Customer, customers_schema, 'customers')
 
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
 @jwt_required()
@@ -0,0 +1,90 @@
+from flask import Blueprint, request, jsonify, Response, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from app import db
+from app.models import Job, User
+from app.models.job import JobStatus
+from app.services.job_queue import enqueue, cancel, registered_tasks, serialize_job, user_may_enqueue
+from app.utils.pagination import get_per_page
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('', methods=['POST'])
+@jwt_required()
+def create_job():
+    """Enqueue a background job: {"task": "...", "params": {...}, "priority": 0}"""
+    data = request.json or {}
+    task_name = data.get('task')
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params must be an object'}), 400
+    
+    user = db.session.get(User, get_jwt_identity())
+    if task_name in registered_tasks() and not user_may_enqueue(task_name, user.role if user else None):
+        return jsonify({'error': 'Insufficient permissions'}), 403
+    
+    try:
+        job = enqueue(task_name, params, priority=int(data.get('priority', 0)), user_id=get_jwt_identity())
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status.value,
+        'status_url': url_for('jobs.get_job', job_id=job.id)
+    }), 202
+
+@jobs_bp.route('/tasks', methods=['GET'])
+@jwt_required()
+def get_tasks():
+    return jsonify({'tasks': sorted(registered_tasks())})
+
+@jobs_bp.route('', methods=['GET'])
+@jwt_required()
+def get_jobs():
+    """Recent jobs, newest first, optionally filtered by status and task"""
+    query = Job.query
+    status = request.args.get('status')
+    if status:
+        try:
+            query = query.filter(Job.status == JobStatus(status))
+        except ValueError:
+            return jsonify({'error': f"Invalid status '{status}'"}), 400
+    task_name = request.args.get('task')
+    if task_name:
+        query = query.filter(Job.task == task_name)
+    
+    jobs = query.order_by(Job.id.desc()).limit(get_per_page()).all()
+    return jsonify({'jobs': [serialize_job(job) for job in jobs]})
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Job status and progress for polling"""
+    job = Job.query.get_or_404(job_id)
+    return jsonify({'job': serialize_job(job)})
+
+@jobs_bp.route('/<int:job_id>/result', methods=['GET'])
+@jwt_required()
+def get_job_result(job_id):
+    job = Job.query.get_or_404(job_id)
+    
+    if job.status != JobStatus.SUCCEEDED:
+        return jsonify({'error': f'Job is {job.status.value}', 'job': serialize_job(job)}), 409
+    if job.expires_at and job.expires_at < datetime.utcnow():
+        return jsonify({'error': 'Job result has expired'}), 410
+    
+    # Stored results are already JSON
+    return Response(job.result_json, mimetype='application/json')
+
+@jobs_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    
+    if not cancel(job):
+        return jsonify({'error': f'Job is already {job.status.value}'}), 400
+    db.session.commit()
+    
+    return jsonify({'message': 'Cancellation requested', 'job': serialize_job(job)})
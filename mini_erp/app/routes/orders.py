@@ -3,12 +3,18 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import (
     PurchaseOrder, PurchaseOrderLine, SalesOrder, SalesOrderLine,
-    Supplier, Customer, Product, Warehouse, StockMovement, InventoryBalance
+    Supplier, Customer, Product, Warehouse
 )
 from app.models.purchase_order import PurchaseOrderStatus
 from app.models.sales_order import SalesOrderStatus
 from app.models.stock_movement import MovementDirection, MovementType
+from app.services.allocation_service import AllocationService, SHIPPABLE_STATUSES, serialize_plan
+from app.services.stock_posting import InsufficientStockError, post_movements
+from app.services.order_totals import line_totals
 from marshmallow import Schema, fields, ValidationError
+from sqlalchemy import bindparam, case, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 
 orders_bp = Blueprint('orders', __name__)
@@ -25,6 +31,9 @@ class PurchaseOrderSchema(Schema):
     order_date = fields.Date(required=True)
     expected_date = fields.Date(allow_none=True)
     note = fields.Str(allow_none=True)
+    total_qty = fields.Int(dump_only=True)
+    total_value = fields.Decimal(dump_only=True)
+    line_count = fields.Int(dump_only=True)
     lines = fields.Nested(PurchaseOrderLineSchema, many=True, load_default=[])
 
 # Sales Order Schemas
@@ -39,12 +48,180 @@ class SalesOrderSchema(Schema):
     order_date = fields.Date(required=True)
     expected_ship_date = fields.Date(allow_none=True)
     note = fields.Str(allow_none=True)
+    total_qty = fields.Int(dump_only=True)
+    total_value = fields.Decimal(dump_only=True)
+    line_count = fields.Int(dump_only=True)
     lines = fields.Nested(SalesOrderLineSchema, many=True, load_default=[])
 
 purchase_order_schema = PurchaseOrderSchema()
 purchase_orders_schema = PurchaseOrderSchema(many=True)
+purchase_order_header_schema = PurchaseOrderSchema(exclude=('lines',))
+purchase_order_lines_schema = PurchaseOrderLineSchema(many=True)
 sales_order_schema = SalesOrderSchema()
 sales_orders_schema = SalesOrderSchema(many=True)
+sales_order_header_schema = SalesOrderSchema(exclude=('lines',))
+
+def load_lines_by_order(line_model, order_fk, order_ids):
+    """Load the lines of many orders (with their products) in a single query.
+
+    ``lines`` is a dynamic relationship and cannot be eager loaded, so the
+    lines are fetched with one IN query and grouped by order id here.
+    """
+    lines_by_order = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return lines_by_order
+    
+    lines = line_model.query.options(joinedload(line_model.product)).filter(
+        order_fk.in_(order_ids)
+    ).order_by(line_model.id).all()
+    
+    for line in lines:
+        lines_by_order[getattr(line, order_fk.key)].append(line)
+    return lines_by_order
+
+def serialize_partner(partner):
+    return {
+        'id': partner.id,
+        'name': partner.name
+    } if partner else None
+
+def serialize_order_line(line, progress_field):
+    """Serialize an order line with product information.
+
+    ``progress_field`` is ``received_qty`` for purchase and ``shipped_qty``
+    for sales lines.
+    """
+    return {
+        'id': line.id,
+        'product_id': line.product_id,
+        'qty': line.qty,
+        'unit_price': line.unit_price,
+        progress_field: getattr(line, progress_field),
+        'status': line.status,
+        'product': {
+            'id': line.product.id,
+            'name': line.product.name,
+            'sku': line.product.sku
+        } if line.product else None
+    }
+
+def order_status_value(order):
+    return order.status.value if hasattr(order.status, 'value') else str(order.status)
+
+MAX_BULK_ORDERS = 1000
+MAX_RECEIPT_LINES = 2000
+MAX_WAVE_ORDERS = 500
+
+def existing_ids(model, ids):
+    """Return the subset of ids that exist in model's table, with one IN query"""
+    ids = set(ids)
+    if not ids:
+        return set()
+    return {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))}
+
+def missing_product_ids(lines):
+    product_ids = {line['product_id'] for line in lines}
+    return sorted(product_ids - existing_ids(Product, product_ids))
+
+def bulk_create_orders(payload, schema, order_model, line_model, partner_model,
+                       partner_field, order_fk, extra_fields, status):
+    """Validate and insert a batch of orders with set-based queries.
+
+    Partners, products and order numbers for the whole batch are checked with
+    one IN query each; valid headers (with their line totals) and lines are
+    then inserted with two bulk INSERTs in a single transaction. With ``atomic`` set, any invalid order
+    rejects the whole batch.
+    """
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    orders = payload.get('orders')
+    if not isinstance(orders, list) or not orders:
+        return jsonify({'error': 'orders must be a non-empty list'}), 400
+    if len(orders) > MAX_BULK_ORDERS:
+        return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders per request'}), 400
+    atomic = payload.get('atomic', False)
+    if not isinstance(atomic, bool):
+        return jsonify({'error': 'atomic must be a boolean'}), 400
+    
+    results = []
+    parsed = []
+    for index, raw in enumerate(orders):
+        try:
+            parsed.append((index, schema.load(raw)))
+        except ValidationError as err:
+            results.append({'index': index, 'order_no': (raw or {}).get('order_no') if isinstance(raw, dict) else None,
+                            'status': 'error', 'errors': err.messages})
+    
+    partner_ids = existing_ids(partner_model, [data[partner_field] for _, data in parsed])
+    product_ids = existing_ids(Product, [line['product_id'] for _, data in parsed for line in data['lines']])
+    order_nos = [data['order_no'] for _, data in parsed]
+    taken = {row[0] for row in db.session.query(order_model.order_no).filter(
+        order_model.order_no.in_(set(order_nos))
+    )} if order_nos else set()
+    
+    valid = []
+    seen = set()
+    for index, data in parsed:
+        errors = []
+        if data[partner_field] not in partner_ids:
+            errors.append(f'{partner_model.__name__} not found')
+        if data['order_no'] in taken or data['order_no'] in seen:
+            errors.append('Order number already exists')
+        missing = sorted({line['product_id'] for line in data['lines']} - product_ids)
+        if missing:
+            errors.append(f'Products not found: {missing}')
+        seen.add(data['order_no'])
+        
+        if errors:
+            results.append({'index': index, 'order_no': data['order_no'], 'status': 'error', 'errors': errors})
+        else:
+            valid.append((index, data))
+    
+    if atomic and len(valid) != len(orders):
+        results.sort(key=lambda result: result['index'])
+        return jsonify({'created': 0, 'failed': len(results), 'results': results}), 400
+    
+    if valid:
+        headers = [{
+            partner_field: data[partner_field],
+            'order_no': data['order_no'],
+            'order_date': data['order_date'],
+            'note': data.get('note'),
+            'status': status,
+            **{field: data.get(field) for field in extra_fields},
+            **line_totals(data['lines'])
+        } for _, data in valid]
+        try:
+            inserted = db.session.execute(
+                insert(order_model).returning(order_model.id, order_model.order_no, sort_by_parameter_order=True), headers
+            ).all()
+            ids_by_order_no = {row.order_no: row.id for row in inserted}
+            
+            lines = [{
+                order_fk: ids_by_order_no[data['order_no']],
+                'product_id': line['product_id'],
+                'qty': line['qty'],
+                'unit_price': line['unit_price']
+            } for _, data in valid for line in data['lines']]
+            if lines:
+                db.session.execute(insert(line_model), lines)
+            
+            db.session.commit()
+        except IntegrityError:
+            # An order number was taken by a concurrent request after the duplicate check
+            db.session.rollback()
+            return jsonify({'error': 'Order number already exists, nothing was created'}), 409
+        
+        for index, data in valid:
+            results.append({'index': index, 'order_no': data['order_no'], 'status': 'created',
+                            'id': ids_by_order_no[data['order_no']], 'line_count': len(data['lines'])})
+    
+    results.sort(key=lambda result: result['index'])
+    return jsonify({
+        'created': len(valid),
+        'failed': len(orders) - len(valid),
+        'results': results
+    }), 201 if valid else 400
 
 # Purchase Orders
 @orders_bp.route('/purchase', methods=['GET'])
@@ -59,20 +236,23 @@ def get_purchase_orders():
     if status:
         query = query.filter_by(status=status)
     
-    orders = query.order_by(PurchaseOrder.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    orders = query.options(joinedload(PurchaseOrder.supplier)).order_by(
+        PurchaseOrder.created_at.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    
+    lines_by_order = load_lines_by_order(
+        PurchaseOrderLine, PurchaseOrderLine.purchase_order_id,
+        [order.id for order in orders.items]
     )
     
     # Include supplier information and ensure ID is included
     orders_with_suppliers = []
     for order in orders.items:
-        order_data = purchase_order_schema.dump(order)
+        order_data = purchase_order_header_schema.dump(order)
         order_data['id'] = order.id  # Ensure ID is included
-        order_data['status'] = order.status.value if hasattr(order.status, 'value') else str(order.status)
-        order_data['supplier'] = {
-            'id': order.supplier.id,
-            'name': order.supplier.name
-        } if order.supplier else None
+        order_data['status'] = order_status_value(order)
+        order_data['supplier'] = serialize_partner(order.supplier)
+        order_data['lines'] = purchase_order_lines_schema.dump(lines_by_order[order.id])
         orders_with_suppliers.append(order_data)
     
     return jsonify({
@@ -102,6 +282,11 @@ def create_purchase_order():
     if PurchaseOrder.query.filter_by(order_no=data['order_no']).first():
         return jsonify({'error': 'Order number already exists'}), 400
     
+    # Check all line products with a single query
+    missing = missing_product_ids(data['lines'])
+    if missing:
+        return jsonify({'error': f'Product {missing[0]} not found'}), 404
+    
     # Create purchase order
     order = PurchaseOrder(
         supplier_id=data['supplier_id'],
@@ -117,10 +302,6 @@ def create_purchase_order():
     
     # Create order lines
     for line_data in data['lines']:
-        product = Product.query.get(line_data['product_id'])
-        if not product:
-            return jsonify({'error': f'Product {line_data["product_id"]} not found'}), 404
-        
         line = PurchaseOrderLine(
             purchase_order_id=order.id,
             product_id=line_data['product_id'],
@@ -133,6 +314,15 @@ def create_purchase_order():
     
     return jsonify({'order': purchase_order_schema.dump(order)}), 201
 
+@orders_bp.route('/purchase/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_purchase_orders():
+    """Create many purchase orders at once: {"orders": [...], "atomic": false}"""
+    return bulk_create_orders(
+        request.json, purchase_order_schema, PurchaseOrder, PurchaseOrderLine, Supplier,
+        'supplier_id', 'purchase_order_id', ('expected_date',), PurchaseOrderStatus.DRAFT
+    )
+
 @orders_bp.route('/purchase/<int:order_id>/approve', methods=['POST'])
 @jwt_required()
 def approve_purchase_order(order_id):
@@ -153,35 +343,20 @@ def approve_purchase_order(order_id):
 @orders_bp.route('/purchase/<int:order_id>', methods=['GET'])
 @jwt_required()
 def get_purchase_order(order_id):
-    order = PurchaseOrder.query.get_or_404(order_id)
+    order = PurchaseOrder.query.options(
+        joinedload(PurchaseOrder.supplier)
+    ).filter_by(id=order_id).first_or_404()
     
     # Include supplier information and order lines
-    order_data = purchase_order_schema.dump(order)
-    order_data['status'] = order.status.value if hasattr(order.status, 'value') else str(order.status)
-    order_data['supplier'] = {
-        'id': order.supplier.id,
-        'name': order.supplier.name
-    } if order.supplier else None
+    order_data = purchase_order_header_schema.dump(order)
+    order_data['status'] = order_status_value(order)
+    order_data['supplier'] = serialize_partner(order.supplier)
     
     # Include order lines with product information
-    lines_data = []
-    for line in order.lines:
-        line_data = {
-            'id': line.id,
-            'product_id': line.product_id,
-            'qty': line.qty,
-            'unit_price': float(line.unit_price),
-            'received_qty': line.received_qty,
-            'status': line.status,
-            'product': {
-                'id': line.product.id,
-                'name': line.product.name,
-                'sku': line.product.sku
-            } if line.product else None
-        }
-        lines_data.append(line_data)
-    
-    order_data['lines'] = lines_data
+    lines = load_lines_by_order(
+        PurchaseOrderLine, PurchaseOrderLine.purchase_order_id, [order.id]
+    )[order.id]
+    order_data['lines'] = [serialize_order_line(line, 'received_qty') for line in lines]
     
     return jsonify({'order': order_data})
 
@@ -202,61 +377,133 @@ def receive_purchase_order(order_id):
         return jsonify({'error': 'Missing required fields'}), 400
     
     order = PurchaseOrder.query.get_or_404(order_id)
-    line = PurchaseOrderLine.query.get_or_404(line_id)
+    error = receive_lines(order, [
+        {'line_id': line_id, 'received_qty': received_qty, 'warehouse_id': warehouse_id}
+    ])
+    if error:
+        return error
+    
+    return jsonify({'message': 'Goods received successfully'})
+
+@orders_bp.route('/purchase/<int:order_id>/receipts', methods=['POST'])
+@jwt_required()
+def create_goods_receipt(order_id):
+    """Goods receipt (GRN) for any number of lines of one order.
+
+    Body: {"grn_no": "...", "warehouse_id": 1, "lines": [{"line_id", "received_qty", "warehouse_id"?}]}
+    A line's warehouse_id overrides the document default. All lines are posted
+    in one transaction; any invalid line rejects the whole receipt.
+    """
+    data = request.json or {}
+    receipts = data.get('lines')
+    if not isinstance(receipts, list) or not receipts:
+        return jsonify({'error': 'lines must be a non-empty list'}), 400
+    if len(receipts) > MAX_RECEIPT_LINES:
+        return jsonify({'error': f'At most {MAX_RECEIPT_LINES} lines per receipt'}), 400
+    
+    default_warehouse_id = data.get('warehouse_id')
+    entries = []
+    for receipt in receipts:
+        if not isinstance(receipt, dict):
+            return jsonify({'error': 'Each line must be an object'}), 400
+        entry = {
+            'line_id': receipt.get('line_id'),
+            'received_qty': receipt.get('received_qty'),
+            'warehouse_id': receipt.get('warehouse_id') or default_warehouse_id
+        }
+        if not all(entry.values()):
+            return jsonify({'error': 'Missing required fields', 'line': receipt}), 400
+        entries.append(entry)
+    
+    order = PurchaseOrder.query.get_or_404(order_id)
+    error = receive_lines(order, entries, data.get('grn_no'))
+    if error:
+        return error
+    
+    return jsonify({
+        'message': 'Goods received successfully',
+        'order_id': order.id,
+        'status': order_status_value(order),
+        'lines_received': len({entry['line_id'] for entry in entries}),
+        'total_received_qty': sum(entry['received_qty'] for entry in entries)
+    }), 201
+
+def receive_lines(order, entries, grn_no=None):
+    """Post receipts for lines of a purchase order in one transaction.
+
+    Lines and warehouses are validated with one query each, movements and
+    line progress is updated with one guarded executemany, movements and
+    balance deltas are posted in bulk and the header status is derived from
+    a single aggregate.
+    Returns an error response tuple, or None on success.
+    """
+    for entry in entries:
+        # bool is an int subclass; JSON true must not post a receipt of 1
+        if type(entry['received_qty']) is not int or entry['received_qty'] <= 0:
+            return jsonify({'error': 'received_qty must be a positive integer', 'line_id': entry['line_id']}), 400
     
     if order.status not in [PurchaseOrderStatus.APPROVED, PurchaseOrderStatus.PARTIALLY_RECEIVED]:
         return jsonify({'error': 'Order must be approved to receive goods'}), 400
     
-    remaining_qty = line.qty - line.received_qty
-    if received_qty > remaining_qty:
-        return jsonify({'error': 'Received quantity exceeds remaining quantity'}), 400
-    
-    # Check if warehouse exists
-    warehouse = Warehouse.query.get(warehouse_id)
-    if not warehouse:
+    line_ids = {entry['line_id'] for entry in entries}
+    lines = {line.id: line for line in db.session.query(
+        PurchaseOrderLine.id, PurchaseOrderLine.product_id,
+        PurchaseOrderLine.qty, PurchaseOrderLine.received_qty
+    ).filter(
+        PurchaseOrderLine.id.in_(line_ids),
+        PurchaseOrderLine.purchase_order_id == order.id
+    )}
+    missing_lines = sorted(line_ids - set(lines))
+    if missing_lines:
+        return jsonify({'error': f'Order line {missing_lines[0]} not found'}), 404
+    
+    received_by_line = {}
+    for entry in entries:
+        received_by_line[entry['line_id']] = received_by_line.get(entry['line_id'], 0) + entry['received_qty']
+    for line_id, received_qty in received_by_line.items():
+        line = lines[line_id]
+        if received_qty > line.qty - line.received_qty:
+            return jsonify({'error': 'Received quantity exceeds remaining quantity', 'line_id': line_id}), 400
+    
+    warehouse_ids = {entry['warehouse_id'] for entry in entries}
+    missing_warehouses = warehouse_ids - existing_ids(Warehouse, warehouse_ids)
+    if missing_warehouses:
         return jsonify({'error': 'Warehouse not found'}), 404
     
-    # Create stock movement
-    movement = StockMovement(
-        product_id=line.product_id,
-        warehouse_id=warehouse_id,
-        direction=MovementDirection.IN,
-        quantity=received_qty,
-        movement_type=MovementType.PURCHASE,
-        ref_document_no=order.order_no,
-        ref_line_id=line.id,
-        note=f"Purchase receipt - {order.order_no}",
-        created_by=get_jwt_identity()
+    # Update order lines; the guard re-checks the remaining quantity on the row being written, so a
+    # receipt committed concurrently since the check above cannot over-receive a line
+    line_table = PurchaseOrderLine.__table__
+    received = line_table.c.received_qty + bindparam('delta')
+    updated = db.session.execute(
+        update(line_table).where(line_table.c.id == bindparam('line_id'), received <= line_table.c.qty).values(
+            received_qty=received,
+            status=case((received >= line_table.c.qty, 'Received'), else_=line_table.c.status)
+        ),
+        [{'line_id': line_id, 'delta': qty} for line_id, qty in received_by_line.items()]
     )
-    
-    db.session.add(movement)
-    
-    # Update inventory balance
-    balance = InventoryBalance.query.filter_by(
-        product_id=line.product_id, warehouse_id=warehouse_id
-    ).first()
-    
-    if not balance:
-        balance = InventoryBalance(
-            product_id=line.product_id,
-            warehouse_id=warehouse_id,
-            on_hand_qty=0,
-            reserved_qty=0,
-            available_qty=0
-        )
-        db.session.add(balance)
-    
-    balance.on_hand_qty += received_qty
-    balance.update_available_qty()
-    
-    # Update order line
-    line.received_qty += received_qty
-    if line.received_qty >= line.qty:
-        line.status = 'Received'
+    if updated.rowcount != len(received_by_line):
+        db.session.rollback()
+        return jsonify({'error': 'Received quantity exceeds remaining quantity'}), 409
+    
+    note = f"Purchase receipt - {order.order_no}" + (f" ({grn_no})" if grn_no else "")
+    user_id = get_jwt_identity()
+    post_movements([{
+        'product_id': lines[entry['line_id']].product_id,
+        'warehouse_id': entry['warehouse_id'],
+        'direction': MovementDirection.IN,
+        'quantity': entry['received_qty'],
+        'movement_type': MovementType.PURCHASE,
+        'ref_document_no': order.order_no,
+        'ref_line_id': entry['line_id'],
+        'note': note,
+        'created_by': user_id
+    } for entry in entries])
     
     # Update order status
-    total_received = sum(line.received_qty for line in order.lines)
-    total_qty = sum(line.qty for line in order.lines)
+    total_qty, total_received = db.session.query(
+        func.coalesce(func.sum(PurchaseOrderLine.qty), 0),
+        func.coalesce(func.sum(PurchaseOrderLine.received_qty), 0)
+    ).filter(PurchaseOrderLine.purchase_order_id == order.id).one()
     
     if total_received >= total_qty:
         order.status = PurchaseOrderStatus.CLOSED
@@ -264,8 +511,7 @@ def receive_purchase_order(order_id):
         order.status = PurchaseOrderStatus.PARTIALLY_RECEIVED
     
     db.session.commit()
-    
-    return jsonify({'message': 'Goods received successfully'})
+    return None
 
 # Sales Orders
 @orders_bp.route('/sales', methods=['GET'])
@@ -280,40 +526,27 @@ def get_sales_orders():
     if status:
         query = query.filter_by(status=status)
     
-    orders = query.order_by(SalesOrder.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    orders = query.options(joinedload(SalesOrder.customer)).order_by(
+        SalesOrder.created_at.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    
+    lines_by_order = load_lines_by_order(
+        SalesOrderLine, SalesOrderLine.sales_order_id,
+        [order.id for order in orders.items]
     )
     
     # Include customer information and ensure ID is included
     orders_with_customers = []
     for order in orders.items:
-        order_data = sales_order_schema.dump(order)
+        order_data = sales_order_header_schema.dump(order)
         order_data['id'] = order.id  # Ensure ID is included
-        order_data['status'] = order.status.value if hasattr(order.status, 'value') else str(order.status)
-        order_data['customer'] = {
-            'id': order.customer.id,
-            'name': order.customer.name
-        } if order.customer else None
+        order_data['status'] = order_status_value(order)
+        order_data['customer'] = serialize_partner(order.customer)
         
         # Include order lines with product information
-        lines_data = []
-        for line in order.lines:
-            line_data = {
-                'id': line.id,
-                'product_id': line.product_id,
-                'qty': line.qty,
-                'unit_price': float(line.unit_price),
-                'shipped_qty': line.shipped_qty,
-                'status': line.status,
-                'product': {
-                    'id': line.product.id,
-                    'name': line.product.name,
-                    'sku': line.product.sku
-                } if line.product else None
-            }
-            lines_data.append(line_data)
-        
-        order_data['lines'] = lines_data
+        order_data['lines'] = [
+            serialize_order_line(line, 'shipped_qty') for line in lines_by_order[order.id]
+        ]
         orders_with_customers.append(order_data)
     
     return jsonify({
@@ -340,6 +573,11 @@ def create_sales_order():
     if SalesOrder.query.filter_by(order_no=data['order_no']).first():
         return jsonify({'error': 'Order number already exists'}), 400
     
+    # Check all line products with a single query
+    missing = missing_product_ids(data['lines'])
+    if missing:
+        return jsonify({'error': f'Product {missing[0]} not found'}), 404
+    
     # Create sales order
     order = SalesOrder(
         customer_id=data['customer_id'],
@@ -355,10 +593,6 @@ def create_sales_order():
     
     # Create order lines
     for line_data in data['lines']:
-        product = Product.query.get(line_data['product_id'])
-        if not product:
-            return jsonify({'error': f'Product {line_data["product_id"]} not found'}), 404
-        
         line = SalesOrderLine(
             sales_order_id=order.id,
             product_id=line_data['product_id'],
@@ -371,6 +605,15 @@ def create_sales_order():
     
     return jsonify({'order': sales_order_schema.dump(order)}), 201
 
+@orders_bp.route('/sales/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_sales_orders():
+    """Create many sales orders at once: {"orders": [...], "atomic": false}"""
+    return bulk_create_orders(
+        request.json, sales_order_schema, SalesOrder, SalesOrderLine, Customer,
+        'customer_id', 'sales_order_id', ('expected_ship_date',), SalesOrderStatus.DRAFT
+    )
+
 @orders_bp.route('/sales/<int:order_id>/approve', methods=['POST'])
 @jwt_required()
 def approve_sales_order(order_id):
@@ -382,108 +625,157 @@ def approve_sales_order(order_id):
         return jsonify({'error': 'Only draft orders can be approved'}), 400
     
     order.status = SalesOrderStatus.APPROVED
+    db.session.flush()
+    
+    # Reserve stock for the order; lines that cannot be covered stay unreserved as backorders
+    try:
+        service = allocation_service_from_request(request.get_json(silent=True) or {})
+        plans = service.reserve([order.id], user_id=get_jwt_identity())
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
     db.session.commit()
     
     print(f"Sales Order {order_id} new status: {order.status}")
     
-    return jsonify({'message': 'Sales order approved', 'order': sales_order_schema.dump(order)})
+    return jsonify({
+        'message': 'Sales order approved',
+        'order': sales_order_schema.dump(order),
+        'reservation': serialize_plan(plans[0]) if plans else None
+    })
+
+@orders_bp.route('/sales/<int:order_id>/reserve', methods=['POST'])
+@jwt_required()
+def reserve_sales_order(order_id):
+    """Reserve newly available stock for the unreserved part of an approved order"""
+    order = SalesOrder.query.get_or_404(order_id)
+    
+    if order.status not in SHIPPABLE_STATUSES:
+        return jsonify({'error': 'Only approved orders can reserve stock'}), 400
+    
+    try:
+        service = allocation_service_from_request(request.get_json(silent=True) or {})
+        plans = service.reserve([order.id], user_id=get_jwt_identity())
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    db.session.commit()
+    
+    return jsonify({'message': 'Stock reserved', 'reservation': serialize_plan(plans[0]) if plans else None})
+
+def allocation_service_from_request(data):
+    """Build an AllocationService from strategy / warehouse_priority / allow_partial"""
+    allow_partial = data.get('allow_partial', True)
+    if not isinstance(allow_partial, bool):
+        raise ValueError('allow_partial must be a boolean')
+    return AllocationService(
+        strategy=data.get('strategy', 'single_warehouse'),
+        warehouse_priority=data.get('warehouse_priority'),
+        allow_partial=allow_partial
+    )
 
 @orders_bp.route('/sales/<int:order_id>/ship', methods=['POST'])
 @jwt_required()
 def ship_sales_order(order_id):
+    """Ship an order from warehouse stock chosen by the allocation engine.
+
+    Optional body: {"strategy": "single_warehouse" | "nearest" | "fewest_splits",
+    "warehouse_priority": [warehouse ids, nearest first], "allow_partial": true}.
+    Lines that cannot be covered stay open as backorders and the order
+    becomes PartiallyShipped; shipping it again serves them from new stock.
+    """
     order = SalesOrder.query.get_or_404(order_id)
     
-    if order.status != SalesOrderStatus.APPROVED:
+    if order.status not in SHIPPABLE_STATUSES:
         return jsonify({'error': 'Order must be approved to ship goods'}), 400
     
-    # Get the first warehouse for simplicity
-    warehouse = Warehouse.query.first()
-    if not warehouse:
-        return jsonify({'error': 'No warehouse found'}), 404
-    
-    # Ship all lines
-    for line in order.lines:
-        if line.shipped_qty < line.qty:
-            remaining_qty = line.qty - line.shipped_qty
-            
-            # Check available stock
-            balance = InventoryBalance.query.filter_by(
-                product_id=line.product_id, warehouse_id=warehouse.id
-            ).first()
-            
-            if not balance:
-                # Create inventory balance if it doesn't exist
-                balance = InventoryBalance(
-                    product_id=line.product_id,
-                    warehouse_id=warehouse.id,
-                    on_hand_qty=0,
-                    reserved_qty=0,
-                    available_qty=0
-                )
-                db.session.add(balance)
-                db.session.flush()
-            
-            # Create stock movement
-            movement = StockMovement(
-                product_id=line.product_id,
-                warehouse_id=warehouse.id,
-                direction=MovementDirection.OUT,
-                quantity=remaining_qty,
-                movement_type=MovementType.SALES,
-                ref_document_no=order.order_no,
-                ref_line_id=line.id,
-                note=f"Sales shipment - {order.order_no}",
-                created_by=get_jwt_identity()
-            )
-            
-            db.session.add(movement)
-            
-            # Update inventory balance
-            balance.on_hand_qty -= remaining_qty
-            balance.update_available_qty()
-            
-            # Update order line
-            line.shipped_qty = line.qty
-            line.status = 'Shipped'
+    try:
+        service = allocation_service_from_request(request.get_json(silent=True) or {})
+        plans = service.ship([order.id], user_id=get_jwt_identity())
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    plan = serialize_plan(plans[0]) if plans else None
+    if not plan or not plan['allocations']:
+        return jsonify({'error': 'Insufficient stock to ship order', 'allocation': plan}), 409
     
-    # Update order status to CLOSED
-    order.status = SalesOrderStatus.CLOSED
     db.session.commit()
     
-    return jsonify({'message': 'Goods shipped successfully'})
+    message = 'Goods shipped successfully' if plan['fully_allocated'] else 'Goods partially shipped'
+    return jsonify({'message': message, 'allocation': plan})
+
+@orders_bp.route('/sales/waves', methods=['POST'])
+@jwt_required()
+def ship_sales_wave():
+    """Allocate and ship a wave of orders in one batched pass.
+
+    Body: {"order_ids": [...]} (default: every approved or partially shipped
+    order, oldest first, up to MAX_WAVE_ORDERS), the allocation options of
+    the ship endpoint and "dry_run" to only return the allocation plan.
+    """
+    data = request.get_json(silent=True) or {}
+    order_ids = data.get('order_ids')
+    if order_ids is None:
+        order_ids = [order_id for order_id, in db.session.query(SalesOrder.id).filter(
+            SalesOrder.status.in_(SHIPPABLE_STATUSES)
+        ).order_by(SalesOrder.order_date, SalesOrder.id).limit(MAX_WAVE_ORDERS)]
+    elif (not isinstance(order_ids, list) or len(order_ids) > MAX_WAVE_ORDERS
+          or any(type(order_id) is not int for order_id in order_ids)):
+        return jsonify({'error': f'order_ids must be a list of at most {MAX_WAVE_ORDERS} integer ids'}), 400
+    
+    dry_run = data.get('dry_run', False)
+    if not isinstance(dry_run, bool):
+        return jsonify({'error': 'dry_run must be a boolean'}), 400
+    try:
+        service = allocation_service_from_request(data)
+        plans = service.ship(order_ids, user_id=get_jwt_identity(), dry_run=dry_run)
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not dry_run:
+        db.session.commit()
+    
+    results = [serialize_plan(plan) for plan in plans]
+    return jsonify({
+        'dry_run': dry_run,
+        'strategy': service.strategy,
+        'orders': results,
+        'shipped_orders': sum(1 for result in results if result['allocations']),
+        'fully_allocated_orders': sum(1 for result in results if result['fully_allocated']),
+        'backordered_lines': sum(len(result['backorders']) for result in results),
+        'skipped_order_ids': sorted(set(order_ids) - {result['order_id'] for result in results})
+    })
 
 @orders_bp.route('/sales/<int:order_id>', methods=['GET'])
 @jwt_required()
 def get_sales_order(order_id):
-    order = SalesOrder.query.get_or_404(order_id)
+    order = SalesOrder.query.options(
+        joinedload(SalesOrder.customer)
+    ).filter_by(id=order_id).first_or_404()
     
     # Include customer information and order lines
-    order_data = sales_order_schema.dump(order)
+    order_data = sales_order_header_schema.dump(order)
     order_data['id'] = order.id
-    order_data['status'] = order.status.value if hasattr(order.status, 'value') else str(order.status)
-    order_data['customer'] = {
-        'id': order.customer.id,
-        'name': order.customer.name
-    } if order.customer else None
+    order_data['status'] = order_status_value(order)
+    order_data['customer'] = serialize_partner(order.customer)
     
     # Include order lines with product information
-    lines_data = []
-    for line in order.lines:
-        line_data = {
-            'id': line.id,
-            'product_id': line.product_id,
-            'qty': line.qty,
-            'unit_price': float(line.unit_price),
-            'shipped_qty': line.shipped_qty,
-            'status': line.status,
-            'product': {
-                'id': line.product.id,
-                'name': line.product.name,
-                'sku': line.product.sku
-            } if line.product else None
-        }
-        lines_data.append(line_data)
-    
-    order_data['lines'] = lines_data
+    lines = load_lines_by_order(
+        SalesOrderLine, SalesOrderLine.sales_order_id, [order.id]
+    )[order.id]
+    order_data['lines'] = [serialize_order_line(line, 'shipped_qty') for line in lines]
     
     return jsonify({'order': order_data})
@@ -1,8 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Product
+from app.models import Product, ProductClassification
+from app.utils.caching import conditional_get
+from app.services.search_service import ProductSearchService
+from app.services.scan_index import scan_index
+from app.services.stock_levels import refresh_stock_levels
+from app.services.movement_archive import has_movement_history
+from app.services.classification_service import filter_by_class
 from marshmallow import Schema, fields, ValidationError
+from sqlalchemy import select
 
 products_bp = Blueprint('products', __name__)
 
@@ -19,24 +26,43 @@ class ProductSchema(Schema):
 
 product_schema = ProductSchema()
 products_schema = ProductSchema(many=True)
+product_summary_schema = ProductSchema(many=True, only=('id', 'sku', 'name', 'barcode', 'category', 'unit'))
+
+MAX_SCAN_BATCH = 500
 
 @products_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_get(Product, ProductClassification)
 def get_products():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search', '')
-    
-    query = Product.query
+    abc_class = request.args.get('abc_class')
+    xyz_class = request.args.get('xyz_class')
     
     if search:
-        query = query.filter(
-            (Product.name.contains(search)) |
-            (Product.sku.contains(search)) |
-            (Product.barcode.contains(search))
-        )
+        # Class filters restrict the ranked matches instead of replacing the search index
+        within = None
+        if abc_class or xyz_class:
+            try:
+                within = filter_by_class(select(Product.id), Product.id, abc_class, xyz_class)
+            except ValueError as err:
+                return jsonify({'error': str(err)}), 400
+        per_page = max(per_page, 1)
+        products, total = ProductSearchService().search(search, page=page, per_page=per_page, within=within)
+        return jsonify({
+            'products': products_schema.dump(products),
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page
+        })
     
-    products = query.paginate(
+    try:
+        query = filter_by_class(Product.query, Product.id, abc_class, xyz_class)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    
+    products = query.order_by(Product.id).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
@@ -47,6 +73,45 @@ def get_products():
         'current_page': page
     })
 
+@products_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_products():
+    """Ranked type-ahead search over SKU, name, barcode and category"""
+    term = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    
+    if not term:
+        return jsonify({'products': []})
+    
+    products = ProductSearchService().suggest(term, limit=max(limit, 1))
+    return jsonify({'products': product_summary_schema.dump(products)})
+
+@products_bp.route('/by-barcode/<path:code>', methods=['GET'])
+@jwt_required()
+def get_product_by_barcode(code):
+    """Resolve a scanned barcode or SKU to the product and its stock per warehouse"""
+    entry = scan_index.lookup(code.strip())
+    if not entry:
+        return jsonify({'error': 'Product not found'}), 404
+    return jsonify(entry)
+
+@products_bp.route('/by-barcode', methods=['POST'])
+@jwt_required()
+def get_products_by_barcodes():
+    """Batch form of the barcode lookup: {"codes": [...]}"""
+    codes = (request.json or {}).get('codes')
+    if not isinstance(codes, list) or not codes:
+        return jsonify({'error': 'codes must be a non-empty list'}), 400
+    if len(codes) > MAX_SCAN_BATCH:
+        return jsonify({'error': f'At most {MAX_SCAN_BATCH} codes per request'}), 400
+    
+    codes = [str(code).strip() for code in codes]
+    results = scan_index.lookup_many(codes)
+    return jsonify({
+        'results': results,
+        'not_found': [code for code in codes if code not in results]
+    })
+
 @products_bp.route('/<int:product_id>', methods=['GET'])
 @jwt_required()
 def get_product(product_id):
@@ -95,9 +160,18 @@ def update_product(product_id):
         if data['barcode'] and Product.query.filter_by(barcode=data['barcode']).first():
             return jsonify({'error': 'Barcode already exists'}), 400
     
+    thresholds_changed = any(
+        key in data and data[key] != getattr(product, key)
+        for key in ('reorder_point', 'safety_stock')
+    )
+    
     for key, value in data.items():
         setattr(product, key, value)
     
+    if thresholds_changed:
+        db.session.flush()
+        refresh_stock_levels([product.id])
+    
     db.session.commit()
     
     return jsonify({'product': product_schema.dump(product)})
@@ -108,7 +182,7 @@ def delete_product(product_id):
     product = Product.query.get_or_404(product_id)
     
     # Check if product has stock movements
-    if product.stock_movements.count() > 0:
+    if has_movement_history(product_id=product.id):
         return jsonify({'error': 'Cannot delete product with stock movements'}), 400
     
     db.session.delete(product)
@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.services.replenishment_service import ReplenishmentService
+
+replenishment_bp = Blueprint('replenishment', __name__)
+
+@replenishment_bp.route('/suggestions', methods=['GET'])
+@jwt_required()
+def get_suggestions():
+    """Get suggested purchase quantities for every active product"""
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    demand_days = request.args.get('demand_days', 30, type=int)
+    review_days = request.args.get('review_days', 14, type=int)
+    
+    service = ReplenishmentService(demand_days=demand_days, review_days=review_days)
+    return jsonify(service.get_suggestions(warehouse_id=warehouse_id))
@@ -1,17 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from app import db
 from app.models import (
     Product, Warehouse, StockMovement, InventoryBalance,
-    PurchaseOrder, SalesOrder, Supplier, Customer
+    PurchaseOrder, SalesOrder, Supplier, Customer, ProductClassification, InventoryValuation
 )
-from app.models.purchase_order import PurchaseOrderLine
+from app.models.inventory_valuation import VALUATION_METHODS
 from app.models.sales_order import SalesOrderLine
 from app.models.stock_movement import MovementDirection, MovementType
-from sqlalchemy import func, desc, and_
-from datetime import datetime, timedelta
+from app.models.stock_level_event import StockLevelEvent, LOW_STOCK_LEVELS
+from app.services.movement_archive import movement_source
+from app.utils.database import route_blueprint_reads
+from app.utils.pagination import get_per_page
+from app.utils.time_buckets import BUCKETS as SERIES_BUCKETS, date_bucket, bucket_count, bucket_periods
+from sqlalchemy import func, desc, and_, case
+from datetime import date, datetime, timedelta
 
 reports_bp = Blueprint('reports', __name__)
+route_blueprint_reads(reports_bp, 'reports')
 
 @reports_bp.route('/low-stock', methods=['GET'])
 @jwt_required()
@@ -23,9 +29,9 @@ def low_stock_report():
         Product.id, Product.sku, Product.name, Product.unit,
         Product.reorder_point, Product.safety_stock,
         Warehouse.id.label('warehouse_id'), Warehouse.name.label('warehouse_name'),
-        InventoryBalance.available_qty
+        InventoryBalance.available_qty, InventoryBalance.stock_level
     ).select_from(InventoryBalance).join(Product).join(Warehouse).filter(
-        InventoryBalance.available_qty <= Product.reorder_point
+        InventoryBalance.stock_level.in_(LOW_STOCK_LEVELS)
     )
     
     if warehouse_id:
@@ -45,11 +51,56 @@ def low_stock_report():
             'available_qty': row.available_qty,
             'reorder_point': row.reorder_point,
             'safety_stock': row.safety_stock,
+            'stock_level': row.stock_level.value,
             'shortage': row.reorder_point - row.available_qty
         })
     
     return jsonify({'low_stock_items': low_stock_items})
 
+@reports_bp.route('/stock-level-events', methods=['GET'])
+@jwt_required()
+def stock_level_events():
+    """Get reorder point / safety stock crossings, newest first"""
+    since_id = request.args.get('since_id', type=int)
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    product_id = request.args.get('product_id', type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    
+    query = db.session.query(
+        StockLevelEvent.id, StockLevelEvent.product_id, StockLevelEvent.warehouse_id,
+        StockLevelEvent.previous_level, StockLevelEvent.new_level,
+        StockLevelEvent.available_qty, StockLevelEvent.reorder_point,
+        StockLevelEvent.safety_stock, StockLevelEvent.created_at,
+        Product.sku, Product.name
+    ).join(Product, StockLevelEvent.product_id == Product.id)
+    
+    if since_id:
+        query = query.filter(StockLevelEvent.id > since_id)
+    if warehouse_id:
+        query = query.filter(StockLevelEvent.warehouse_id == warehouse_id)
+    if product_id:
+        query = query.filter(StockLevelEvent.product_id == product_id)
+    
+    results = query.order_by(StockLevelEvent.id.desc()).limit(limit).all()
+    
+    events = []
+    for row in results:
+        events.append({
+            'id': row.id,
+            'product_id': row.product_id,
+            'sku': row.sku,
+            'name': row.name,
+            'warehouse_id': row.warehouse_id,
+            'previous_level': row.previous_level.value if row.previous_level else None,
+            'new_level': row.new_level.value,
+            'available_qty': row.available_qty,
+            'reorder_point': row.reorder_point,
+            'safety_stock': row.safety_stock,
+            'created_at': row.created_at
+        })
+    
+    return jsonify({'events': events})
+
 @reports_bp.route('/inventory-summary', methods=['GET'])
 @jwt_required()
 def inventory_summary():
@@ -83,6 +134,79 @@ def inventory_summary():
     
     return jsonify({'inventory_summary': summary})
 
+@reports_bp.route('/inventory-value', methods=['GET'])
+@jwt_required()
+def inventory_value():
+    """Stock value from the running valuations, by warehouse (default), product or category.
+
+    method is average or fifo (default INVENTORY_VALUATION_METHOD); filters
+    warehouse_id, product_id, category. group_by=product returns the
+    per_page most valuable products.
+    """
+    method = request.args.get('method', current_app.config['INVENTORY_VALUATION_METHOD'])
+    if method not in VALUATION_METHODS:
+        return jsonify({'error': f"method must be one of {', '.join(VALUATION_METHODS)}"}), 400
+    group_by = request.args.get('group_by', 'warehouse')
+    if group_by not in ('warehouse', 'product', 'category'):
+        return jsonify({'error': 'group_by must be warehouse, product or category'}), 400
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    product_id = request.args.get('product_id', type=int)
+    category = request.args.get('category')
+    
+    value_column = InventoryValuation.fifo_value if method == 'fifo' else InventoryValuation.average_value
+    value = func.coalesce(func.sum(value_column), 0).label('value')
+    quantity = func.coalesce(func.sum(InventoryValuation.quantity), 0).label('quantity')
+    
+    def filtered(query):
+        if warehouse_id:
+            query = query.filter(InventoryValuation.warehouse_id == warehouse_id)
+        if product_id:
+            query = query.filter(InventoryValuation.product_id == product_id)
+        if category:
+            query = query.join(Product, InventoryValuation.product_id == Product.id).filter(Product.category == category)
+        return query
+    
+    total_qty, total_value = filtered(db.session.query(quantity, value).select_from(InventoryValuation)).one()
+    
+    if group_by == 'warehouse':
+        rows = filtered(db.session.query(
+            Warehouse.id, Warehouse.name, Warehouse.code, quantity, value
+        ).select_from(InventoryValuation).join(Warehouse, InventoryValuation.warehouse_id == Warehouse.id)).group_by(
+            Warehouse.id, Warehouse.name, Warehouse.code
+        ).order_by(Warehouse.id).all()
+        groups = [{
+            'warehouse_id': row.id, 'warehouse_name': row.name, 'warehouse_code': row.code,
+            'quantity': row.quantity, 'value': round(float(row.value), 2)
+        } for row in rows]
+    elif group_by == 'category':
+        query = db.session.query(Product.category, quantity, value).select_from(InventoryValuation)
+        if not category:
+            query = query.join(Product, InventoryValuation.product_id == Product.id)
+        rows = filtered(query).group_by(Product.category).order_by(desc('value')).all()
+        groups = [{
+            'category': row.category, 'quantity': row.quantity, 'value': round(float(row.value), 2)
+        } for row in rows]
+    else:
+        query = db.session.query(Product.id, Product.sku, Product.name, quantity, value).select_from(InventoryValuation)
+        if not category:
+            query = query.join(Product, InventoryValuation.product_id == Product.id)
+        rows = filtered(query).group_by(Product.id, Product.sku, Product.name).order_by(
+            desc('value'), Product.id
+        ).limit(get_per_page()).all()
+        groups = [{
+            'product_id': row.id, 'sku': row.sku, 'product_name': row.name, 'quantity': row.quantity,
+            'unit_cost': round(float(row.value) / row.quantity, 4) if row.quantity > 0 else None,
+            'value': round(float(row.value), 2)
+        } for row in rows]
+    
+    return jsonify({
+        'method': method,
+        'group_by': group_by,
+        'total_qty': total_qty,
+        'total_value': round(float(total_value), 2),
+        'groups': groups
+    })
+
 @reports_bp.route('/movement-summary', methods=['GET'])
 @jwt_required()
 def movement_summary():
@@ -93,25 +217,28 @@ def movement_summary():
     
     start_date = datetime.now() - timedelta(days=days)
     
+    # Archived movements are read only when the window starts before the archive cutoff
+    movements = movement_source(start_date)
+    
     # Get IN movements
     in_query = db.session.query(
         Product.id, Product.sku, Product.name,
-        func.sum(StockMovement.quantity).label('total_in')
-    ).join(StockMovement).filter(
+        func.sum(movements.c.quantity).label('total_in')
+    ).join(movements, movements.c.product_id == Product.id).filter(
         and_(
-            StockMovement.direction == MovementDirection.IN,
-            StockMovement.created_at >= start_date
+            movements.c.direction == MovementDirection.IN,
+            movements.c.created_at >= start_date
         )
     ).group_by(Product.id, Product.sku, Product.name)
     
     # Get OUT movements
     out_query = db.session.query(
         Product.id, Product.sku, Product.name,
-        func.sum(StockMovement.quantity).label('total_out')
-    ).join(StockMovement).filter(
+        func.sum(movements.c.quantity).label('total_out')
+    ).join(movements, movements.c.product_id == Product.id).filter(
         and_(
-            StockMovement.direction == MovementDirection.OUT,
-            StockMovement.created_at >= start_date
+            movements.c.direction == MovementDirection.OUT,
+            movements.c.created_at >= start_date
         )
     ).group_by(Product.id, Product.sku, Product.name)
     
@@ -141,6 +268,116 @@ def movement_summary():
     
     return jsonify({'movement_summary': movement_summary})
 
+SERIES_DEFAULT_DAYS = 90
+SERIES_MAX_POINTS = 300
+SERIES_MAX_DAYS = 366 * 100
+
+@reports_bp.route('/movement-series', methods=['GET'])
+@jwt_required()
+def movement_series():
+    """IN / OUT / net quantities per day, week or month for charts.
+
+    Buckets are aggregated in the database. When the range would need more
+    than max_points buckets, coarser buckets are used (day -> week -> month)
+    and months are finally merged in groups, so multi-year ranges stay at a
+    few hundred points.
+    """
+    product_id = request.args.get('product_id', type=int)
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in SERIES_BUCKETS:
+        return jsonify({'error': f"bucket must be one of {', '.join(SERIES_BUCKETS)}"}), 400
+    max_points = max(1, min(request.args.get('max_points', SERIES_MAX_POINTS, type=int), 1000))
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=SERIES_DEFAULT_DAYS)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    except OverflowError:
+        return jsonify({'error': 'to is too early for the default range; pass from as well'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if end >= date.max:
+        return jsonify({'error': f'to must be before {date.max.isoformat()}'}), 400
+    if (end - start).days >= SERIES_MAX_DAYS:
+        return jsonify({'error': f'The range may span at most {SERIES_MAX_DAYS} days'}), 400
+    
+    requested_bucket = bucket
+    while bucket_count(start, end, bucket) > max_points and bucket != 'month':
+        bucket = SERIES_BUCKETS[SERIES_BUCKETS.index(bucket) + 1]
+    
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    movements = movement_source(range_start)
+    period = date_bucket(movements.c.created_at, bucket).label('period')
+    query = db.session.query(
+        period,
+        func.sum(case((movements.c.direction == MovementDirection.IN, movements.c.quantity), else_=0)),
+        func.sum(case((movements.c.direction == MovementDirection.OUT, movements.c.quantity), else_=0))
+    ).filter(
+        movements.c.created_at >= range_start,
+        movements.c.created_at < range_end
+    ).group_by(period)
+    if product_id:
+        query = query.filter(movements.c.product_id == product_id)
+    if warehouse_id:
+        query = query.filter(movements.c.warehouse_id == warehouse_id)
+    totals = {row[0]: (row[1] or 0, row[2] or 0) for row in query}
+    
+    # Fill empty buckets, then merge consecutive months when there are still too many
+    periods = bucket_periods(start, end, bucket)
+    group = -(-len(periods) // max_points)
+    points = []
+    for i in range(0, len(periods), group):
+        chunk = periods[i:i + group]
+        total_in = sum(totals.get(day.isoformat(), (0, 0))[0] for day in chunk)
+        total_out = sum(totals.get(day.isoformat(), (0, 0))[1] for day in chunk)
+        points.append({
+            'period': chunk[0].isoformat(),
+            'in': total_in,
+            'out': total_out,
+            'net': total_in - total_out
+        })
+    
+    return jsonify({
+        'bucket': bucket if group == 1 else f'{group} {bucket}s',
+        'requested_bucket': requested_bucket,
+        'downsampled': bucket != requested_bucket or group > 1,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'points': points,
+        'totals': {
+            'in': sum(point['in'] for point in points),
+            'out': sum(point['out'] for point in points),
+            'net': sum(point['net'] for point in points)
+        }
+    })
+
+@reports_bp.route('/abc-xyz', methods=['GET'])
+@jwt_required()
+def abc_xyz_matrix():
+    """Product count and consumption value per ABC x XYZ cell of the latest classification run"""
+    rows = db.session.query(
+        ProductClassification.abc_class, ProductClassification.xyz_class,
+        func.count(ProductClassification.id).label('products'),
+        func.sum(ProductClassification.consumption_value).label('consumption_value'),
+        func.max(ProductClassification.updated_at).label('classified_at')
+    ).group_by(ProductClassification.abc_class, ProductClassification.xyz_class).all()
+    
+    cells = {abc + xyz: {'products': 0, 'consumption_value': 0.0} for abc in 'ABC' for xyz in 'XYZ'}
+    for row in rows:
+        cells[row.abc_class + row.xyz_class] = {
+            'products': row.products,
+            'consumption_value': float(row.consumption_value or 0)
+        }
+    classified_at = max((row.classified_at for row in rows), default=None)
+    
+    return jsonify({
+        'matrix': cells,
+        'products': sum(cell['products'] for cell in cells.values()),
+        'classified_at': classified_at.isoformat() if classified_at else None
+    })
+
 @reports_bp.route('/purchase-summary', methods=['GET'])
 @jwt_required()
 def purchase_summary():
@@ -150,14 +387,12 @@ def purchase_summary():
     
     start_date = datetime.now() - timedelta(days=days)
     
-    # Query with actual purchase values
     query = db.session.query(
         Supplier.id, Supplier.name,
         func.count(PurchaseOrder.id).label('order_count'),
-        func.sum(PurchaseOrderLine.qty * PurchaseOrderLine.unit_price).label('total_value')
-    ).outerjoin(PurchaseOrder, Supplier.id == PurchaseOrder.supplier_id).outerjoin(
-        PurchaseOrderLine, PurchaseOrder.id == PurchaseOrderLine.purchase_order_id
-    ).filter(
+        func.sum(PurchaseOrder.total_qty).label('total_qty'),
+        func.sum(PurchaseOrder.total_value).label('total_value')
+    ).outerjoin(PurchaseOrder, Supplier.id == PurchaseOrder.supplier_id).filter(
         PurchaseOrder.order_date >= start_date
     ).group_by(Supplier.id, Supplier.name)
     
@@ -172,6 +407,7 @@ def purchase_summary():
             'supplier_id': row.id,
             'supplier_name': row.name,
             'order_count': row.order_count,
+            'total_qty': row.total_qty or 0,
             'total_value': float(row.total_value or 0)
         })
     
@@ -186,10 +422,11 @@ def sales_summary():
     
     start_date = datetime.now() - timedelta(days=days)
     
-    # Simplified query without complex joins for now
     query = db.session.query(
         Customer.id, Customer.name,
-        func.count(SalesOrder.id).label('order_count')
+        func.count(SalesOrder.id).label('order_count'),
+        func.sum(SalesOrder.total_qty).label('total_qty'),
+        func.sum(SalesOrder.total_value).label('total_value')
     ).outerjoin(SalesOrder, Customer.id == SalesOrder.customer_id).filter(
         SalesOrder.order_date >= start_date
     ).group_by(Customer.id, Customer.name)
@@ -205,7 +442,8 @@ def sales_summary():
             'customer_id': row.id,
             'customer_name': row.name,
             'order_count': row.order_count,
-            'total_value': 0.0  # Simplified for now
+            'total_qty': row.total_qty or 0,
+            'total_value': float(row.total_value or 0)
         })
     
     return jsonify({'sales_summary': sales_summary})
@@ -215,9 +453,9 @@ def sales_summary():
 def dashboard_data():
     """Get dashboard summary data"""
     # Low stock count
-    low_stock_count = db.session.query(InventoryBalance).join(Product).filter(
-        InventoryBalance.available_qty <= Product.reorder_point
-    ).count()
+    low_stock_count = db.session.query(func.count(InventoryBalance.id)).filter(
+        InventoryBalance.stock_level.in_(LOW_STOCK_LEVELS)
+    ).scalar()
     
     # Total products
     total_products = Product.query.count()
@@ -243,13 +481,14 @@ def dashboard_data():
         SalesOrder.status.in_([SalesOrderStatus.DRAFT, SalesOrderStatus.APPROVED])
     ).count()
     
-    # Total purchase value (last 30 days)
+    # Total purchase and sales value (last 30 days)
     start_date = datetime.now() - timedelta(days=30)
-    total_purchase_value = db.session.query(
-        func.sum(PurchaseOrderLine.qty * PurchaseOrderLine.unit_price)
-    ).join(PurchaseOrder).filter(
+    total_purchase_value = db.session.query(func.sum(PurchaseOrder.total_value)).filter(
         PurchaseOrder.order_date >= start_date
     ).scalar() or 0
+    total_sales_value = db.session.query(func.sum(SalesOrder.total_value)).filter(
+        SalesOrder.order_date >= start_date
+    ).scalar() or 0
     
     return jsonify({
         'low_stock_count': low_stock_count,
@@ -258,5 +497,6 @@ def dashboard_data():
         'recent_movements': recent_movements,
         'pending_purchase_orders': pending_purchase_orders,
         'pending_sales_orders': pending_sales_orders,
-        'total_purchase_value': float(total_purchase_value)
+        'total_purchase_value': float(total_purchase_value),
+        'total_sales_value': float(total_sales_value)
     })
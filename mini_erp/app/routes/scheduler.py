@@ -0,0 +1,124 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from app import db
+from app.models import ScheduledTask, TaskRun
+from app.services.job_queue import check_params, registered_tasks
+from app.services.scheduler import (
+    next_run, start_run, serialize_scheduled_task, serialize_task_run
+)
+from app.utils.auth import admin_required
+from app.utils.pagination import get_per_page
+
+scheduler_bp = Blueprint('scheduler', __name__)
+
+@scheduler_bp.route('/tasks', methods=['GET'])
+@jwt_required()
+def get_scheduled_tasks():
+    """Scheduled tasks with their next run and the latest run"""
+    tasks = ScheduledTask.query.order_by(ScheduledTask.name).all()
+    last_run_ids = dict(db.session.query(
+        TaskRun.scheduled_task_id, db.func.max(TaskRun.id)
+    ).group_by(TaskRun.scheduled_task_id).all())
+    last_runs = {run.id: run for run in TaskRun.query.filter(TaskRun.id.in_(list(last_run_ids.values())))}
+    
+    return jsonify({'scheduled_tasks': [
+        serialize_scheduled_task(task, last_runs.get(last_run_ids.get(task.id))) for task in tasks
+    ]})
+
+@scheduler_bp.route('/tasks', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_scheduled_task():
+    """Create a schedule: {"name", "task", "cron", "params"?, "is_active"?}; cron times are UTC"""
+    data = request.json or {}
+    if not all([data.get('name'), data.get('task'), data.get('cron')]):
+        return jsonify({'error': 'Missing required fields'}), 400
+    if data['task'] not in registered_tasks():
+        return jsonify({'error': f"Unknown task '{data['task']}'"}), 400
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params must be an object'}), 400
+    if ScheduledTask.query.filter_by(name=data['name']).first():
+        return jsonify({'error': 'Scheduled task name already exists'}), 400
+    
+    try:
+        check_params(data['task'], params)
+        scheduled_task = ScheduledTask(
+            name=data['name'],
+            task=data['task'],
+            cron=data['cron'],
+            params_json=json.dumps(params),
+            is_active=bool(data.get('is_active', True)),
+            next_run_at=next_run(data['cron'])
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    db.session.add(scheduled_task)
+    db.session.commit()
+    
+    return jsonify({'scheduled_task': serialize_scheduled_task(scheduled_task)}), 201
+
+@scheduler_bp.route('/tasks/<int:task_id>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def update_scheduled_task(task_id):
+    """Change the cron expression, params or active flag of a schedule"""
+    scheduled_task = ScheduledTask.query.get_or_404(task_id)
+    data = request.json or {}
+    
+    if 'cron' in data:
+        try:
+            scheduled_task.next_run_at = next_run(data['cron'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        scheduled_task.cron = data['cron']
+    if 'params' in data:
+        params = data['params'] or {}
+        if not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+        try:
+            check_params(scheduled_task.task, params)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        scheduled_task.params_json = json.dumps(params)
+    if 'is_active' in data:
+        scheduled_task.is_active = bool(data['is_active'])
+        if scheduled_task.is_active:
+            scheduled_task.next_run_at = next_run(scheduled_task.cron)
+    
+    db.session.commit()
+    
+    return jsonify({'scheduled_task': serialize_scheduled_task(scheduled_task)})
+
+@scheduler_bp.route('/tasks/<int:task_id>/run', methods=['POST'])
+@jwt_required()
+@admin_required
+def run_scheduled_task(task_id):
+    """Run a scheduled task now, outside its schedule"""
+    scheduled_task = ScheduledTask.query.get_or_404(task_id)
+    
+    try:
+        run = start_run(scheduled_task, trigger='manual', user_id=get_jwt_identity())
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    
+    code = 409 if run.job_id is None else 202
+    return jsonify({'run': serialize_task_run(run)}), code
+
+@scheduler_bp.route('/tasks/<int:task_id>/runs', methods=['GET'])
+@jwt_required()
+def get_task_runs(task_id):
+    """Run history of a scheduled task, newest first"""
+    scheduled_task = ScheduledTask.query.get_or_404(task_id)
+    runs = scheduled_task.runs.order_by(TaskRun.id.desc()).limit(get_per_page()).all()
+    
+    finished = [run.duration_seconds for run in runs if run.duration_seconds is not None]
+    return jsonify({
+        'scheduled_task': serialize_scheduled_task(scheduled_task),
+        'runs': [serialize_task_run(run) for run in runs],
+        'average_duration_seconds': round(sum(finished) / len(finished), 3) if finished else None
+    })
@@ -1,11 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import StockMovement, InventoryBalance, Product, Warehouse, User
+from app.models import StockMovement, StockMovementArchive, InventoryBalance, Product, Warehouse, User
 from app.models.stock_movement import MovementDirection, MovementType
+from app.models.stock_level_event import LOW_STOCK_LEVELS
 from marshmallow import Schema, fields, ValidationError
 from sqlalchemy.orm import joinedload
-from datetime import datetime
+from app.utils.pagination import parse_bool_arg, get_per_page, encode_cursor, decode_cursor
+from app.services.movement_archive import movement_source, stock_as_of, archive_cutoff
+from app.services.classification_service import filter_by_class
+from datetime import datetime, timedelta
 
 stock_bp = Blueprint('stock', __name__)
 
@@ -21,12 +25,16 @@ class StockMovementSchema(Schema):
     note = fields.Str(allow_none=True)
     created_at = fields.DateTime(dump_only=True)
     created_by = fields.Int(dump_only=True)
+    archived = fields.Method('get_archived')
     
     # Related data fields
     product = fields.Method('get_product_data')
     warehouse = fields.Method('get_warehouse_data')
     user = fields.Method('get_user_data')
     
+    def get_archived(self, obj):
+        return isinstance(obj, StockMovementArchive)
+    
     def get_product_data(self, obj):
         if hasattr(obj, 'product') and obj.product:
             return {
@@ -55,40 +63,96 @@ class StockMovementSchema(Schema):
 stock_movement_schema = StockMovementSchema()
 stock_movements_schema = StockMovementSchema(many=True)
 
+def parse_datetime_arg(name, end_of_day=False):
+    """Parse an ISO date or datetime query parameter; a bare end date covers the whole day"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    return parsed
+
+def load_movements(ids_in_order):
+    """Load live and archived movements for (id, archived) pairs, keeping their order"""
+    loaded = {}
+    for model, archived in ((StockMovement, False), (StockMovementArchive, True)):
+        ids = [movement_id for movement_id, is_archived in ids_in_order if bool(is_archived) == archived]
+        if ids:
+            for movement in model.query.options(
+                joinedload(model.product), joinedload(model.warehouse), joinedload(model.user)
+            ).filter(model.id.in_(ids)):
+                loaded[(movement.id, archived)] = movement
+    return [loaded[(movement_id, bool(archived))] for movement_id, archived in ids_in_order]
+
 @stock_bp.route('/movements', methods=['GET'])
 @jwt_required()
 def get_stock_movements():
+    """List stock movements, newest first.
+
+    start / end (ISO date or datetime) filter on created_at; archived
+    movements are included only when start is before the archive cutoff.
+    """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     product_id = request.args.get('product_id', type=int)
     warehouse_id = request.args.get('warehouse_id', type=int)
     movement_type = request.args.get('movement_type')
+    try:
+        start = parse_datetime_arg('start')
+        end = parse_datetime_arg('end', end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates or datetimes'}), 400
     
-    query = StockMovement.query
+    source = movement_source(start)
+    query = db.session.query(source.c.id, source.c.archived)
     
     if product_id:
-        query = query.filter_by(product_id=product_id)
+        query = query.filter(source.c.product_id == product_id)
     if warehouse_id:
-        query = query.filter_by(warehouse_id=warehouse_id)
+        query = query.filter(source.c.warehouse_id == warehouse_id)
     if movement_type:
-        query = query.filter_by(movement_type=movement_type)
-    
-    # Load related data
-    movements = query.options(
-        db.joinedload(StockMovement.product),
-        db.joinedload(StockMovement.warehouse),
-        db.joinedload(StockMovement.user)
-    ).order_by(StockMovement.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        query = query.filter(source.c.movement_type == movement_type)
+    if start:
+        query = query.filter(source.c.created_at >= start)
+    if end:
+        query = query.filter(source.c.created_at <= end)
+    
+    total = query.order_by(None).count()
+    rows = query.order_by(source.c.created_at.desc(), source.c.id.desc()).offset(
+        (max(page, 1) - 1) * per_page
+    ).limit(per_page).all()
     
     return jsonify({
-        'movements': stock_movements_schema.dump(movements.items),
-        'total': movements.total,
-        'pages': movements.pages,
+        'movements': stock_movements_schema.dump(load_movements(rows)),
+        'total': total,
+        'pages': (total + per_page - 1) // per_page if per_page > 0 else 0,
         'current_page': page
     })
 
+@stock_bp.route('/as-of', methods=['GET'])
+@jwt_required()
+def get_stock_as_of():
+    """On-hand quantity per product and warehouse at a point in time, from the movement ledger"""
+    try:
+        at = parse_datetime_arg('at', end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'at must be an ISO date or datetime'}), 400
+    if at is None:
+        return jsonify({'error': 'at is required'}), 400
+    product_id = request.args.get('product_id', type=int)
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    
+    quantities = stock_as_of(at, product_id=product_id, warehouse_id=warehouse_id)
+    return jsonify({
+        'at': at,
+        'archive_cutoff': archive_cutoff(),
+        'balances': [
+            {'product_id': key[0], 'warehouse_id': key[1], 'on_hand_qty': quantity}
+            for key, quantity in sorted(quantities.items())
+        ]
+    })
+
 @stock_bp.route('/movements', methods=['POST'])
 @jwt_required()
 def create_stock_movement():
@@ -148,7 +212,9 @@ def create_stock_movement():
     if direction == MovementDirection.IN:
         balance.on_hand_qty += data['quantity']
     else:  # OUT
-        if balance.on_hand_qty < data['quantity']:
+        # Stock reserved for approved sales orders cannot be issued manually
+        if balance.available_qty < data['quantity']:
+            db.session.rollback()
             return jsonify({'error': 'Insufficient stock'}), 400
         balance.on_hand_qty -= data['quantity']
     
@@ -158,47 +224,211 @@ def create_stock_movement():
     
     return jsonify({'movement': stock_movement_schema.dump(movement)}), 201
 
+INVENTORY_COLUMNS = (
+    InventoryBalance.id, InventoryBalance.on_hand_qty, InventoryBalance.reserved_qty,
+    InventoryBalance.available_qty, InventoryBalance.stock_level,
+    Product.id.label('product_id'), Product.sku, Product.name.label('product_name'),
+    Product.unit, Product.category, Product.reorder_point, Product.safety_stock,
+    Warehouse.id.label('warehouse_id'), Warehouse.name.label('warehouse_name'),
+    Warehouse.code.label('warehouse_code')
+)
+
+STREAM_CHUNK_ROWS = 1000
+
+def inventory_row(row):
+    """Build an inventory balance response item from a projected row"""
+    return {
+        'id': row.id,
+        'product': {
+            'id': row.product_id,
+            'sku': row.sku,
+            'name': row.product_name,
+            'unit': row.unit,
+            'category': row.category,
+            'reorder_point': row.reorder_point,
+            'safety_stock': row.safety_stock
+        },
+        'warehouse': {
+            'id': row.warehouse_id,
+            'name': row.warehouse_name,
+            'code': row.warehouse_code
+        },
+        'on_hand_qty': row.on_hand_qty,
+        'reserved_qty': row.reserved_qty,
+        'available_qty': row.available_qty,
+        'stock_level': row.stock_level.value,
+        'is_low_stock': row.stock_level in LOW_STOCK_LEVELS
+    }
+
+def stream_inventory(query):
+    """Stream projected rows as NDJSON without buffering the result set"""
+    dumps = current_app.json.dumps
+    
+    def generate():
+        chunk = []
+        for row in query.execution_options(yield_per=STREAM_CHUNK_ROWS):
+            chunk.append(dumps(inventory_row(row)))
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @stock_bp.route('/inventory', methods=['GET'])
 @jwt_required()
 def get_inventory_balances():
+    """List inventory balances.
+
+    Filters: warehouse_id, category, low_stock, abc_class / xyz_class
+    (e.g. A or A,B). Paging: page / per_page, or
+    cursor for keyset paging; without paging parameters every row is
+    returned. format=ndjson streams every matching row, one JSON object per line.
+    """
     warehouse_id = request.args.get('warehouse_id', type=int)
-    low_stock = request.args.get('low_stock', type=bool)
+    category = request.args.get('category')
+    try:
+        low_stock = parse_bool_arg('low_stock')
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
     
-    query = InventoryBalance.query.join(Product).join(Warehouse)
+    query = db.session.query(*INVENTORY_COLUMNS).select_from(InventoryBalance).join(
+        Product, InventoryBalance.product_id == Product.id
+    ).join(Warehouse, InventoryBalance.warehouse_id == Warehouse.id)
     
     if warehouse_id:
         query = query.filter(InventoryBalance.warehouse_id == warehouse_id)
     
+    if category:
+        query = query.filter(Product.category == category)
+    
     if low_stock:
-        query = query.filter(InventoryBalance.available_qty <= Product.reorder_point)
-    
-    balances = query.all()
-    
-    result = []
-    for balance in balances:
-        balance_data = {
-            'id': balance.id,
-            'product': {
-                'id': balance.product.id,
-                'sku': balance.product.sku,
-                'name': balance.product.name,
-                'unit': balance.product.unit,
-                'reorder_point': balance.product.reorder_point,
-                'safety_stock': balance.product.safety_stock
-            },
-            'warehouse': {
-                'id': balance.warehouse.id,
-                'name': balance.warehouse.name,
-                'code': balance.warehouse.code
-            },
-            'on_hand_qty': balance.on_hand_qty,
-            'reserved_qty': balance.reserved_qty,
-            'available_qty': balance.available_qty,
-            'is_low_stock': balance.available_qty <= balance.product.reorder_point
-        }
-        result.append(balance_data)
-    
-    return jsonify({'inventory_balances': result})
+        query = query.filter(InventoryBalance.stock_level.in_(LOW_STOCK_LEVELS))
+    
+    try:
+        query = filter_by_class(query, Product.id, request.args.get('abc_class'), request.args.get('xyz_class'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    
+    query = query.order_by(InventoryBalance.id)
+    
+    if request.args.get('format') == 'ndjson':
+        return stream_inventory(query)
+    
+    if 'cursor' in request.args:
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                (last_id,) = decode_cursor(cursor)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(InventoryBalance.id > last_id)
+        
+        per_page = get_per_page()
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        return jsonify({
+            'inventory_balances': [inventory_row(row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1].id) if has_more else None,
+            'per_page': per_page
+        })
+    
+    if 'page' in request.args or 'per_page' in request.args:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = get_per_page()
+        total = query.order_by(None).count()
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
+        return jsonify({
+            'inventory_balances': [inventory_row(row) for row in rows],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page,
+            'per_page': per_page
+        })
+    
+    return jsonify({'inventory_balances': [inventory_row(row) for row in query.all()]})
+
+MAX_AVAILABILITY_LINES = 1000
+
+def load_availability(product_ids, warehouse_id=None):
+    """{product_id: {warehouse_id: (on_hand, reserved, available)}} with one read of the balance index"""
+    availability = {product_id: {} for product_id in product_ids}
+    if not availability:
+        return availability
+    query = db.session.query(
+        InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.on_hand_qty,
+        InventoryBalance.reserved_qty, InventoryBalance.available_qty
+    ).filter(InventoryBalance.product_id.in_(list(availability)))
+    if warehouse_id:
+        query = query.filter(InventoryBalance.warehouse_id == warehouse_id)
+    for product_id, balance_warehouse_id, on_hand, reserved, available in query:
+        availability[product_id][balance_warehouse_id] = (on_hand, reserved, available)
+    return availability
+
+@stock_bp.route('/availability', methods=['GET'])
+@jwt_required()
+def get_availability():
+    """Per-warehouse availability for ?product_ids=1,2,3 (optionally &warehouse_id=)"""
+    try:
+        product_ids = [int(value) for value in request.args.get('product_ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'product_ids must be a comma separated list of ids'}), 400
+    if not product_ids or len(product_ids) > MAX_AVAILABILITY_LINES:
+        return jsonify({'error': f'Provide between 1 and {MAX_AVAILABILITY_LINES} product_ids'}), 400
+    
+    availability = load_availability(product_ids, request.args.get('warehouse_id', type=int))
+    return jsonify({'availability': [{
+        'product_id': product_id,
+        'on_hand_qty': sum(values[0] for values in warehouses.values()),
+        'reserved_qty': sum(values[1] for values in warehouses.values()),
+        'available_qty': sum(values[2] for values in warehouses.values()),
+        'warehouses': [
+            {'warehouse_id': warehouse_id, 'on_hand_qty': on_hand, 'reserved_qty': reserved, 'available_qty': available}
+            for warehouse_id, (on_hand, reserved, available) in sorted(warehouses.items())
+        ]
+    } for product_id, warehouses in availability.items()]})
+
+@stock_bp.route('/availability/check', methods=['POST'])
+@jwt_required()
+def check_availability():
+    """Validate order lines against available (unreserved) stock.
+
+    Body: {"lines": [{"product_id", "qty", "warehouse_id"?}], "warehouse_id"?}
+    Quantities of repeated products are checked together.
+    """
+    data = request.json or {}
+    lines = data.get('lines')
+    if not isinstance(lines, list) or not lines or len(lines) > MAX_AVAILABILITY_LINES:
+        return jsonify({'error': f'lines must be a list of 1 to {MAX_AVAILABILITY_LINES} items'}), 400
+    
+    requested = {}
+    for line in lines:
+        if not isinstance(line, dict) or not isinstance(line.get('product_id'), int) \
+                or not isinstance(line.get('qty'), int) or line['qty'] <= 0:
+            return jsonify({'error': 'Each line needs an integer product_id and a positive integer qty', 'line': line}), 400
+        key = (line['product_id'], line.get('warehouse_id') or data.get('warehouse_id'))
+        requested[key] = requested.get(key, 0) + line['qty']
+    
+    availability = load_availability({product_id for product_id, _ in requested})
+    results = []
+    for (product_id, warehouse_id), qty in requested.items():
+        warehouses = availability[product_id]
+        if warehouse_id:
+            available = warehouses.get(warehouse_id, (0, 0, 0))[2]
+        else:
+            available = sum(values[2] for values in warehouses.values())
+        results.append({
+            'product_id': product_id,
+            'warehouse_id': warehouse_id,
+            'requested_qty': qty,
+            'available_qty': available,
+            'shortage_qty': max(qty - available, 0),
+            'available': available >= qty
+        })
+    
+    return jsonify({'all_available': all(result['available'] for result in results), 'lines': results})
 
 @stock_bp.route('/transfer', methods=['POST'])
 @jwt_required()
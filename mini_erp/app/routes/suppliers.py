@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app import db
 from app.models import Supplier
+from app.utils.caching import conditional_get
+from app.utils.pagination import list_by_name
 from marshmallow import Schema, fields, ValidationError
 
 suppliers_bp = Blueprint('suppliers', __name__)
@@ -20,9 +22,9 @@ suppliers_schema = SupplierSchema(many=True)
 
 @suppliers_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_get(Supplier)
 def get_suppliers():
-    suppliers = Supplier.query.all()
-    return jsonify({'suppliers': suppliers_schema.dump(suppliers)})
+    return list_by_name(Supplier, suppliers_schema, 'suppliers')
 
 @suppliers_bp.route('/<int:supplier_id>', methods=['GET'])
 @jwt_required()
@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app import db
 from app.models import Warehouse
+from app.utils.caching import conditional_get
+from app.utils.pagination import list_by_name
+from app.services.movement_archive import has_movement_history
 from marshmallow import Schema, fields, ValidationError
 
 warehouses_bp = Blueprint('warehouses', __name__)
@@ -18,9 +21,9 @@ warehouses_schema = WarehouseSchema(many=True)
 
 @warehouses_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional_get(Warehouse)
 def get_warehouses():
-    warehouses = Warehouse.query.all()
-    return jsonify({'warehouses': warehouses_schema.dump(warehouses)})
+    return list_by_name(Warehouse, warehouses_schema, 'warehouses')
 
 @warehouses_bp.route('/<int:warehouse_id>', methods=['GET'])
 @jwt_required()
@@ -74,7 +77,7 @@ def delete_warehouse(warehouse_id):
     warehouse = Warehouse.query.get_or_404(warehouse_id)
     
     # Check if warehouse has stock movements
-    if warehouse.stock_movements.count() > 0:
+    if has_movement_history(warehouse_id=warehouse.id):
         return jsonify({'error': 'Cannot delete warehouse with stock movements'}), 400
     
     db.session.delete(warehouse)
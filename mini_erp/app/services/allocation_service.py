@@ -0,0 +1,316 @@
+"""
+Allocation Service
+Allocates open sales order lines to warehouse stock, reserves it on approval
+and ships it in waves. Open lines, their reservations and the availability of
+all their products across all active warehouses are loaded with one query
+each; allocation then runs in memory, in order sequence, so earlier orders in
+a wave are served first. Shipments consume a line's own reservations before
+any free stock.
+
+Strategies:
+    single_warehouse  ship an order from one warehouse where possible, split
+                      only the lines that warehouse cannot cover
+    nearest           take stock from warehouses in priority order
+    fewest_splits     per line, prefer one warehouse that covers it fully,
+                      otherwise the warehouses with the most stock
+"""
+
+from collections import namedtuple
+from sqlalchemy import bindparam, case, func, insert, update
+from app import db
+from app.models import InventoryBalance, SalesOrder, SalesOrderLine, StockReservation, Warehouse
+from app.models.sales_order import SalesOrderStatus
+from app.models.stock_reservation import ReservationEntryType
+from app.models.stock_movement import MovementDirection, MovementType
+from app.services.stock_posting import post_movements
+
+STRATEGIES = ('single_warehouse', 'nearest', 'fewest_splits')
+SHIPPABLE_STATUSES = (SalesOrderStatus.APPROVED, SalesOrderStatus.PARTIALLY_SHIPPED)
+
+OpenLine = namedtuple('OpenLine', 'id sales_order_id product_id open_qty')
+
+class AllocationService:
+    def __init__(self, strategy='single_warehouse', warehouse_priority=None, allow_partial=True):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown allocation strategy '{strategy}'")
+        self.strategy = strategy
+        # Warehouse ids ranked nearest first; unlisted warehouses follow by id
+        self.warehouse_priority = list(warehouse_priority or [])
+        self.allow_partial = allow_partial
+
+    def _rank(self, warehouse_id):
+        if warehouse_id in self.warehouse_priority:
+            return (0, self.warehouse_priority.index(warehouse_id))
+        return (1, warehouse_id)
+
+    def load_orders(self, order_ids):
+        """Shippable orders in wave sequence (order date, id) with their open lines"""
+        orders = db.session.query(SalesOrder.id, SalesOrder.order_no).filter(
+            SalesOrder.id.in_(order_ids), SalesOrder.status.in_(SHIPPABLE_STATUSES)
+        ).order_by(SalesOrder.order_date, SalesOrder.id).all()
+
+        lines = {order.id: [] for order in orders}
+        if lines:
+            for line in db.session.query(
+                SalesOrderLine.id, SalesOrderLine.sales_order_id, SalesOrderLine.product_id,
+                (SalesOrderLine.qty - SalesOrderLine.shipped_qty).label('open_qty')
+            ).filter(
+                SalesOrderLine.sales_order_id.in_(list(lines)),
+                SalesOrderLine.shipped_qty < SalesOrderLine.qty
+            ).order_by(SalesOrderLine.id):
+                lines[line.sales_order_id].append(OpenLine(*line))
+        return orders, lines
+
+    def load_reservations(self, line_ids):
+        """{line_id: {warehouse_id: open reserved qty}} summed from the ledger"""
+        reservations = {}
+        if not line_ids:
+            return reservations
+        rows = db.session.query(
+            StockReservation.sales_order_line_id, StockReservation.warehouse_id, func.sum(StockReservation.qty)
+        ).filter(
+            StockReservation.sales_order_line_id.in_(list(line_ids))
+        ).group_by(
+            StockReservation.sales_order_line_id, StockReservation.warehouse_id
+        ).having(func.sum(StockReservation.qty) > 0)
+        for line_id, warehouse_id, qty in rows:
+            reservations.setdefault(line_id, {})[warehouse_id] = qty
+        return reservations
+
+    def load_availability(self, product_ids):
+        """{product_id: {warehouse_id: available_qty}} over active warehouses"""
+        availability = {product_id: {} for product_id in product_ids}
+        if not availability:
+            return availability
+        rows = db.session.query(
+            InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.available_qty
+        ).join(Warehouse, InventoryBalance.warehouse_id == Warehouse.id).filter(
+            InventoryBalance.product_id.in_(list(availability)),
+            InventoryBalance.available_qty > 0,
+            Warehouse.is_active.is_(True)
+        )
+        for product_id, warehouse_id, available_qty in rows:
+            availability[product_id][warehouse_id] = available_qty
+        return availability
+
+    def _take(self, line, qty, warehouse_ids, stock, allocations, reserved=False):
+        """Take up to qty from stock ({warehouse_id: qty}) in the given warehouse order.
+
+        Allocations are (line, warehouse_id, qty, reserved_qty), where
+        reserved_qty is the part covered by the line's own reservation.
+        """
+        for warehouse_id in warehouse_ids:
+            if qty <= 0:
+                break
+            taken = min(qty, stock.get(warehouse_id, 0))
+            if taken > 0:
+                stock[warehouse_id] -= taken
+                allocations.append((line, warehouse_id, taken, taken if reserved else 0))
+                qty -= taken
+        return qty
+
+    def _allocate_line(self, line, qty, stock, allocations):
+        by_priority = sorted(stock, key=self._rank)
+        if self.strategy == 'nearest':
+            return self._take(line, qty, by_priority, stock, allocations)
+
+        covering = [warehouse_id for warehouse_id in by_priority if stock[warehouse_id] >= qty]
+        if covering:
+            return self._take(line, qty, covering[:1], stock, allocations)
+        by_stock = sorted(stock, key=lambda warehouse_id: (-stock[warehouse_id], self._rank(warehouse_id)))
+        return self._take(line, qty, by_stock, stock, allocations)
+
+    def _single_warehouse(self, lines, availability):
+        """Warehouse covering the most lines of the order in full (then most quantity)"""
+        scores = {}
+        for line in lines:
+            for warehouse_id, available in availability[line.product_id].items():
+                covered, quantity = scores.get(warehouse_id, (0, 0))
+                scores[warehouse_id] = (covered + (available >= line.open_qty), quantity + min(available, line.open_qty))
+        if not scores:
+            return None
+        return min(scores, key=lambda warehouse_id: (
+            -scores[warehouse_id][0], -scores[warehouse_id][1], self._rank(warehouse_id)
+        ))
+
+    def allocate_order(self, lines, availability, reservations=None):
+        """Allocate one order's open lines; returns (allocations, backorders).
+
+        A line first takes from its own reservations, then from free stock.
+        availability is consumed in place so later orders see what is left.
+        Without allow_partial an order that cannot be covered in full gets no
+        allocation at all.
+        """
+        reservations = reservations or {}
+        snapshot = {line.product_id: dict(availability[line.product_id]) for line in lines}
+        allocations, backorders = [], []
+
+        home = self._single_warehouse(lines, availability) if self.strategy == 'single_warehouse' else None
+        for line in lines:
+            qty = line.open_qty
+            reserved = reservations.get(line.id)
+            if reserved:
+                qty = self._take(line, qty, sorted(reserved, key=self._rank), dict(reserved), allocations, True)
+            stock = availability[line.product_id]
+            if home is not None and stock.get(home, 0) >= qty:
+                qty = self._take(line, qty, [home], stock, allocations)
+            else:
+                qty = self._allocate_line(line, qty, stock, allocations)
+            if qty > 0:
+                backorders.append((line, qty))
+
+        if backorders and not self.allow_partial:
+            availability.update(snapshot)
+            return [], [(line, line.open_qty) for line in lines]
+        return allocations, backorders
+
+    def plan(self, order_ids, for_reservation=False):
+        """Allocate a wave of orders; returns a list of per-order plans.
+
+        For shipping, reserved stock is used first. For reservation, each
+        line only asks for the quantity it has not reserved yet and is
+        allocated from free stock.
+        """
+        orders, lines = self.load_orders(order_ids)
+        reservations = self.load_reservations(
+            {line.id for order_lines in lines.values() for line in order_lines}
+        )
+        if for_reservation:
+            for order_id, order_lines in lines.items():
+                lines[order_id] = [
+                    line._replace(open_qty=line.open_qty - sum(reservations.get(line.id, {}).values()))
+                    for line in order_lines
+                ]
+                lines[order_id] = [line for line in lines[order_id] if line.open_qty > 0]
+            reservations = {}
+
+        availability = self.load_availability(
+            {line.product_id for order_lines in lines.values() for line in order_lines}
+        )
+
+        plans = []
+        for order in orders:
+            allocations, backorders = self.allocate_order(lines[order.id], availability, reservations)
+            plans.append({'order': order, 'allocations': allocations, 'backorders': backorders})
+        return plans
+
+    @staticmethod
+    def _ledger_entries(plans, entry_type, sign, user_id, reserved_only):
+        entries = []
+        for plan in plans:
+            for line, warehouse_id, qty, reserved_qty in plan['allocations']:
+                qty = reserved_qty if reserved_only else qty
+                if qty > 0:
+                    entries.append({
+                        'sales_order_id': plan['order'].id,
+                        'sales_order_line_id': line.id,
+                        'product_id': line.product_id,
+                        'warehouse_id': warehouse_id,
+                        'entry_type': entry_type,
+                        'qty': sign * qty,
+                        'created_by': user_id
+                    })
+        return entries
+
+    def reserve(self, order_ids, user_id=None):
+        """Reserve free stock for the unreserved open quantity of approved orders.
+
+        Ledger entries are inserted in bulk and reserved_qty / available_qty
+        are moved with guarded delta updates, so concurrent approvals cannot
+        promise the same stock twice. The caller commits.
+        """
+        plans = self.plan(order_ids, for_reservation=True)
+        entries = self._ledger_entries(plans, ReservationEntryType.RESERVE, 1, user_id, reserved_only=False)
+        if entries:
+            db.session.execute(insert(StockReservation), entries)
+            reserved_deltas = {}
+            for entry in entries:
+                key = (entry['product_id'], entry['warehouse_id'])
+                reserved_deltas[key] = reserved_deltas.get(key, 0) + entry['qty']
+            post_movements([], reserved_deltas=reserved_deltas, guard=True)
+        return plans
+
+    def ship(self, order_ids, user_id=None, dry_run=False):
+        """Plan a wave and post the shipments in one transaction.
+
+        Movements, consumed reservations and balance deltas are posted in bulk
+        with the availability guard, shipped quantities are updated with one executemany and order
+        statuses come from one grouped aggregate. The caller commits.
+        """
+        plans = self.plan(order_ids)
+        if dry_run:
+            return plans
+
+        movements = []
+        shipped_by_line = {}
+        reserved_deltas = {}
+        for plan in plans:
+            order = plan['order']
+            for line, warehouse_id, qty, reserved_qty in plan['allocations']:
+                movements.append({
+                    'product_id': line.product_id,
+                    'warehouse_id': warehouse_id,
+                    'direction': MovementDirection.OUT,
+                    'quantity': qty,
+                    'movement_type': MovementType.SALES,
+                    'ref_document_no': order.order_no,
+                    'ref_line_id': line.id,
+                    'note': f"Sales shipment - {order.order_no}",
+                    'created_by': user_id
+                })
+                shipped_by_line[line.id] = shipped_by_line.get(line.id, 0) + qty
+                if reserved_qty:
+                    key = (line.product_id, warehouse_id)
+                    reserved_deltas[key] = reserved_deltas.get(key, 0) - reserved_qty
+        if not movements:
+            return plans
+
+        consumed = self._ledger_entries(plans, ReservationEntryType.CONSUME, -1, user_id, reserved_only=True)
+        if consumed:
+            db.session.execute(insert(StockReservation), consumed)
+        post_movements(movements, reserved_deltas=reserved_deltas, guard=True)
+
+        line_table = SalesOrderLine.__table__
+        shipped = line_table.c.shipped_qty + bindparam('delta')
+        db.session.execute(
+            update(line_table).where(line_table.c.id == bindparam('line_id')).values(
+                shipped_qty=shipped,
+                status=case((shipped >= line_table.c.qty, 'Shipped'), else_='Backordered')
+            ),
+            [{'line_id': line_id, 'delta': qty} for line_id, qty in shipped_by_line.items()]
+        )
+        shipped_orders = {plan['order'].id for plan in plans if plan['allocations']}
+        db.session.execute(
+            update(line_table).where(
+                line_table.c.sales_order_id.in_(shipped_orders),
+                line_table.c.shipped_qty < line_table.c.qty
+            ).values(status='Backordered')
+        )
+
+        totals = db.session.query(
+            SalesOrderLine.sales_order_id, func.sum(SalesOrderLine.qty), func.sum(SalesOrderLine.shipped_qty)
+        ).filter(SalesOrderLine.sales_order_id.in_(shipped_orders)).group_by(SalesOrderLine.sales_order_id)
+        db.session.execute(update(SalesOrder), [
+            {'id': order_id,
+             'status': SalesOrderStatus.CLOSED if total_shipped >= total_qty else SalesOrderStatus.PARTIALLY_SHIPPED}
+            for order_id, total_qty, total_shipped in totals
+        ])
+        return plans
+
+def serialize_plan(plan):
+    order = plan['order']
+    return {
+        'order_id': order.id,
+        'order_no': order.order_no,
+        'allocations': [
+            {'line_id': line.id, 'product_id': line.product_id, 'warehouse_id': warehouse_id,
+             'qty': qty, 'reserved_qty': reserved_qty}
+            for line, warehouse_id, qty, reserved_qty in plan['allocations']
+        ],
+        'backorders': [
+            {'line_id': line.id, 'product_id': line.product_id, 'qty': qty}
+            for line, qty in plan['backorders']
+        ],
+        'warehouses': sorted({allocation[1] for allocation in plan['allocations']}),
+        'fully_allocated': not plan['backorders']
+    }
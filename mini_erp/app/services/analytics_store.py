@@ -0,0 +1,355 @@
+"""
+Analytics Store
+Columnar Parquet sidecar of the fact tables for analytics. sync() exports
+rows changed since each fact's updated_at watermark (re-scanning a safety
+window for late commits) into month partitions (by created_at) under
+ANALYTICS_STORE_DIR:
+
+    <root>/<fact>/month=YYYY-MM/part-<written at>-<first id>-<last id>.parquet
+    <root>/_manifest.json        watermarks and sync statistics
+
+A re-exported row (e.g. a line whose order was approved) is written again
+in a newer file; readers keep the copy with the latest updated_at and
+compaction merges a partition's files once they pile up. Readers load only
+the requested columns, memory-mapped, and never touch the database.
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, and_, case, or_, select, union_all
+from app import db
+from app.models import (
+    StockMovement, StockMovementArchive, SalesOrder, SalesOrderLine, PurchaseOrder, PurchaseOrderLine
+)
+from app.models.stock_movement import MovementType
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+
+MANIFEST = '_manifest.json'
+SYNC_BATCH_ROWS = 50000
+COMPACT_AFTER_FILES = 8
+
+def _movements():
+    """Live and archived movements; archival does not change updated_at, so archived rows are not re-exported"""
+    columns = ('id', 'product_id', 'warehouse_id', 'direction', 'movement_type', 'quantity',
+               'ref_document_no', 'ref_line_id', 'created_by', 'created_at', 'updated_at')
+    hot, archive = StockMovement.__table__, StockMovementArchive.__table__
+    return union_all(
+        select(*[hot.c[name] for name in columns]),
+        select(*[archive.c[name] for name in columns])
+    ).subquery('stock_movements')
+
+def _latest(*columns):
+    latest = columns[0]
+    for column in columns[1:]:
+        latest = case((column > latest, column), else_=latest)
+    return latest
+
+def _sales_order_lines():
+    return select(
+        SalesOrderLine.id, SalesOrderLine.sales_order_id, SalesOrder.order_no, SalesOrder.customer_id,
+        SalesOrder.order_date, SalesOrder.status.label('order_status'), SalesOrderLine.product_id,
+        SalesOrderLine.qty, SalesOrderLine.shipped_qty, SalesOrderLine.unit_price,
+        SalesOrderLine.status.label('line_status'), SalesOrderLine.created_at,
+        _latest(SalesOrderLine.updated_at, SalesOrder.updated_at).label('updated_at')
+    ).join(SalesOrder, SalesOrderLine.sales_order_id == SalesOrder.id).subquery('sales_order_lines')
+
+def _purchase_order_lines():
+    return select(
+        PurchaseOrderLine.id, PurchaseOrderLine.purchase_order_id, PurchaseOrder.order_no,
+        PurchaseOrder.supplier_id, PurchaseOrder.order_date, PurchaseOrder.status.label('order_status'),
+        PurchaseOrderLine.product_id, PurchaseOrderLine.qty, PurchaseOrderLine.received_qty,
+        PurchaseOrderLine.unit_price, PurchaseOrderLine.status.label('line_status'), PurchaseOrderLine.created_at,
+        _latest(PurchaseOrderLine.updated_at, PurchaseOrder.updated_at).label('updated_at')
+    ).join(PurchaseOrder, PurchaseOrderLine.purchase_order_id == PurchaseOrder.id).subquery('purchase_order_lines')
+
+def _receipts():
+    """Purchase receipts: PURCHASE movements with the price and supplier of their order line"""
+    movements = _movements()
+    return select(
+        movements.c.id, movements.c.product_id, movements.c.warehouse_id, movements.c.quantity,
+        movements.c.ref_document_no, PurchaseOrderLine.purchase_order_id,
+        movements.c.ref_line_id.label('purchase_order_line_id'), PurchaseOrder.supplier_id,
+        PurchaseOrderLine.unit_price, movements.c.created_at, movements.c.updated_at
+    ).join(PurchaseOrderLine, movements.c.ref_line_id == PurchaseOrderLine.id).join(
+        PurchaseOrder, PurchaseOrderLine.purchase_order_id == PurchaseOrder.id
+    ).where(movements.c.movement_type == MovementType.PURCHASE).subquery('receipts')
+
+# Fact name -> builder of a selectable with at least id, created_at and updated_at
+FACTS = {
+    'stock_movements': _movements,
+    'sales_order_lines': _sales_order_lines,
+    'purchase_order_lines': _purchase_order_lines,
+    'receipts': _receipts,
+}
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, (Numeric, Float)):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+def _convert(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+class AnalyticsStore:
+    def __init__(self, root='analytics_store', window_seconds=3600):
+        self.root = root
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return pq is not None
+
+    def _require_pyarrow(self):
+        if pq is None:
+            raise RuntimeError('The analytics store needs pyarrow (pip install pyarrow)')
+
+    # Manifest
+
+    def manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(path + '.tmp', path)
+
+    # Export
+
+    def schema(self, source):
+        return pa.schema([(column.name, _arrow_type(column.type)) for column in source.columns])
+
+    def _write_partition(self, fact, month, schema, rows):
+        directory = os.path.join(self.root, fact, f'month={month}')
+        os.makedirs(directory, exist_ok=True)
+        names = schema.names
+        columns = list(zip(*rows))
+        table = pa.Table.from_arrays(
+            [pa.array([_convert(value) for value in column], type=schema.field(name).type)
+             for name, column in zip(names, columns)],
+            schema=schema
+        )
+        first, last = rows[0][names.index('id')], rows[-1][names.index('id')]
+        path = os.path.join(directory, f"part-{datetime.utcnow():%Y%m%d%H%M%S%f}-{first}-{last}.parquet")
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+        return path
+
+    def sync_fact(self, fact, manifest):
+        """Export rows of one fact changed since its watermark.
+
+        updated_at is stamped at flush, not at commit, so a row can become
+        visible after rows with later timestamps were exported. Each sync
+        therefore re-scans ``window_seconds`` before the watermark; rows of
+        that window already exported (kept as id -> updated_at in the
+        manifest) are skipped, so only late commits are written again.
+        """
+        source = FACTS[fact]()
+        schema = self.schema(source)
+        names = schema.names
+        state = manifest.get(fact, {})
+        watermark = datetime.fromisoformat(state['updated_at']) if state.get('updated_at') else None
+        recent = dict(state.get('recent', {}))
+        exported, files = 0, 0
+        created, updated, key = names.index('created_at'), names.index('updated_at'), names.index('id')
+
+        cursor = None
+        start = watermark - timedelta(seconds=self.window_seconds) if watermark is not None else None
+        while True:
+            query = select(source)
+            if cursor is not None:
+                query = query.where(or_(
+                    source.c.updated_at > cursor[0],
+                    and_(source.c.updated_at == cursor[0], source.c.id > cursor[1])
+                ))
+            elif start is not None:
+                query = query.where(source.c.updated_at > start)
+            rows = db.session.execute(
+                query.order_by(source.c.updated_at, source.c.id).limit(SYNC_BATCH_ROWS)
+            ).all()
+            if not rows:
+                break
+            cursor = rows[-1][updated], rows[-1][key]
+
+            by_month = {}
+            for row in rows:
+                stamp = row[updated].isoformat()
+                if recent.get(str(row[key])) == stamp:
+                    continue
+                recent[str(row[key])] = stamp
+                by_month.setdefault(row[created].strftime('%Y-%m'), []).append(row)
+                exported += 1
+            for month, month_rows in by_month.items():
+                self._write_partition(fact, month, schema, month_rows)
+                files += 1
+            if watermark is None or cursor[0] > watermark:
+                watermark = cursor[0]
+            if len(rows) < SYNC_BATCH_ROWS:
+                break
+
+        if watermark is not None:
+            horizon = (watermark - timedelta(seconds=self.window_seconds)).isoformat()
+            recent = {row_id: stamp for row_id, stamp in recent.items() if stamp > horizon}
+        manifest[fact] = {
+            'updated_at': watermark.isoformat() if watermark else None,
+            'recent': recent,
+            'synced_at': datetime.utcnow().isoformat(),
+            'rows_exported': state.get('rows_exported', 0) + exported
+        }
+        return {'rows': exported, 'files': files}
+
+    def sync(self, facts=None):
+        """Incrementally export every fact (or the given ones); returns per-fact counts"""
+        self._require_pyarrow()
+        with self._lock:
+            manifest = self.manifest()
+            summary = {}
+            for fact in facts or FACTS:
+                summary[fact] = self.sync_fact(fact, manifest)
+                self._save_manifest(manifest)
+            for fact in facts or FACTS:
+                summary[fact]['compacted'] = self.compact(fact)
+            return summary
+
+    def compact(self, fact, min_files=COMPACT_AFTER_FILES):
+        """Merge partitions with at least ``min_files`` files into one deduplicated file"""
+        compacted = 0
+        for month, paths in self.partitions(fact).items():
+            if len(paths) < min_files:
+                continue
+            table = self._dedupe(pa.concat_tables([pq.read_table(path, memory_map=True) for path in paths]))
+            directory = os.path.dirname(paths[0])
+            target = os.path.join(directory, f'part-{datetime.utcnow():%Y%m%d%H%M%S%f}-compacted.parquet')
+            pq.write_table(table, target + '.tmp', compression='zstd')
+            os.replace(target + '.tmp', target)
+            for path in paths:
+                os.remove(path)
+            compacted += 1
+        return compacted
+
+    # Read
+
+    def partitions(self, fact):
+        """{month: [parquet paths, oldest first]}"""
+        fact_dir = os.path.join(self.root, fact)
+        if not os.path.isdir(fact_dir):
+            return {}
+        partitions = {}
+        for name in sorted(os.listdir(fact_dir)):
+            if name.startswith('month='):
+                directory = os.path.join(fact_dir, name)
+                paths = sorted(
+                    os.path.join(directory, file) for file in os.listdir(directory) if file.endswith('.parquet')
+                )
+                if paths:
+                    partitions[name[len('month='):]] = paths
+        return partitions
+
+    @staticmethod
+    def _dedupe(table):
+        """Keep the latest copy (by updated_at) of each id"""
+        if table.num_rows == 0:
+            return table
+        frame = table.select(['id', 'updated_at']).to_pandas()
+        keep = frame.sort_values(['updated_at']).drop_duplicates('id', keep='last').index.sort_values()
+        return table.take(pa.array(keep.to_numpy()))
+
+    def load_table(self, fact, columns=None, start=None, end=None, filters=None):
+        """Arrow table of a fact restricted to created_at months in [start, end].
+
+        Only ``columns`` are read (id and updated_at are added for
+        de-duplication), memory-mapped; ``filters`` are pyarrow predicates
+        such as [('product_id', 'in', [1, 2])].
+        """
+        self._require_pyarrow()
+        months = self.partitions(fact)
+        if start is not None:
+            months = {month: paths for month, paths in months.items() if month >= f'{start:%Y-%m}'}
+        if end is not None:
+            months = {month: paths for month, paths in months.items() if month <= f'{end:%Y-%m}'}
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + ['id', 'updated_at', 'created_at']))
+        predicates = list(filters or [])
+        if start is not None:
+            predicates.append(('created_at', '>=', _as_datetime(start)))
+        if end is not None:
+            predicates.append(('created_at', '<=', _as_datetime(end, end_of_day=True)))
+
+        tables = [
+            pq.read_table(path, columns=read_columns, memory_map=True, filters=predicates or None)
+            for paths in months.values() for path in paths
+        ]
+        if not tables:
+            source = FACTS[fact]()
+            schema = self.schema(source)
+            if read_columns is not None:
+                schema = pa.schema([schema.field(name) for name in read_columns])
+            return schema.empty_table()
+        table = self._dedupe(pa.concat_tables(tables))
+        if columns is not None:
+            table = table.select(list(columns))
+        return table
+
+    def load_frame(self, fact, columns=None, start=None, end=None, filters=None):
+        """pandas DataFrame of a fact (see load_table)"""
+        return self.load_table(fact, columns, start, end, filters).to_pandas()
+
+    def load_arrays(self, fact, columns, start=None, end=None, filters=None):
+        """{column: NumPy array} of a fact (see load_table)"""
+        table = self.load_table(fact, columns, start, end, filters)
+        return {name: table.column(name).to_numpy() for name in columns}
+
+    def status(self):
+        manifest = self.manifest()
+        return {
+            'available': self.available(),
+            'root': self.root,
+            'facts': {
+                fact: dict(manifest.get(fact, {}), partitions=len(self.partitions(fact)))
+                for fact in FACTS
+            }
+        }
+
+def _as_datetime(value, end_of_day=False):
+    if isinstance(value, datetime) or not isinstance(value, date):
+        return value
+    value = datetime(value.year, value.month, value.day)
+    return value + timedelta(days=1) - timedelta(microseconds=1) if end_of_day else value
+
+def get_analytics_store():
+    from flask import current_app
+    store = current_app.extensions.get('analytics_store')
+    if store is None:
+        store = current_app.extensions['analytics_store'] = AnalyticsStore(
+            current_app.config.get('ANALYTICS_STORE_DIR', 'analytics_store'),
+            current_app.config.get('ANALYTICS_SYNC_WINDOW_SECONDS', 3600)
+        )
+    return store
@@ -0,0 +1,390 @@
+"""
+Audit Log Writer
+Records CREATE / UPDATE / DELETE entries for business models. Changes are
+captured in session events from SQLAlchemy attribute history (unit of work)
+or, for set-based INSERT / UPDATE / DELETE statements, from RETURNING ids
+and the rows the statement touches, held on the session until commit and then handed to a buffered
+background thread that bulk-inserts them in batches on its own connection
+into the monthly partitions of AuditStorage. Rolled back changes are never
+audited.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from flask import current_app, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import Column, event, inspect, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from app.models import (
+    User, Product, Warehouse, Supplier, Customer, PurchaseOrder, PurchaseOrderLine,
+    SalesOrder, SalesOrderLine, ReorderRule, InventoryBalance, StockMovement, StockReservation,
+    ScheduledTask
+)
+from app.services.audit_storage import AuditStorage
+from app.utils.database import is_memory_sqlite
+from app.utils.json_provider import _default
+
+logger = logging.getLogger(__name__)
+
+AUDITED_MODELS = (
+    User, Product, Warehouse, Supplier, Customer, PurchaseOrder, PurchaseOrderLine,
+    SalesOrder, SalesOrderLine, ReorderRule, InventoryBalance, StockMovement, StockReservation,
+    ScheduledTask
+)
+AUDITED_TABLES = {model.__tablename__ for model in AUDITED_MODELS}
+SKIPPED_COLUMNS = {'created_at', 'updated_at'}
+MASKED_COLUMNS = {'password_hash'}
+
+class AuditWriter:
+    """Buffered writer: a queue drained by a daemon thread in batches.
+
+    Rows are written on a separate engine connection, so committing requests
+    never wait for audit inserts. In-memory SQLite shares one connection
+    between threads, so there rows are written synchronously instead.
+    """
+
+    def __init__(self, storage, batch_size=500, flush_seconds=1.0, queue_size=100000, synchronous=False):
+        self.storage = storage
+        self.batch_size = max(batch_size, 1)
+        self.flush_seconds = flush_seconds
+        self.synchronous = synchronous
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Forked worker: the parent's thread and queued rows do not exist here
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """Queue rows for writing; never blocks the caller"""
+        if not rows:
+            return
+        if self.synchronous:
+            self._write(rows)
+            return
+        self._ensure_started()
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+        if self.dropped:
+            logger.warning('Audit queue full, %s entries dropped so far', self.dropped)
+
+    def flush(self, timeout=10):
+        """Wait until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                item = None
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+
+    def _write(self, rows):
+        if not rows:
+            return
+        records = [dict(row, diff_json=json.dumps(row['diff_json'], default=_default)) for row in rows]
+        try:
+            with self.storage.engine.begin() as conn:
+                self.storage.insert(conn, records)
+            self.written += len(records)
+        except Exception:
+            logger.exception('Failed to write %s audit entries', len(records))
+
+def init_audit(app, engine):
+    """Create the app's audit storage, and its writer when AUDIT_ENABLED is set"""
+    storage = AuditStorage(engine, app.config.get('AUDIT_ARCHIVE_DIR', 'audit_archive'))
+    app.extensions['audit_storage'] = storage
+    if not app.config.get('AUDIT_ENABLED', True):
+        return None
+    writer = AuditWriter(
+        storage,
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+        flush_seconds=app.config.get('AUDIT_FLUSH_SECONDS', 1.0),
+        queue_size=app.config.get('AUDIT_QUEUE_SIZE', 100000),
+        synchronous=is_memory_sqlite(app.config['SQLALCHEMY_DATABASE_URI'])
+    )
+    app.extensions['audit_writer'] = writer
+    atexit.register(writer.flush)
+    return writer
+
+def get_audit_storage():
+    return current_app.extensions['audit_storage']
+
+def get_audit_writer():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('audit_writer')
+
+def current_user_id():
+    """The authenticated user of the current request, if any"""
+    if not has_request_context():
+        return None
+    try:
+        identity = get_jwt_identity()
+    except Exception:
+        return None
+    try:
+        return int(identity) if identity is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _entry(entity, entity_id, action, diff, user_id, now):
+    return {
+        'entity': entity,
+        'entity_id': entity_id or 0,
+        'action': action,
+        'diff_json': diff,
+        'user_id': user_id,
+        'created_at': now,
+        'updated_at': now
+    }
+
+def _clean(key, value):
+    return '***' if key in MASKED_COLUMNS else value
+
+_column_key_cache = {}
+
+def _column_keys(mapper):
+    keys = _column_key_cache.get(mapper)
+    if keys is None:
+        keys = _column_key_cache[mapper] = [
+            attr.key for attr in mapper.column_attrs if attr.key not in SKIPPED_COLUMNS
+        ]
+    return keys
+
+def _snapshot(state):
+    return {key: _clean(key, state.dict.get(key)) for key in _column_keys(state.mapper)}
+
+def _changes(state):
+    diff = {}
+    for key in _column_keys(state.mapper):
+        history = state.attrs[key].history
+        if not history.added and not history.deleted:
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            diff[key] = [_clean(key, old), _clean(key, new)]
+    return diff
+
+def _pending(session):
+    return session.info.setdefault('audit_pending', [])
+
+@event.listens_for(Session, 'after_flush')
+def _capture_flush(session, flush_context):
+    if get_audit_writer() is None:
+        return
+    user_id = current_user_id()
+    now = datetime.utcnow()
+    entries = []
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            entries.append(_entry(obj.__tablename__, obj.id, 'CREATE', _snapshot(inspect(obj)), user_id, now))
+    for obj in session.dirty:
+        if isinstance(obj, AUDITED_MODELS):
+            diff = _changes(inspect(obj))
+            if diff:
+                entries.append(_entry(obj.__tablename__, obj.id, 'UPDATE', diff, user_id, now))
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            entries.append(_entry(obj.__tablename__, obj.id, 'DELETE', _snapshot(inspect(obj)), user_id, now))
+    if entries:
+        _pending(session).extend(entries)
+
+def _key_param(statement):
+    """Name of the bind parameter compared with the primary key in a WHERE clause"""
+    if statement.whereclause is None:
+        return None
+    for element in visitors.iterate(statement.whereclause):
+        if (isinstance(element, BinaryExpression) and isinstance(element.right, BindParameter)
+                and getattr(element.left, 'primary_key', False)):
+            return element.right.key
+    return None
+
+def _key_columns(statement):
+    """(column name, bind parameter name) pairs compared for equality in a WHERE clause"""
+    if statement.whereclause is None:
+        return []
+    return [
+        (element.left.name, element.right.key) for element in visitors.iterate(statement.whereclause)
+        if isinstance(element, BinaryExpression) and element.operator is operators.eq
+        and isinstance(element.left, Column) and isinstance(element.right, BindParameter)
+    ]
+
+KEY_CHUNK_SIZE = 500
+
+def _matched_rows(session, table, statement, param_sets):
+    """Current rows an UPDATE / DELETE not keyed by primary key will touch, or None if unknown.
+
+    A single execution reuses the statement's WHERE clause; an executemany
+    needs every parameter set to carry the columns its WHERE compares.
+    """
+    query = select(*[column for column in table.columns if column.name not in SKIPPED_COLUMNS])
+    if len(param_sets) == 1:
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        return session.execute(query, param_sets[0]).mappings().all()
+
+    pairs = _key_columns(statement)
+    if not pairs or any(param not in values for values in param_sets for _, param in pairs):
+        return None
+    key_columns = tuple_(*[table.c[name] for name, _ in pairs])
+    keys = sorted({tuple(values[param] for _, param in pairs) for values in param_sets})
+    rows = []
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        rows.extend(session.execute(query.where(key_columns.in_(keys[start:start + KEY_CHUNK_SIZE]))).mappings())
+    return rows
+
+def _rows_by_id(session, table, ids):
+    query = select(*[column for column in table.columns if column.name not in SKIPPED_COLUMNS])
+    rows = {}
+    for start in range(0, len(ids), KEY_CHUNK_SIZE):
+        for row in session.execute(query.where(table.c.id.in_(ids[start:start + KEY_CHUNK_SIZE]))).mappings():
+            rows[row['id']] = row
+    return rows
+
+def _returning_ids(orm_execute_state, statement, table, executemany):
+    """Execute an INSERT so the generated ids come back in parameter order.
+
+    Returns (result for the caller, ids), or (None, None) when the database
+    cannot report them and the statement is left to run unchanged.
+    """
+    if statement._returning:
+        # The caller asked for RETURNING itself: use its id column when rows follow the parameters
+        names = [getattr(column, 'name', None) for column in statement._returning]
+        if 'id' not in names or (executemany and not statement._sort_by_parameter_order):
+            return None, None
+        frozen = orm_execute_state.invoke_statement().freeze()
+        return frozen(), [row[names.index('id')] for row in frozen().all()]
+    dialect = orm_execute_state.session.get_bind().dialect
+    if not dialect.insert_returning or not dialect.insert_executemany_returning_sort_by_parameter_order:
+        return None, None
+    frozen = orm_execute_state.invoke_statement(
+        statement=statement.returning(table.c.id, sort_by_parameter_order=True)
+    ).freeze()
+    return frozen(), [row[0] for row in frozen().all()]
+
+BULK_ACTIONS = (('is_insert', 'CREATE'), ('is_update', 'UPDATE'), ('is_delete', 'DELETE'))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _capture_bulk(orm_execute_state):
+    """Audit set-based DML, which does not go through the flush.
+
+    INSERTs are run with RETURNING so each entry carries the generated id.
+    UPDATE / DELETE keyed by primary key take the id from the parameters;
+    other UPDATE / DELETE statements read the rows they touch (by their WHERE
+    clause, or by the key columns of an executemany) so entries record the
+    row id and, for updates, the old and new column values.
+    """
+    action = next((name for flag, name in BULK_ACTIONS if getattr(orm_execute_state, flag)), None)
+    if action is None:
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or table.name not in AUDITED_TABLES or get_audit_writer() is None:
+        return
+
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    params = orm_execute_state.parameters or {}
+    param_sets = params if isinstance(params, (list, tuple)) else [params]
+    user_id = current_user_id()
+    now = datetime.utcnow()
+    entries = []
+    result = None
+
+    def bulk_diff(values, skip=()):
+        diff = {name: _clean(name, value) for name, value in values.items() if name not in skip}
+        diff['bulk'] = True
+        return diff
+
+    if action == 'CREATE':
+        result, ids = _returning_ids(orm_execute_state, statement, table, len(param_sets) > 1)
+        if ids is not None and len(param_sets) == 1 and len(ids) != 1:
+            param_sets = param_sets * len(ids)  # INSERT ... SELECT
+        if ids is None or len(ids) != len(param_sets):
+            ids = [values.get('id') for values in param_sets]
+        entries = [_entry(table.name, entity_id, action, bulk_diff(values, ('id',)), user_id, now)
+                   for entity_id, values in zip(ids, param_sets)]
+    else:
+        key = _key_param(statement)
+        if key not in param_sets[0]:
+            key = None  # compared with a literal or an IN list, not a per-row parameter
+        if key is None and statement.whereclause is None and 'id' in param_sets[0]:
+            key = 'id'  # ORM bulk UPDATE by primary key
+        before = None if key else _matched_rows(session, table, statement, param_sets)
+        result = orm_execute_state.invoke_statement()
+        if key:
+            entries = [_entry(table.name, values.get(key), action, bulk_diff(values, (key,)), user_id, now)
+                       for values in param_sets]
+        elif before is None:
+            where = str(statement.whereclause) if statement.whereclause is not None else None
+            entries = [_entry(table.name, None, action, dict(bulk_diff(values), where=where), user_id, now)
+                       for values in param_sets]
+        elif action == 'DELETE':
+            entries = [_entry(table.name, row['id'], action, bulk_diff(row, ('id',)), user_id, now)
+                       for row in before]
+        else:
+            after = _rows_by_id(session, table, [row['id'] for row in before])
+            for row in before:
+                new = after.get(row['id'])
+                if new is None:
+                    continue
+                diff = {name: [_clean(name, row[name]), _clean(name, new[name])]
+                        for name in row.keys() if name != 'id' and row[name] != new[name]}
+                if diff:
+                    diff['bulk'] = True
+                    entries.append(_entry(table.name, row['id'], action, diff, user_id, now))
+
+    _pending(session).extend(entries)
+    return result
+
+@event.listens_for(Session, 'after_commit')
+def _submit_entries(session):
+    entries = session.info.pop('audit_pending', None)
+    writer = get_audit_writer()
+    if entries and writer is not None:
+        writer.submit(entries)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_entries(session):
+    session.info.pop('audit_pending', None)
@@ -0,0 +1,343 @@
+"""
+Audit Log Storage
+Month-partitioned storage for audit entries. PostgreSQL uses native range
+partitions of ``audit_logs`` on created_at (set up by audit_partitions.py);
+SQLite uses one table per month (``audit_logs_YYYYMM``) with the same
+indexes, and ``audit_logs`` itself only holds rows written before
+partitioning. Other databases keep a single table. Queries fan out only to
+the partitions a date range touches, and partitions older than the retention
+window are exported to gzip-compressed JSON lines files and dropped.
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from sqlalchemy import Column, Index, MetaData, Table, delete, inspect, insert, select, text
+from app.models import AuditLog
+from app.utils.json_provider import _default
+
+audit_table = AuditLog.__table__
+
+PARTITION_PREFIX = 'audit_logs_'
+PARTITION_PATTERN = re.compile(r'^audit_logs_(\d{6})$')
+# A month archived again (rows written after its first archive) gets audit_logs_YYYYMM.N.jsonl.gz
+ARCHIVE_PATTERN = re.compile(r'^audit_logs_(\d{6})(?:\.(\d+))?\.jsonl\.gz$')
+
+partition_metadata = MetaData()
+_partition_lock = threading.Lock()
+
+def month_key(value):
+    return value.strftime('%Y%m')
+
+def month_start(key):
+    return datetime(int(key[:4]), int(key[4:]), 1)
+
+def next_month_key(key):
+    year, month = int(key[:4]), int(key[4:])
+    return f'{year + month // 12:04d}{month % 12 + 1:02d}'
+
+def shift_month_key(key, months):
+    index = int(key[:4]) * 12 + int(key[4:]) - 1 + months
+    return f'{index // 12:04d}{index % 12 + 1:02d}'
+
+def month_keys(start, end):
+    """Month keys from start to end inclusive"""
+    keys, key, last = [], month_key(start), month_key(end)
+    while key <= last:
+        keys.append(key)
+        key = next_month_key(key)
+    return keys
+
+def partition_table(key):
+    """Table object for a monthly SQLite partition (without the users FK)"""
+    name = PARTITION_PREFIX + key
+    with _partition_lock:
+        table = partition_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name, partition_metadata,
+                *[Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+                  for column in audit_table.columns],
+                Index(f'ix_{name}_entity', 'entity', 'entity_id', 'created_at'),
+                Index(f'ix_{name}_user', 'user_id', 'created_at')
+            )
+        return table
+
+def _as_datetime(value, end=False):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        value = datetime(value.year, value.month, value.day)
+        return value.replace(hour=23, minute=59, second=59, microsecond=999999) if end else value
+    return value
+
+class AuditStorage:
+    """Routes audit inserts, queries and archival to the right partitions.
+
+    mode is 'tables' (SQLite, one table per month), 'native' (PostgreSQL
+    partitioned audit_logs) or 'single' (plain audit_logs table).
+    """
+
+    def __init__(self, engine, archive_dir='audit_archive'):
+        self.engine = engine
+        self.archive_dir = archive_dir
+        self._mode = None
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def mode(self, conn=None):
+        if self._mode is None:
+            if self.engine.dialect.name == 'sqlite':
+                self._mode = 'tables'
+            elif self.engine.dialect.name == 'postgresql':
+                with self._connect(conn) as connection:
+                    partitioned = connection.execute(text(
+                        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs')"
+                    )).first()
+                self._mode = 'native' if partitioned else 'single'
+            else:
+                self._mode = 'single'
+        return self._mode
+
+    def reset(self):
+        """Forget cached mode and partitions, e.g. after audit_partitions.py setup"""
+        with self._lock:
+            self._mode = None
+            self._known.clear()
+
+    def _connect(self, conn):
+        if conn is not None:
+            return _Borrowed(conn)
+        return self.engine.connect()
+
+    def partitions(self, conn=None):
+        """Existing partition month keys, oldest first"""
+        mode = self.mode(conn)
+        with self._connect(conn) as connection:
+            if mode == 'tables':
+                names = inspect(connection).get_table_names()
+            elif mode == 'native':
+                names = connection.execute(text(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass('audit_logs')"
+                )).scalars().all()
+            else:
+                names = []
+        return sorted(match.group(1) for match in map(PARTITION_PATTERN.match, names) if match)
+
+    def ensure_partition(self, conn, key):
+        if key in self._known:
+            return
+        mode = self.mode(conn)
+        if mode == 'tables':
+            partition_table(key).create(conn, checkfirst=True)
+        elif mode == 'native':
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}{key} PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{month_start(key):%Y-%m-%d}') TO ('{month_start(next_month_key(key)):%Y-%m-%d}')"
+            ))
+        with self._lock:
+            self._known.add(key)
+
+    def insert(self, conn, rows):
+        """Insert audit rows (dicts of audit_logs columns) into their partitions"""
+        if not rows:
+            return
+        mode = self.mode(conn)
+        if mode == 'single':
+            conn.execute(insert(audit_table), rows)
+            return
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_key(row['created_at']), []).append(row)
+        for key, month_rows in by_month.items():
+            self.ensure_partition(conn, key)
+            table = partition_table(key) if mode == 'tables' else audit_table
+            conn.execute(insert(table), month_rows)
+
+    def _filtered(self, table, filters, start, end):
+        query = select(table)
+        for name in ('entity', 'entity_id', 'user_id', 'action'):
+            if filters.get(name) is not None:
+                query = query.where(table.c[name] == filters[name])
+        if start is not None:
+            query = query.where(table.c.created_at >= start)
+        if end is not None:
+            query = query.where(table.c.created_at <= end)
+        return query.order_by(table.c.created_at.desc(), table.c.id.desc())
+
+    def query(self, entity=None, entity_id=None, user_id=None, action=None,
+              start=None, end=None, limit=100, include_archived=False):
+        """Audit entries newest first, reading only the partitions in [start, end]"""
+        filters = {'entity': entity, 'entity_id': entity_id, 'user_id': user_id, 'action': action}
+        start, end = _as_datetime(start), _as_datetime(end, end=True)
+        results = []
+        with self.engine.connect() as conn:
+            mode = self.mode(conn)
+            if mode != 'tables':
+                # PostgreSQL prunes native partitions from the created_at range itself
+                rows = conn.execute(self._filtered(audit_table, filters, start, end).limit(limit)).mappings()
+                results = [dict(row, partition=month_key(row['created_at'])) for row in rows]
+            else:
+                keys = self.partitions(conn)
+                if start is not None:
+                    keys = [key for key in keys if key >= month_key(start)]
+                if end is not None:
+                    keys = [key for key in keys if key <= month_key(end)]
+                # Partitions are disjoint months, so the newest ones fill the limit first
+                for key in reversed(keys):
+                    rows = conn.execute(
+                        self._filtered(partition_table(key), filters, start, end).limit(limit - len(results))
+                    ).mappings()
+                    results.extend(dict(row, partition=key) for row in rows)
+                    if len(results) >= limit:
+                        break
+                legacy = conn.execute(self._filtered(audit_table, filters, start, end).limit(limit)).mappings()
+                results.extend(dict(row, partition=None) for row in legacy)
+
+        if include_archived:
+            results.extend(self.read_archives(filters, start, end, limit))
+        results.sort(key=lambda row: (row['created_at'], row['id']), reverse=True)
+        return results[:limit]
+
+    def _archive_files(self):
+        """{month key: [sequence numbers]} of archive files, sequences ascending"""
+        if not os.path.isdir(self.archive_dir):
+            return {}
+        files = {}
+        for match in map(ARCHIVE_PATTERN.match, os.listdir(self.archive_dir)):
+            if match:
+                files.setdefault(match.group(1), []).append(int(match.group(2) or 0))
+        return {key: sorted(sequences) for key, sequences in files.items()}
+
+    def archives(self):
+        """Month keys that have archive files"""
+        return sorted(self._archive_files())
+
+    def archive_path(self, key, sequence=0):
+        suffix = f'.{sequence}' if sequence else ''
+        return os.path.join(self.archive_dir, f'{PARTITION_PREFIX}{key}{suffix}.jsonl.gz')
+
+    def read_archives(self, filters, start=None, end=None, limit=100):
+        """Matching entries from archive files of the months in range"""
+        results = []
+        files = self._archive_files()
+        for key in sorted(files, reverse=True):
+            if (start is not None and key < month_key(start)) or (end is not None and key > month_key(end)):
+                continue
+            for sequence in files[key]:
+                with gzip.open(self.archive_path(key, sequence), 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        row = json.loads(line)
+                        row['created_at'] = datetime.fromisoformat(row['created_at'])
+                        row['updated_at'] = datetime.fromisoformat(row['updated_at'])
+                        if any(value is not None and row.get(name) != value for name, value in filters.items()):
+                            continue
+                        if (start is not None and row['created_at'] < start) or (end is not None and row['created_at'] > end):
+                            continue
+                        row['partition'] = key
+                        row['archived'] = True
+                        results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _export(self, conn, key, query):
+        """Stream a month's rows into a new archive file; returns (row count, path).
+
+        Existing archives are never overwritten: a month archived again is
+        written to the next free sequence number.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        partial = os.path.join(self.archive_dir, f'{PARTITION_PREFIX}{key}.jsonl.gz.partial')
+        count = 0
+        with gzip.open(partial, 'wt', encoding='utf-8') as f:
+            for row in conn.execution_options(yield_per=5000).execute(query).mappings():
+                f.write(json.dumps(dict(row), default=_default) + '\n')
+                count += 1
+        sequence = (self._archive_files().get(key) or [-1])[-1] + 1
+        while True:
+            path = self.archive_path(key, sequence)
+            try:
+                # link() fails if the name is taken, unlike replace()
+                os.link(partial, path)
+                break
+            except FileExistsError:
+                sequence += 1
+        os.remove(partial)
+        return count, path
+
+    def archive(self, retention_months=12, today=None):
+        """Export and drop partitions older than the retention window.
+
+        A month is archived once it is entirely older than ``retention_months``
+        months before the current one. Archive files are written before the
+        partition is dropped, so an interrupted run never loses rows.
+        """
+        cutoff = shift_month_key(month_key(today or datetime.utcnow()), -retention_months)
+        archived = []
+        with self.engine.begin() as conn:
+            mode = self.mode(conn)
+            if mode == 'single':
+                oldest = conn.execute(select(audit_table.c.created_at).order_by(audit_table.c.created_at).limit(1)).scalar()
+                keys = month_keys(oldest, month_start(cutoff)) if oldest else []
+                keys = [key for key in keys if key < cutoff]
+            else:
+                keys = [key for key in self.partitions(conn) if key < cutoff]
+
+            for key in keys:
+                if mode == 'tables':
+                    table = partition_table(key)
+                    count, path = self._export(conn, key, select(table).order_by(table.c.id))
+                    table.drop(conn)
+                elif mode == 'native':
+                    count, path = self._export(conn, key, select(audit_table).where(
+                        audit_table.c.created_at >= month_start(key),
+                        audit_table.c.created_at < month_start(next_month_key(key))
+                    ).order_by(audit_table.c.id))
+                    conn.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION {PARTITION_PREFIX}{key}'))
+                    conn.execute(text(f'DROP TABLE {PARTITION_PREFIX}{key}'))
+                else:
+                    month = (audit_table.c.created_at >= month_start(key)) & \
+                        (audit_table.c.created_at < month_start(next_month_key(key)))
+                    count, path = self._export(conn, key, select(audit_table).where(month).order_by(audit_table.c.id))
+                    conn.execute(delete(audit_table).where(month))
+                with self._lock:
+                    self._known.discard(key)
+                archived.append({'month': key, 'rows': count, 'file': path})
+        return {'cutoff': cutoff, 'archived': archived}
+
+    def migrate_legacy(self, batch_size=10000):
+        """Move rows written before partitioning from audit_logs into monthly tables (SQLite)"""
+        if self.mode() != 'tables':
+            return 0
+        moved = 0
+        while True:
+            with self.engine.begin() as conn:
+                rows = [dict(row) for row in conn.execute(
+                    select(audit_table).order_by(audit_table.c.id).limit(batch_size)
+                ).mappings()]
+                if not rows:
+                    return moved
+                last_id = rows[-1]['id']
+                for row in rows:
+                    row.pop('id')
+                self.insert(conn, rows)
+                conn.execute(delete(audit_table).where(audit_table.c.id <= last_id))
+                moved += len(rows)
+
+class _Borrowed:
+    """Context manager that lends an existing connection without closing it"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        return False
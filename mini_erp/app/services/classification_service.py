@@ -0,0 +1,182 @@
+"""
+Classification Service
+Batch ABC / XYZ classification of the whole catalog. One grouped query
+extracts issued (sales OUT) quantity and value per product and period, with
+the price of the sales order line each movement shipped; ranking and
+variability are then computed with NumPy over a product x period matrix.
+
+ABC: products ranked by consumption value; a product is A while the value
+     share of the products ranked above it is below the A threshold (80%),
+     B below the B threshold (95%), otherwise C. No consumption is C.
+XYZ: coefficient of variation (std / mean) of periodic demand; X up to
+     0.5, Y up to 1.0, otherwise Z. No demand is Z.
+"""
+
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from app import db
+from app.models import Product, ProductClassification, SalesOrderLine
+from app.models.product_classification import ABC_CLASSES, XYZ_CLASSES
+from app.models.stock_movement import MovementDirection, MovementType
+from app.services.movement_archive import movement_source
+from app.utils.time_buckets import BUCKETS, bucket_periods, date_bucket
+
+class ClassificationService:
+    def __init__(self, lookback_days=365, period='month', abc_thresholds=(0.8, 0.95), xyz_thresholds=(0.5, 1.0)):
+        if period not in BUCKETS:
+            raise ValueError(f"period must be one of {', '.join(BUCKETS)}")
+        self.lookback_days = max(lookback_days, 1)
+        self.period = period
+        self.abc_thresholds = abc_thresholds
+        self.xyz_thresholds = xyz_thresholds
+
+    @classmethod
+    def from_config(cls, config, **overrides):
+        options = {
+            'lookback_days': config.get('CLASSIFICATION_LOOKBACK_DAYS', 365),
+            'period': config.get('CLASSIFICATION_PERIOD', 'month'),
+            'abc_thresholds': (config.get('CLASSIFICATION_A_SHARE', 0.8), config.get('CLASSIFICATION_B_SHARE', 0.95)),
+            'xyz_thresholds': (config.get('CLASSIFICATION_X_CV', 0.5), config.get('CLASSIFICATION_Y_CV', 1.0)),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def load_arrays(self, now=None):
+        """Product ids and the product x period demand / value matrices"""
+        now = now or datetime.utcnow()
+        since = now - timedelta(days=self.lookback_days)
+        periods = bucket_periods(since.date(), now.date(), self.period)
+        # The first bucket may start before the lookback window; count it from its start
+        since = datetime.combine(periods[0], datetime.min.time())
+
+        product_ids = np.array(
+            db.session.execute(select(Product.id).order_by(Product.id)).scalars().all(), dtype=np.int64
+        )
+
+        movements = movement_source(since)
+        period = date_bucket(movements.c.created_at, self.period).label('period')
+        rows = db.session.execute(
+            select(
+                movements.c.product_id, period, func.sum(movements.c.quantity),
+                func.sum(movements.c.quantity * func.coalesce(SalesOrderLine.unit_price, 0))
+            ).select_from(movements).outerjoin(
+                SalesOrderLine, SalesOrderLine.id == movements.c.ref_line_id
+            ).where(
+                movements.c.direction == MovementDirection.OUT,
+                movements.c.movement_type == MovementType.SALES,
+                movements.c.created_at >= since
+            ).group_by(movements.c.product_id, period)
+        ).all()
+
+        demand = np.zeros((len(product_ids), len(periods)), dtype=np.float64)
+        value = np.zeros(len(product_ids), dtype=np.float64)
+        if rows and len(product_ids):
+            period_index = {day.isoformat(): i for i, day in enumerate(periods)}
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            columns = np.array([period_index.get(row[1], -1) for row in rows], dtype=np.int64)
+            quantities = np.array([row[2] or 0 for row in rows], dtype=np.float64)
+            values = np.array([float(row[3] or 0) for row in rows], dtype=np.float64)
+
+            positions = np.searchsorted(product_ids, ids)
+            found = (positions < len(product_ids)) & (product_ids[np.minimum(positions, len(product_ids) - 1)] == ids)
+            found &= columns >= 0
+            np.add.at(demand, (positions[found], columns[found]), quantities[found])
+            np.add.at(value, positions[found], values[found])
+
+        return {'product_ids': product_ids, 'periods': periods, 'demand': demand, 'value': value}
+
+    def compute(self, arrays):
+        """Vectorized ABC / XYZ pass over the whole catalog"""
+        value, demand = arrays['value'], arrays['demand']
+        n = len(value)
+        total = value.sum()
+        share = value / total if total > 0 else np.zeros(n)
+
+        order = np.argsort(-value, kind='stable')
+        cumulative = np.empty(n)
+        cumulative[order] = np.cumsum(share[order])
+        above = cumulative - share  # share of the products ranked higher
+
+        a_limit, b_limit = self.abc_thresholds
+        abc = np.where(value <= 0, 'C', np.where(above < a_limit, 'A', np.where(above < b_limit, 'B', 'C')))
+
+        mean = demand.mean(axis=1) if demand.shape[1] else np.zeros(n)
+        std = demand.std(axis=1) if demand.shape[1] else np.zeros(n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(mean > 0, std / mean, np.nan)
+        x_limit, y_limit = self.xyz_thresholds
+        xyz = np.where(np.isnan(cv), 'Z', np.where(cv <= x_limit, 'X', np.where(cv <= y_limit, 'Y', 'Z')))
+
+        return {
+            'abc': abc, 'xyz': xyz, 'share': share, 'cumulative': cumulative, 'cv': cv,
+            'issued': demand.sum(axis=1)
+        }
+
+    def classify(self, now=None):
+        """Recompute and store the class of every product; returns a summary. The caller commits."""
+        arrays = self.load_arrays(now)
+        result = self.compute(arrays)
+        product_ids = arrays['product_ids']
+        timestamp = datetime.utcnow()
+
+        db.session.execute(delete(ProductClassification))
+        if len(product_ids):
+            db.session.execute(insert(ProductClassification), [
+                {
+                    'product_id': int(product_ids[i]),
+                    'abc_class': str(result['abc'][i]),
+                    'xyz_class': str(result['xyz'][i]),
+                    'issued_qty': int(result['issued'][i]),
+                    'consumption_value': round(float(arrays['value'][i]), 2),
+                    'value_share': float(result['share'][i]),
+                    'cumulative_share': float(result['cumulative'][i]),
+                    'demand_cv': None if np.isnan(result['cv'][i]) else float(result['cv'][i]),
+                    'periods': len(arrays['periods']),
+                    'created_at': timestamp,
+                    'updated_at': timestamp
+                }
+                for i in range(len(product_ids))
+            ])
+
+        return {
+            'products': len(product_ids),
+            'matrix': class_matrix(result['abc'], result['xyz']),
+            'parameters': {
+                'lookback_days': self.lookback_days,
+                'period': self.period,
+                'periods': len(arrays['periods']),
+                'abc_thresholds': list(self.abc_thresholds),
+                'xyz_thresholds': list(self.xyz_thresholds)
+            },
+            'classified_at': timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+def class_matrix(abc, xyz):
+    """Product counts per ABC x XYZ cell, e.g. {'AX': 12, ...}"""
+    cells, counts = np.unique(np.char.add(np.asarray(abc, dtype=str), np.asarray(xyz, dtype=str)), return_counts=True)
+    matrix = {a + x: 0 for a in 'ABC' for x in 'XYZ'}
+    matrix.update({str(cell): int(count) for cell, count in zip(cells, counts)})
+    return matrix
+
+def parse_classes(value, allowed):
+    """Class letters from a filter value such as 'A' or 'A,B'; raises ValueError on unknown letters"""
+    if not value:
+        return []
+    classes = [part.strip().upper() for part in value.split(',') if part.strip()]
+    unknown = [part for part in classes if part not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown class {', '.join(unknown)}; expected one of {', '.join(allowed)}")
+    return classes
+
+def filter_by_class(query, product_id_column, abc_value=None, xyz_value=None):
+    """Restrict a query to products in the given ABC / XYZ classes (comma-separated values)"""
+    abc, xyz = parse_classes(abc_value, ABC_CLASSES), parse_classes(xyz_value, XYZ_CLASSES)
+    if not abc and not xyz:
+        return query
+    query = query.join(ProductClassification, ProductClassification.product_id == product_id_column)
+    if abc:
+        query = query.filter(ProductClassification.abc_class.in_(abc))
+    if xyz:
+        query = query.filter(ProductClassification.xyz_class.in_(xyz))
+    return query
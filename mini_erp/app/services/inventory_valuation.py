@@ -0,0 +1,323 @@
+"""
+Inventory Valuation
+Keeps FIFO cost layers and a running valuation row per (product, warehouse),
+updated in the posting transaction as movements are written: purchase
+receipts open layers at the order line price, issues consume the oldest
+layers and lower the moving average value, and transfers carry the consumed
+layers (with their original receipt dates) to the destination warehouse.
+Other receipts (returns, adjustments) come in at the current average cost.
+
+Both methods are maintained side by side, so stock value under either is a
+read of inventory_valuations instead of a replay of the ledger. Movements
+posted with bulk statements are valued by stock_posting.post_movements; ORM
+inserts are picked up by a flush hook. Valuation rows are locked while they
+are updated (SELECT ... FOR UPDATE where supported), so concurrent postings
+for the same product and warehouse are applied one after the other.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, delete, event, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+from app.models import (
+    CostLayer, InventoryValuation, InventoryBalance, PurchaseOrderLine,
+    StockMovement, StockMovementArchive
+)
+from app.models.stock_movement import MovementDirection, MovementType
+from app.services.movement_archive import signed_quantity
+
+layers_table = CostLayer.__table__
+valuations_table = InventoryValuation.__table__
+
+ZERO = Decimal('0')
+COST_PLACES = Decimal('0.0001')
+
+def _round(value):
+    return Decimal(value).quantize(COST_PLACES)
+
+class _Position:
+    """Valuation row and open layers of one (product, warehouse) while a batch is applied"""
+
+    def __init__(self, row=None):
+        self.id = row.id if row is not None else None
+        self.quantity = row.quantity if row is not None else 0
+        self.average_cost = Decimal(row.average_cost) if row is not None else ZERO
+        self.average_value = Decimal(row.average_value) if row is not None else ZERO
+        self.fifo_value = Decimal(row.fifo_value) if row is not None else ZERO
+        self.last_movement_at = row.last_movement_at if row is not None else None
+        self.layers = []  # open layers, oldest first: dicts with id, remaining_qty, unit_cost, received_at
+        self.changed = False
+
+    def layered_qty(self):
+        return sum(layer['remaining_qty'] for layer in self.layers)
+
+    def receive(self, quantity, unit_cost, received_at, ref_document_no=None, ref_line_id=None):
+        # Units already issued without layers (stock went negative) are not layered again
+        uncovered = max(0, self.layered_qty() - self.quantity)
+        remaining = quantity - min(quantity, uncovered)
+        if remaining:
+            self.layers.append({
+                'id': None, 'remaining_qty': remaining, 'quantity': quantity, 'unit_cost': unit_cost,
+                'received_at': received_at, 'ref_document_no': ref_document_no, 'ref_line_id': ref_line_id,
+                'changed': True
+            })
+            self.fifo_value += remaining * unit_cost
+
+        if self.quantity <= 0:
+            self.quantity += quantity
+            self.average_cost = unit_cost
+            self.average_value = self.quantity * unit_cost
+        else:
+            self.quantity += quantity
+            self.average_value += quantity * unit_cost
+            self.average_cost = self.average_value / self.quantity
+        self.changed = True
+
+    def issue(self, quantity):
+        """Consume quantity oldest layer first; returns the (received_at, qty, unit_cost) slices used.
+
+        Quantity not covered by layers (stock that predates valuation) is
+        costed at the average cost and does not lower the FIFO value.
+        """
+        # Cost from the stored value rather than the rounded average cost, so issues do not drift
+        unit_cost = self.average_value / self.quantity if self.quantity > 0 else self.average_cost
+        slices, left = [], quantity
+        for layer in self.layers:
+            if not left:
+                break
+            take = min(layer['remaining_qty'], left)
+            if take:
+                layer['remaining_qty'] -= take
+                layer['changed'] = True
+                left -= take
+                self.fifo_value -= take * layer['unit_cost']
+                slices.append((layer['received_at'], take, layer['unit_cost']))
+        if left:
+            slices.append((None, left, unit_cost))
+
+        self.quantity -= quantity
+        self.average_value = self.quantity * unit_cost if self.quantity <= 0 else \
+            self.average_value - quantity * unit_cost
+        self.changed = True
+        return slices
+
+def _load_positions(conn, keys):
+    product_ids = {product_id for product_id, _ in keys}
+    warehouse_ids = {warehouse_id for _, warehouse_id in keys}
+    query = select(valuations_table).where(
+        valuations_table.c.product_id.in_(product_ids), valuations_table.c.warehouse_id.in_(warehouse_ids)
+    )
+    if conn.dialect.name != 'sqlite':
+        query = query.with_for_update()
+    positions = {key: _Position() for key in keys}
+    for row in conn.execute(query):
+        key = (row.product_id, row.warehouse_id)
+        if key in positions:
+            positions[key] = _Position(row)
+
+    layers = conn.execute(
+        select(layers_table.c.id, layers_table.c.product_id, layers_table.c.warehouse_id,
+               layers_table.c.remaining_qty, layers_table.c.unit_cost, layers_table.c.received_at)
+        .where(
+            layers_table.c.product_id.in_(product_ids), layers_table.c.warehouse_id.in_(warehouse_ids),
+            layers_table.c.remaining_qty > 0
+        ).order_by(layers_table.c.received_at, layers_table.c.id)
+    )
+    for layer in layers:
+        position = positions.get((layer.product_id, layer.warehouse_id))
+        if position is not None:
+            position.layers.append({
+                'id': layer.id, 'remaining_qty': layer.remaining_qty, 'unit_cost': Decimal(layer.unit_cost),
+                'received_at': layer.received_at, 'changed': False
+            })
+    return positions
+
+def _purchase_costs(conn, movements):
+    line_ids = {
+        movement['ref_line_id'] for movement in movements
+        if movement['direction'] == MovementDirection.IN and movement['movement_type'] == MovementType.PURCHASE
+        and movement.get('ref_line_id') and movement.get('unit_cost') is None
+    }
+    if not line_ids:
+        return {}
+    rows = conn.execute(select(PurchaseOrderLine.id, PurchaseOrderLine.unit_price).where(PurchaseOrderLine.id.in_(line_ids)))
+    return {line_id: Decimal(unit_price) for line_id, unit_price in rows}
+
+def _write(conn, positions, now):
+    new_rows, updated_rows, new_layers, updated_layers = [], [], [], []
+    for (product_id, warehouse_id), position in positions.items():
+        if not position.changed:
+            continue
+        values = {
+            'quantity': position.quantity,
+            'average_cost': _round(position.average_cost),
+            'average_value': _round(position.average_value),
+            'fifo_value': _round(position.fifo_value),
+            'last_movement_at': position.last_movement_at,
+            'updated_at': now
+        }
+        if position.id is None:
+            new_rows.append(dict(values, product_id=product_id, warehouse_id=warehouse_id, created_at=now))
+        else:
+            updated_rows.append(dict(values, b_id=position.id))
+
+        for layer in position.layers:
+            if not layer['changed']:
+                continue
+            if layer['id'] is None:
+                new_layers.append({
+                    'product_id': product_id, 'warehouse_id': warehouse_id,
+                    'received_at': layer['received_at'], 'quantity': layer['quantity'],
+                    'remaining_qty': layer['remaining_qty'], 'unit_cost': _round(layer['unit_cost']),
+                    'ref_document_no': layer['ref_document_no'], 'ref_line_id': layer['ref_line_id'],
+                    'created_at': now, 'updated_at': now
+                })
+            else:
+                updated_layers.append({'b_id': layer['id'], 'remaining_qty': layer['remaining_qty'], 'updated_at': now})
+
+    if new_rows:
+        conn.execute(insert(valuations_table), new_rows)
+    if updated_rows:
+        conn.execute(update(valuations_table).where(valuations_table.c.id == bindparam('b_id')), updated_rows)
+    if new_layers:
+        conn.execute(insert(layers_table), new_layers)
+    if updated_layers:
+        conn.execute(update(layers_table).where(layers_table.c.id == bindparam('b_id')), updated_layers)
+
+def apply_movements(conn, movements, now=None):
+    """Value a batch of movements (dicts of StockMovement columns) in the caller's transaction.
+
+    A movement may carry ``unit_cost`` to override the receipt cost. Within
+    a batch, transfer receipts are applied after the issues, and take the
+    layers their issue (same ref_document_no and product) consumed.
+    """
+    if not movements:
+        return
+    now = now or datetime.utcnow()
+    positions = _load_positions(conn, {(movement['product_id'], movement['warehouse_id']) for movement in movements})
+    purchase_costs = _purchase_costs(conn, movements)
+    transferred = {}
+
+    def is_transfer_receipt(movement):
+        return movement['direction'] == MovementDirection.IN and movement['movement_type'] == MovementType.TRANSFER
+
+    for movement in sorted(movements, key=is_transfer_receipt):
+        position = positions[(movement['product_id'], movement['warehouse_id'])]
+        moved_at = movement.get('created_at') or now
+        position.last_movement_at = max(position.last_movement_at or moved_at, moved_at)
+        quantity = movement['quantity']
+
+        if movement['direction'] == MovementDirection.OUT:
+            slices = position.issue(quantity)
+            if movement['movement_type'] == MovementType.TRANSFER:
+                transferred.setdefault((movement.get('ref_document_no'), movement['product_id']), []).extend(
+                    (received_at or moved_at, qty, cost) for received_at, qty, cost in slices
+                )
+            continue
+
+        unit_cost = movement.get('unit_cost')
+        if unit_cost is None and movement['movement_type'] == MovementType.PURCHASE:
+            unit_cost = purchase_costs.get(movement.get('ref_line_id'))
+        slices = transferred.get((movement.get('ref_document_no'), movement['product_id'])) \
+            if unit_cost is None and movement['movement_type'] == MovementType.TRANSFER else None
+
+        if slices:
+            left = quantity
+            while left and slices:
+                received_at, qty, cost = slices[0]
+                take = min(qty, left)
+                if take == qty:
+                    slices.pop(0)
+                else:
+                    slices[0] = (received_at, qty - take, cost)
+                position.receive(take, cost, received_at, movement.get('ref_document_no'))
+                left -= take
+            if left:
+                position.receive(left, position.average_cost, moved_at, movement.get('ref_document_no'))
+        else:
+            cost = Decimal(unit_cost) if unit_cost is not None else position.average_cost
+            position.receive(quantity, cost, moved_at, movement.get('ref_document_no'), movement.get('ref_line_id'))
+
+    _write(conn, positions, now)
+
+def movement_values(movement):
+    """Column dict of a StockMovement instance, as apply_movements expects"""
+    return {
+        'product_id': movement.product_id, 'warehouse_id': movement.warehouse_id,
+        'direction': movement.direction, 'quantity': movement.quantity,
+        'movement_type': movement.movement_type, 'ref_document_no': movement.ref_document_no,
+        'ref_line_id': movement.ref_line_id, 'created_at': movement.created_at
+    }
+
+@event.listens_for(Session, 'after_flush')
+def _value_flushed_movements(session, flush_context):
+    movements = sorted(
+        (obj for obj in session.new if isinstance(obj, StockMovement)), key=lambda movement: movement.id
+    )
+    if movements:
+        apply_movements(session.connection(), [movement_values(movement) for movement in movements])
+
+def latest_purchase_costs(conn):
+    """{product_id: unit price of its most recent purchase order line}"""
+    latest = select(func.max(PurchaseOrderLine.id)).group_by(PurchaseOrderLine.product_id)
+    rows = conn.execute(select(PurchaseOrderLine.product_id, PurchaseOrderLine.unit_price).where(
+        PurchaseOrderLine.id.in_(latest)
+    ))
+    return {product_id: Decimal(unit_price) for product_id, unit_price in rows}
+
+def rebuild_valuation(conn, batch_size=5000):
+    """Rebuild layers and valuations by replaying the movement ledger (archive included).
+
+    Stock the ledger does not explain (balances loaded without movements)
+    is valued first, as an opening adjustment at the product's latest
+    purchase price, so valuation quantities match inventory_balances. Runs
+    in the caller's transaction; returns a summary.
+    """
+    conn.execute(delete(layers_table))
+    conn.execute(delete(valuations_table))
+
+    columns = ('product_id', 'warehouse_id', 'direction', 'quantity', 'movement_type',
+               'ref_document_no', 'ref_line_id', 'created_at', 'id')
+    hot, archived = StockMovement.__table__, StockMovementArchive.__table__
+    ledger = union_all(
+        select(*[hot.c[name] for name in columns], literal(1).label('source')),
+        select(*[archived.c[name] for name in columns], literal(0).label('source'))
+    ).subquery('ledger')
+
+    net = {
+        (product_id, warehouse_id): quantity for product_id, warehouse_id, quantity in conn.execute(
+            select(ledger.c.product_id, ledger.c.warehouse_id, func.sum(signed_quantity(ledger)))
+            .group_by(ledger.c.product_id, ledger.c.warehouse_id)
+        )
+    }
+    first_movement = conn.execute(select(func.min(ledger.c.created_at))).scalar()
+    costs = latest_purchase_costs(conn)
+    adjustments = []
+    for product_id, warehouse_id, on_hand in conn.execute(
+        select(InventoryBalance.product_id, InventoryBalance.warehouse_id, InventoryBalance.on_hand_qty)
+    ):
+        difference = on_hand - (net.get((product_id, warehouse_id)) or 0)
+        if difference:
+            adjustments.append({
+                'product_id': product_id, 'warehouse_id': warehouse_id,
+                'direction': MovementDirection.IN if difference > 0 else MovementDirection.OUT,
+                'quantity': abs(difference), 'movement_type': MovementType.ADJUSTMENT,
+                'ref_document_no': 'VALUATION-OPENING', 'created_at': first_movement,
+                'unit_cost': costs.get(product_id, ZERO)
+            })
+    for start in range(0, len(adjustments), batch_size):
+        apply_movements(conn, adjustments[start:start + batch_size])
+
+    replayed, batch = 0, []
+    for row in conn.execution_options(yield_per=batch_size).execute(
+        select(ledger).order_by(ledger.c.created_at, ledger.c.source, ledger.c.id)
+    ).mappings():
+        batch.append({name: row[name] for name in columns[:-1]})
+        if len(batch) >= batch_size:
+            apply_movements(conn, batch)
+            replayed += len(batch)
+            batch = []
+    apply_movements(conn, batch)
+    replayed += len(batch)
+
+    return {'movements': replayed, 'opening_adjustments': len(adjustments)}
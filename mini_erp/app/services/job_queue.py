@@ -0,0 +1,290 @@
+"""
+Job Queue Service
+Database-backed background job queue: no external broker, the jobs table is
+the queue. Request handlers enqueue jobs and return immediately; worker.py
+processes claim them with an atomic conditional UPDATE, so each job runs
+once even with many workers. While a task runs, a background thread sends a
+heartbeat every JOB_HEARTBEAT_SECONDS so long tasks are not taken for dead
+workers; tasks report progress, and pick up cancellation requests, through
+JobContext.progress.
+"""
+
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Job, TaskRun
+from app.models.job import JobStatus, FINISHED_JOB_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# task name -> callable(context, **params), filled by app.services.job_tasks
+TASKS = {}
+# Tasks any authenticated user may enqueue; all others are admin-only
+USER_TASKS = set()
+_tasks_loaded = False
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled"""
+
+def task(name, user_allowed=False):
+    """Register a function as a job task; user_allowed lets non-admins enqueue it"""
+    def decorator(func):
+        TASKS[name] = func
+        if user_allowed:
+            USER_TASKS.add(name)
+        return func
+    return decorator
+
+def registered_tasks():
+    global _tasks_loaded
+    if not _tasks_loaded:
+        import app.services.job_tasks  # noqa: F401 - registers the tasks
+        _tasks_loaded = True
+    return TASKS
+
+def user_may_enqueue(task_name, role):
+    registered_tasks()
+    return role == 'admin' or task_name in USER_TASKS
+
+def check_params(task_name, params):
+    """Raise ValueError unless params match the task's keyword arguments"""
+    try:
+        inspect.signature(registered_tasks()[task_name]).bind(None, **params)
+    except TypeError as e:
+        raise ValueError(f"Invalid params for task '{task_name}': {e}")
+
+def worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+class JobContext:
+    """Handed to tasks for progress reporting and cancellation checks"""
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+
+    def progress(self, percent, message=None):
+        """Record progress and a heartbeat; raises JobCancelled if cancellation was requested.
+
+        Uses its own connection so the task's session is not committed. If the
+        database is busy the update is skipped rather than failing the task.
+        """
+        jobs = Job.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(jobs).where(jobs.c.id == self.job_id).values(
+                    progress=max(0, min(int(percent), 100)),
+                    progress_message=(message or '')[:200] or None,
+                    heartbeat_at=datetime.utcnow()
+                ))
+                cancel_requested = conn.execute(
+                    select(jobs.c.cancel_requested).where(jobs.c.id == self.job_id)
+                ).scalar()
+        except OperationalError:
+            return
+        if cancel_requested:
+            raise JobCancelled()
+
+class Heartbeat:
+    """Background thread refreshing a running job's heartbeat_at until stopped"""
+    def __init__(self, engine, job_id, interval):
+        self.engine = engine
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job_id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        return False
+
+    def _run(self):
+        jobs = Job.__table__
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(update(jobs).where(
+                        jobs.c.id == self.job_id, jobs.c.status == JobStatus.RUNNING
+                    ).values(heartbeat_at=datetime.utcnow()))
+            except OperationalError:
+                # Database busy; the next beat comes well before the job counts as stale
+                continue
+
+def enqueue(task_name, params=None, priority=0, user_id=None):
+    """Add a job to the queue; the caller commits"""
+    if task_name not in registered_tasks():
+        raise ValueError(f"Unknown task '{task_name}'")
+    check_params(task_name, params or {})
+    job = Job(
+        task=task_name,
+        params_json=json.dumps(params or {}),
+        priority=priority,
+        status=JobStatus.QUEUED,
+        created_by=user_id
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+def cancel(job):
+    """Cancel a queued job now, or ask a running job to stop at its next progress report"""
+    if job.status == JobStatus.QUEUED:
+        job.status = JobStatus.CANCELLED
+        job.finished_at = datetime.utcnow()
+        job.expires_at = job.finished_at + timedelta(seconds=current_app.config['JOB_RESULT_TTL_SECONDS'])
+    elif job.status == JobStatus.RUNNING:
+        job.cancel_requested = True
+    else:
+        return False
+    return True
+
+def claim_next(worker_id):
+    """Atomically move the next queued job to RUNNING; returns its id or None"""
+    for _ in range(5):
+        candidate = db.session.query(Job.id).filter(Job.status == JobStatus.QUEUED).order_by(
+            Job.priority.desc(), Job.id
+        ).limit(1).scalar()
+        if candidate is None:
+            db.session.rollback()
+            return None
+
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(Job).where(Job.id == candidate, Job.status == JobStatus.QUEUED).values(
+                status=JobStatus.RUNNING,
+                worker_id=worker_id,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=Job.attempts + 1
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            _sync_task_runs(candidate, status=JobStatus.RUNNING.value, started_at=now)
+        db.session.commit()
+        if claimed:
+            return candidate
+    return None
+
+def _sync_task_runs(job_id, **values):
+    """Mirror job state onto the scheduler run history, which outlives purged jobs"""
+    db.session.execute(
+        update(TaskRun).where(TaskRun.job_id == job_id).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def _finish(job_id, status, **values):
+    db.session.rollback()
+    finished_at = datetime.utcnow()
+    db.session.execute(update(Job).where(Job.id == job_id).values(
+        status=status,
+        finished_at=finished_at,
+        heartbeat_at=finished_at,
+        expires_at=finished_at + timedelta(seconds=current_app.config['JOB_RESULT_TTL_SECONDS']),
+        **values
+    ).execution_options(synchronize_session=False))
+    started_at = db.session.query(Job.started_at).filter(Job.id == job_id).scalar()
+    _sync_task_runs(
+        job_id,
+        status=status.value,
+        finished_at=finished_at,
+        duration_seconds=(finished_at - started_at).total_seconds() if started_at else None,
+        error=(values.get('error') or '')[-1000:] or None
+    )
+    db.session.commit()
+
+def run_job(job_id):
+    """Run a claimed job and store its result, error or cancellation"""
+    job = db.session.get(Job, job_id)
+    func = registered_tasks().get(job.task)
+    params = json.loads(job.params_json or '{}')
+    db.session.commit()
+
+    if func is None:
+        _finish(job_id, JobStatus.FAILED, error=f"Unknown task '{job.task}'")
+        return JobStatus.FAILED
+
+    try:
+        with Heartbeat(db.engine, job_id, current_app.config['JOB_HEARTBEAT_SECONDS']):
+            result = func(JobContext(job_id, params), **params)
+    except JobCancelled:
+        _finish(job_id, JobStatus.CANCELLED, progress_message='Cancelled')
+        return JobStatus.CANCELLED
+    except Exception:
+        logger.exception('Job %s (%s) failed', job_id, job.task)
+        _finish(job_id, JobStatus.FAILED, error=traceback.format_exc()[-4000:])
+        return JobStatus.FAILED
+
+    _finish(job_id, JobStatus.SUCCEEDED, progress=100, result_json=current_app.json.dumps(result))
+    return JobStatus.SUCCEEDED
+
+def requeue_stale():
+    """Requeue running jobs whose worker stopped sending heartbeats, or fail them after max attempts"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_STALE_SECONDS'])
+    stale = (Job.status == JobStatus.RUNNING) & (Job.heartbeat_at < cutoff)
+    max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    requeued = db.session.execute(
+        update(Job).where(stale, Job.attempts < max_attempts, Job.cancel_requested.is_(False))
+        .values(status=JobStatus.QUEUED, worker_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    now = datetime.utcnow()
+    db.session.execute(
+        update(Job).where(stale).values(
+            status=JobStatus.FAILED, error='Worker stopped responding', finished_at=now,
+            expires_at=now + timedelta(seconds=current_app.config['JOB_RESULT_TTL_SECONDS'])
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return requeued
+
+def purge_expired():
+    """Delete finished jobs whose result has expired"""
+    deleted = db.session.execute(
+        delete(Job).where(Job.status.in_(FINISHED_JOB_STATUSES), Job.expires_at < datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+def latest_result(task_name, max_age_seconds=None):
+    """Result of the newest successful parameterless run of a task, if recent enough"""
+    max_age_seconds = max_age_seconds or current_app.config['PRECOMPUTED_RESULT_MAX_AGE']
+    result_json = db.session.query(Job.result_json).filter(
+        Job.task == task_name,
+        Job.status == JobStatus.SUCCEEDED,
+        Job.params_json == '{}',
+        Job.finished_at >= datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    ).order_by(Job.finished_at.desc()).limit(1).scalar()
+    return json.loads(result_json) if result_json else None
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'task': job.task,
+        'status': job.status.value,
+        'priority': job.priority,
+        'params': json.loads(job.params_json or '{}'),
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'error': job.error,
+        'attempts': job.attempts,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'expires_at': job.expires_at,
+        'has_result': job.result_json is not None
+    }
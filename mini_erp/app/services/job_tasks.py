@@ -0,0 +1,107 @@
+"""
+Job Tasks
+Heavy operations that can run in background workers. Each task receives a
+JobContext and the job params and returns a JSON-serializable result.
+"""
+
+from app import db
+from app.services.job_queue import task
+
+@task('customer_segmentation', user_allowed=True)
+def customer_segmentation(context):
+    from app.services.ml_service import MLService
+    context.progress(10, 'Loading customer data')
+    return MLService().perform_customer_segmentation()
+
+@task('predict_weekly_orders', user_allowed=True)
+def predict_weekly_orders(context):
+    from app.services.ml_service import MLService
+    context.progress(10, 'Loading order history')
+    return MLService().predict_weekly_orders()
+
+@task('ai_summary', user_allowed=True)
+def ai_summary(context):
+    from app.services.ml_service import MLService
+    context.progress(10, 'Computing AI summary')
+    return MLService().get_ai_dashboard_summary()
+
+@task('export_excel')
+def export_excel(context):
+    from flask import current_app
+    from export_to_excel import export_all_data
+    context.progress(5, 'Exporting data')
+    # Always the configured directory; the target is never taken from job params
+    return export_all_data(current_app.config['EXPORT_DIR'])
+
+@task('rebuild_stock_levels')
+def rebuild_stock_levels(context, record_events=False):
+    from app.services.stock_levels import refresh_stock_levels
+    context.progress(10, 'Recomputing stock levels')
+    changed = refresh_stock_levels(record_events=record_events)
+    db.session.commit()
+    return {'changed': changed}
+
+@task('sync_reservations')
+def sync_reservations(context):
+    from rebuild_reservations import sync_reserved_quantities
+    context.progress(10, 'Syncing reserved quantities from the ledger')
+    changed = sync_reserved_quantities()
+    db.session.commit()
+    return {'changed': changed}
+
+@task('replenishment_suggestions', user_allowed=True)
+def replenishment_suggestions(context, warehouse_id=None, demand_days=30, review_days=14, lead_time_days=7):
+    from app.services.replenishment_service import ReplenishmentService
+    context.progress(10, 'Computing replenishment suggestions')
+    service = ReplenishmentService(demand_days, review_days, lead_time_days)
+    return service.get_suggestions(warehouse_id)
+
+@task('rebuild_search_index')
+def rebuild_search_index(context):
+    from app.services.search_service import ProductSearchService
+    context.progress(10, 'Rebuilding product search index')
+    ProductSearchService().rebuild_index()
+    return {'rebuilt': True}
+
+@task('refresh_read_snapshot')
+def refresh_read_snapshot(context):
+    from app.utils.database import get_read_router
+    context.progress(10, 'Copying the database to the read snapshot')
+    return {'refreshed': get_read_router().refresh_snapshot()}
+
+@task('archive_audit_logs')
+def archive_audit_logs(context, retention_months=None):
+    from flask import current_app
+    from app.services.audit_log import get_audit_storage
+    context.progress(10, 'Archiving old audit partitions')
+    retention_months = retention_months or current_app.config['AUDIT_RETENTION_MONTHS']
+    return get_audit_storage().archive(retention_months)
+
+@task('archive_stock_movements')
+def archive_stock_movements(context, days=None):
+    from flask import current_app
+    from archive_stock_movements import default_cutoff
+    from app.services.movement_archive import archive_movements
+    context.progress(10, 'Archiving old stock movements')
+    summary = archive_movements(default_cutoff(days or current_app.config['MOVEMENT_ARCHIVE_AFTER_DAYS']))
+    db.session.commit()
+    return summary
+
+@task('sync_analytics_store')
+def sync_analytics_store(context):
+    from app.services.analytics_store import get_analytics_store
+    store = get_analytics_store()
+    if not store.available():
+        return {'skipped': 'pyarrow is not installed'}
+    context.progress(10, 'Exporting changed facts to Parquet')
+    return store.sync()
+
+@task('classify_products')
+def classify_products(context, lookback_days=None, period=None):
+    from flask import current_app
+    from app.services.classification_service import ClassificationService
+    context.progress(10, 'Classifying products by consumption value and demand variability')
+    service = ClassificationService.from_config(current_app.config, lookback_days=lookback_days, period=period)
+    summary = service.classify()
+    db.session.commit()
+    return summary
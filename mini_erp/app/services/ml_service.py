@@ -16,7 +16,10 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.utils import PlotlyJSONEncoder
 import json
+from sqlalchemy import func
 from app import create_app, db
+from app.utils.database import read_only
+from app.services.analytics_store import get_analytics_store
 from app.models import SalesOrder, SalesOrderLine, Customer, Product
 
 class MLService:
@@ -25,12 +28,18 @@ class MLService:
         
     def get_order_prediction_data(self):
         """Get historical order data for prediction"""
-        with self.app.app_context():
+        with self.app.app_context(), read_only('ai'):
             # Get sales orders from last 3 months
             end_date = datetime.now()
             start_date = end_date - timedelta(days=90)
             
-            orders = db.session.query(SalesOrder).filter(
+            store = get_analytics_store()
+            if store.available() and store.partitions('sales_order_lines'):
+                return self.order_prediction_frame(store, start_date.date(), end_date.date())
+            
+            orders = db.session.query(
+                SalesOrder.order_date, SalesOrder.customer_id, SalesOrder.total_value
+            ).filter(
                 SalesOrder.order_date >= start_date.date(),
                 SalesOrder.order_date <= end_date.date()
             ).all()
@@ -41,7 +50,7 @@ class MLService:
                 data.append({
                     'date': order.order_date,
                     'order_count': 1,
-                    'total_value': sum(line.qty * line.unit_price for line in order.lines),
+                    'total_value': float(order.total_value or 0),
                     'customer_id': order.customer_id,
                     'day_of_week': order.order_date.weekday(),
                     'month': order.order_date.month
@@ -49,6 +58,24 @@ class MLService:
             
             return pd.DataFrame(data)
     
+    @staticmethod
+    def order_prediction_frame(store, start_date, end_date):
+        """Per-order rows from the analytics store's sales order lines, without touching the database"""
+        lines = store.load_frame(
+            'sales_order_lines', ['sales_order_id', 'order_date', 'customer_id', 'qty', 'unit_price']
+        )
+        lines = lines[(lines['order_date'] >= start_date) & (lines['order_date'] <= end_date)]
+        if lines.empty:
+            return pd.DataFrame()
+        lines = lines.assign(value=lines['qty'] * lines['unit_price'])
+        orders = lines.groupby('sales_order_id').agg(
+            date=('order_date', 'first'), total_value=('value', 'sum'), customer_id=('customer_id', 'first')
+        ).reset_index(drop=True)
+        orders['order_count'] = 1
+        orders['day_of_week'] = pd.to_datetime(orders['date']).dt.dayofweek
+        orders['month'] = pd.to_datetime(orders['date']).dt.month
+        return orders[['date', 'order_count', 'total_value', 'customer_id', 'day_of_week', 'month']]
+    
     def predict_weekly_orders(self):
         """Predict orders for next week"""
         try:
@@ -129,21 +156,23 @@ class MLService:
     
     def get_customer_segmentation_data(self):
         """Get customer data for segmentation"""
-        with self.app.app_context():
-            customers = db.session.query(Customer).all()
+        with self.app.app_context(), read_only('ai'):
+            # One grouped query over the order headers' stored totals
+            customers = db.session.query(
+                Customer.id, Customer.name, Customer.is_active,
+                func.count(SalesOrder.id).label('total_orders'),
+                func.coalesce(func.sum(SalesOrder.total_value), 0).label('total_value'),
+                func.max(SalesOrder.order_date).label('last_order_date')
+            ).outerjoin(SalesOrder, SalesOrder.customer_id == Customer.id).group_by(
+                Customer.id, Customer.name, Customer.is_active
+            ).all()
             
             data = []
             for customer in customers:
-                # Calculate customer metrics
-                total_orders = customer.sales_orders.count()
-                total_value = sum(
-                    sum(line.qty * line.unit_price for line in order.lines)
-                    for order in customer.sales_orders
-                )
-                
-                # Get last order date
-                last_order = customer.sales_orders.order_by(SalesOrder.order_date.desc()).first()
-                days_since_last_order = (datetime.now().date() - last_order.order_date).days if last_order else 999
+                total_orders = customer.total_orders
+                total_value = customer.total_value
+                last_order_date = customer.last_order_date
+                days_since_last_order = (datetime.now().date() - last_order_date).days if last_order_date else 999
                 
                 # Average order value
                 avg_order_value = total_value / total_orders if total_orders > 0 else 0
@@ -278,7 +307,7 @@ class MLService:
     
     def get_ai_dashboard_summary(self):
         """Get summary data for AI dashboard"""
-        with self.app.app_context():
+        with self.app.app_context(), read_only('ai'):
             # Basic stats
             total_customers = Customer.query.count()
             total_products = Product.query.count()
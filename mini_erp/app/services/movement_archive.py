@@ -0,0 +1,143 @@
+"""
+Stock Movement Archive
+Moves movements older than a cutoff from stock_movements into
+stock_movements_archive and writes per (product, warehouse) opening balances
+at the cutoff, carried forward from the previous archival run. Ledger
+queries then read the small hot table and only touch the archive when their
+date range starts before the latest cutoff.
+"""
+
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+from app import db
+from app.models import StockMovement, StockMovementArchive, OpeningBalance
+from app.models.stock_movement import MovementDirection
+
+movements_table = StockMovement.__table__
+archive_table = StockMovementArchive.__table__
+MOVEMENT_COLUMNS = [column.name for column in movements_table.columns]
+
+def signed_quantity(source):
+    return case((source.c.direction == MovementDirection.IN, source.c.quantity), else_=-source.c.quantity)
+
+def archive_cutoff():
+    """Latest archival cutoff; movements before it are in the archive table"""
+    return db.session.query(func.max(OpeningBalance.as_of)).scalar()
+
+def movement_source(start=None):
+    """Selectable with the stock_movements columns (plus ``archived``) covering ``start`` onwards.
+
+    The archive is only unioned in when ``start`` falls before the latest
+    cutoff; without a start date the hot table alone is returned.
+    """
+    cutoff = archive_cutoff() if start is not None else None
+    if cutoff is None or start >= cutoff:
+        return select(movements_table, literal(False).label('archived')).subquery('movements')
+    return union_all(
+        select(movements_table, literal(False).label('archived')).where(movements_table.c.created_at >= start),
+        select(*[archive_table.c[name] for name in MOVEMENT_COLUMNS], literal(True).label('archived'))
+        .where(archive_table.c.created_at >= start)
+    ).subquery('movements')
+
+def has_movement_history(product_id=None, warehouse_id=None):
+    """True when any live or archived movement exists for the product / warehouse"""
+    for table in (movements_table, archive_table):
+        condition = []
+        if product_id is not None:
+            condition.append(table.c.product_id == product_id)
+        if warehouse_id is not None:
+            condition.append(table.c.warehouse_id == warehouse_id)
+        if db.session.execute(select(table.c.id).where(*condition).limit(1)).first():
+            return True
+    return False
+
+def opening_balances(at):
+    """(as_of, {(product_id, warehouse_id): quantity}) of the latest set at or before ``at``"""
+    as_of = db.session.query(func.max(OpeningBalance.as_of)).filter(OpeningBalance.as_of <= at).scalar()
+    if as_of is None:
+        return None, {}
+    rows = db.session.query(
+        OpeningBalance.product_id, OpeningBalance.warehouse_id, OpeningBalance.quantity
+    ).filter(OpeningBalance.as_of == as_of)
+    return as_of, {(product_id, warehouse_id): quantity for product_id, warehouse_id, quantity in rows}
+
+def stock_as_of(at, product_id=None, warehouse_id=None):
+    """On-hand quantity per (product_id, warehouse_id) at ``at`` from the movement ledger.
+
+    Starts from the latest opening balances at or before ``at`` and adds the
+    movements after them; archived movements are read only when ``at`` is
+    before the latest cutoff.
+    """
+    as_of, quantities = opening_balances(at)
+    if product_id is not None or warehouse_id is not None:
+        quantities = {
+            key: qty for key, qty in quantities.items()
+            if (product_id is None or key[0] == product_id) and (warehouse_id is None or key[1] == warehouse_id)
+        }
+
+    cutoff = archive_cutoff()
+    tables = [movements_table] + ([archive_table] if cutoff is not None and at < cutoff else [])
+    for table in tables:
+        query = select(table.c.product_id, table.c.warehouse_id, func.sum(signed_quantity(table))).where(
+            table.c.created_at <= at
+        ).group_by(table.c.product_id, table.c.warehouse_id)
+        if as_of is not None:
+            query = query.where(table.c.created_at >= as_of)
+        if product_id is not None:
+            query = query.where(table.c.product_id == product_id)
+        if warehouse_id is not None:
+            query = query.where(table.c.warehouse_id == warehouse_id)
+        for movement_product, movement_warehouse, net in db.session.execute(query):
+            key = (movement_product, movement_warehouse)
+            quantities[key] = quantities.get(key, 0) + (net or 0)
+    return quantities
+
+def archive_movements(cutoff, dry_run=False):
+    """Archive movements created before ``cutoff`` and write opening balances at it.
+
+    Opening balances are the previous set plus the net of the archived
+    movements, so they hold the full on-hand history up to the cutoff. The
+    copy, the delete and the new opening set run in the caller's
+    transaction; the caller commits.
+    """
+    previous = archive_cutoff()
+    if previous is not None and cutoff <= previous:
+        return {'cutoff': previous, 'archived': 0, 'opening_balances': 0,
+                'message': f'Movements before {previous} are already archived'}
+
+    quantities = {}
+    if previous is not None:
+        _, quantities = opening_balances(previous)
+    counts = {}
+    net_rows = db.session.execute(
+        select(
+            movements_table.c.product_id, movements_table.c.warehouse_id,
+            func.sum(signed_quantity(movements_table)), func.count()
+        ).where(movements_table.c.created_at < cutoff)
+        .group_by(movements_table.c.product_id, movements_table.c.warehouse_id)
+    )
+    for product_id, warehouse_id, net, count in net_rows:
+        key = (product_id, warehouse_id)
+        quantities[key] = quantities.get(key, 0) + (net or 0)
+        counts[key] = count
+
+    archived = sum(counts.values())
+    summary = {'cutoff': cutoff, 'previous_cutoff': previous, 'archived': archived,
+               'opening_balances': len(quantities)}
+    if dry_run or not archived:
+        if not archived:
+            summary['message'] = 'No movements before the cutoff'
+        return summary
+
+    now = datetime.utcnow()
+    db.session.execute(insert(OpeningBalance), [
+        {'product_id': product_id, 'warehouse_id': warehouse_id, 'as_of': cutoff, 'quantity': quantity,
+         'movement_count': counts.get((product_id, warehouse_id), 0), 'created_at': now, 'updated_at': now}
+        for (product_id, warehouse_id), quantity in sorted(quantities.items())
+    ])
+    db.session.execute(insert(archive_table).from_select(
+        MOVEMENT_COLUMNS, select(*[movements_table.c[name] for name in MOVEMENT_COLUMNS])
+        .where(movements_table.c.created_at < cutoff)
+    ))
+    db.session.execute(delete(movements_table).where(movements_table.c.created_at < cutoff))
+    return summary
@@ -0,0 +1,75 @@
+"""
+Order Totals
+Keeps total_qty, total_value and line_count on sales and purchase order
+headers in step with their lines, so order-level reports read the headers
+without joining the line tables. Lines written through the ORM are picked
+up by a flush hook and their orders recomputed in the same transaction;
+code that inserts or updates line qty / unit_price with bulk statements
+either sets the header totals itself or calls refresh_order_totals.
+"""
+
+from datetime import datetime
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+from app.models import PurchaseOrder, PurchaseOrderLine, SalesOrder, SalesOrderLine
+
+# Line model -> (order model, foreign key column name)
+ORDER_LINES = {
+    SalesOrderLine: (SalesOrder, 'sales_order_id'),
+    PurchaseOrderLine: (PurchaseOrder, 'purchase_order_id'),
+}
+TOTAL_FIELDS = ('qty', 'unit_price')
+
+def line_totals(lines):
+    """total_qty / total_value / line_count of line dicts, for headers written in bulk"""
+    return {
+        'total_qty': sum(line['qty'] for line in lines),
+        'total_value': sum(line['qty'] * line['unit_price'] for line in lines),
+        'line_count': len(lines)
+    }
+
+def totals_values(order_model):
+    """Correlated subqueries recomputing an order table's totals from its lines"""
+    line_model = next(line for line, (order, _) in ORDER_LINES.items() if order is order_model)
+    lines = line_model.__table__
+    orders = order_model.__table__
+    of_order = lines.c[ORDER_LINES[line_model][1]] == orders.c.id
+    return {
+        'total_qty': select(func.coalesce(func.sum(lines.c.qty), 0)).where(of_order).scalar_subquery(),
+        'total_value': select(func.coalesce(func.sum(lines.c.qty * lines.c.unit_price), 0)).where(of_order).scalar_subquery(),
+        'line_count': select(func.count(lines.c.id)).where(of_order).scalar_subquery()
+    }
+
+def refresh_order_totals(conn, order_model, order_ids=None):
+    """Recompute totals of the given orders (every order when ``order_ids`` is None)"""
+    orders = order_model.__table__
+    statement = update(orders).values(**totals_values(order_model), updated_at=datetime.utcnow())
+    if order_ids is not None:
+        if not order_ids:
+            return 0
+        statement = statement.where(orders.c.id.in_(sorted(order_ids)))
+    return conn.execute(statement).rowcount
+
+def _changed_orders(session):
+    """{order model: ids} of orders whose lines were added, deleted or repriced in this flush"""
+    changed = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        target = ORDER_LINES.get(type(obj))
+        if target is None:
+            continue
+        order_model, fk = target
+        ids = changed.setdefault(order_model, set())
+        state = inspect(obj)
+        if obj in session.dirty:
+            if not any(state.attrs[name].history.has_changes() for name in TOTAL_FIELDS + (fk,)):
+                continue
+            # A line moved to another order changes both
+            ids.update(value for value in state.attrs[fk].history.deleted if value is not None)
+        if getattr(obj, fk) is not None:
+            ids.add(getattr(obj, fk))
+    return changed
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_flushed_orders(session, flush_context):
+    for order_model, ids in _changed_orders(session).items():
+        refresh_order_totals(session.connection(), order_model, ids)
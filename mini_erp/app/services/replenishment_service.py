@@ -0,0 +1,212 @@
+"""
+Replenishment Service
+Computes suggested purchase quantities for the whole catalog in one
+vectorized NumPy pass, using balances, open purchase orders, recent demand,
+product thresholds and ReorderRule (MOQ, lead time) per supplier.
+"""
+
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app import db
+from app.models import (
+    Product, InventoryBalance, PurchaseOrder, PurchaseOrderLine,
+    ReorderRule, Supplier
+)
+from app.models.purchase_order import PurchaseOrderStatus
+from app.models.stock_movement import MovementDirection, MovementType
+from app.services.movement_archive import movement_source
+
+OPEN_PURCHASE_STATUSES = (
+    PurchaseOrderStatus.DRAFT, PurchaseOrderStatus.APPROVED, PurchaseOrderStatus.PARTIALLY_RECEIVED
+)
+
+class ReplenishmentService:
+    def __init__(self, demand_days=30, review_days=14, default_lead_time_days=7):
+        self.demand_days = max(demand_days, 1)
+        self.review_days = max(review_days, 0)
+        self.default_lead_time_days = default_lead_time_days
+
+    @staticmethod
+    def _columns(statement, count):
+        """Execute a Core select and return its result transposed into columns"""
+        rows = db.session.execute(statement).all()
+        return list(zip(*rows)) if rows else [()] * count
+
+    @classmethod
+    def _scatter(cls, product_ids, statement):
+        """Place (product_id, value) rows into an array aligned with product_ids"""
+        values = np.zeros(len(product_ids), dtype=np.float64)
+        ids, data = cls._columns(statement, 2)
+        if ids and len(product_ids):
+            ids = np.array(ids, dtype=np.int64)
+            data = np.array([value or 0 for value in data], dtype=np.float64)
+            positions = np.searchsorted(product_ids, ids)
+            found = (positions < len(product_ids)) & (product_ids[np.minimum(positions, len(product_ids) - 1)] == ids)
+            values[positions[found]] = data[found]
+        return values
+
+    def load_arrays(self, warehouse_id=None):
+        """Load every input with one grouped query each and align them by product"""
+        product_ids, sku, name, reorder_point, safety_stock = self._columns(
+            select(Product.id, Product.sku, Product.name, Product.reorder_point, Product.safety_stock)
+            .where(Product.is_active.is_(True)).order_by(Product.id),
+            5
+        )
+        product_ids = np.array(product_ids, dtype=np.int64)
+        arrays = {
+            'product_ids': product_ids,
+            'sku': sku,
+            'name': name,
+            'reorder_point': np.array(reorder_point, dtype=np.float64),
+            'safety_stock': np.array(safety_stock, dtype=np.float64),
+        }
+
+        balances = select(
+            InventoryBalance.product_id, func.sum(InventoryBalance.available_qty)
+        ).group_by(InventoryBalance.product_id)
+        if warehouse_id:
+            balances = balances.where(InventoryBalance.warehouse_id == warehouse_id)
+        arrays['available'] = self._scatter(product_ids, balances)
+
+        open_po = select(
+            PurchaseOrderLine.product_id,
+            func.sum(PurchaseOrderLine.qty - PurchaseOrderLine.received_qty)
+        ).join(PurchaseOrder, PurchaseOrderLine.purchase_order_id == PurchaseOrder.id).where(
+            PurchaseOrder.status.in_(OPEN_PURCHASE_STATUSES)
+        ).group_by(PurchaseOrderLine.product_id)
+        arrays['open_po'] = self._scatter(product_ids, open_po)
+
+        since = datetime.utcnow() - timedelta(days=self.demand_days)
+        movements = movement_source(since)
+        demand = select(
+            movements.c.product_id, func.sum(movements.c.quantity)
+        ).where(
+            movements.c.direction == MovementDirection.OUT,
+            movements.c.movement_type == MovementType.SALES,
+            movements.c.created_at >= since
+        ).group_by(movements.c.product_id)
+        if warehouse_id:
+            demand = demand.where(movements.c.warehouse_id == warehouse_id)
+        arrays['demand'] = self._scatter(product_ids, demand)
+
+        rule_products, supplier_ids, moq, lead_time, supplier_names = self._columns(
+            select(
+                ReorderRule.product_id, ReorderRule.supplier_id, ReorderRule.moq,
+                ReorderRule.lead_time_days, Supplier.name
+            ).join(Supplier, ReorderRule.supplier_id == Supplier.id).where(
+                ReorderRule.is_active.is_(True), Supplier.is_active.is_(True)
+            ),
+            5
+        )
+        arrays['rules'] = {
+            'product_id': np.array(rule_products, dtype=np.int64),
+            'supplier_id': np.array(supplier_ids, dtype=np.int64),
+            'moq': np.array(moq, dtype=np.float64),
+            'lead_time': np.array(lead_time, dtype=np.float64),
+            'supplier_name': supplier_names,
+        }
+
+        return arrays
+
+    def _best_rules(self, product_ids, rules):
+        """Pick the supplier with the shortest lead time (then lowest MOQ) per product"""
+        n = len(product_ids)
+        rule_idx = np.full(n, -1, dtype=np.int64)
+        moq = np.zeros(n, dtype=np.float64)
+        lead_time = np.full(n, self.default_lead_time_days, dtype=np.float64)
+        if len(rules['product_id']) == 0 or n == 0:
+            return rule_idx, moq, lead_time
+
+        order = np.lexsort((rules['moq'], rules['lead_time'], rules['product_id']))
+        first_products, first = np.unique(rules['product_id'][order], return_index=True)
+        best = order[first]
+
+        positions = np.searchsorted(product_ids, first_products)
+        found = (positions < n) & (product_ids[np.minimum(positions, n - 1)] == first_products)
+        rule_idx[positions[found]] = best[found]
+        moq[positions[found]] = rules['moq'][best[found]]
+        lead_time[positions[found]] = rules['lead_time'][best[found]]
+        return rule_idx, moq, lead_time
+
+    def compute(self, arrays):
+        """Vectorized suggestion pass over the whole catalog.
+
+        inventory position = available + open purchase quantity
+        reorder level      = max(reorder_point, safety_stock + demand during lead time)
+        order-up-to level  = reorder level + demand during the review period
+        A product is suggested when its position is at or below the reorder
+        level; the quantity tops it up to the order-up-to level, at least MOQ.
+        """
+        product_ids = arrays['product_ids']
+        rule_idx, moq, lead_time = self._best_rules(product_ids, arrays['rules'])
+
+        daily_demand = arrays['demand'] / self.demand_days
+        position = arrays['available'] + arrays['open_po']
+        reorder_level = np.maximum(
+            arrays['reorder_point'], arrays['safety_stock'] + np.ceil(daily_demand * lead_time)
+        )
+        order_up_to = reorder_level + np.ceil(daily_demand * self.review_days)
+
+        needs_order = position <= reorder_level
+        quantity = np.where(needs_order, np.maximum(order_up_to - position, 0), 0)
+        quantity = np.where(quantity > 0, np.maximum(quantity, moq), 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coverage_days = np.where(daily_demand > 0, position / daily_demand, np.inf)
+
+        return {
+            'rule_idx': rule_idx,
+            'moq': moq,
+            'lead_time': lead_time,
+            'daily_demand': daily_demand,
+            'position': position,
+            'reorder_level': reorder_level,
+            'quantity': quantity,
+            'coverage_days': coverage_days,
+        }
+
+    def get_suggestions(self, warehouse_id=None):
+        """Suggested purchase quantities, most urgent (lowest coverage) first"""
+        arrays = self.load_arrays(warehouse_id)
+        result = self.compute(arrays)
+        rules = arrays['rules']
+
+        selected = np.nonzero(result['quantity'] > 0)[0]
+        selected = selected[np.lexsort((-result['quantity'][selected], result['coverage_days'][selected]))]
+
+        suggestions = []
+        for i in selected:
+            rule = result['rule_idx'][i]
+            coverage = result['coverage_days'][i]
+            suggestions.append({
+                'product_id': int(arrays['product_ids'][i]),
+                'sku': arrays['sku'][i],
+                'name': arrays['name'][i],
+                'available_qty': int(arrays['available'][i]),
+                'open_po_qty': int(arrays['open_po'][i]),
+                'reorder_point': int(arrays['reorder_point'][i]),
+                'safety_stock': int(arrays['safety_stock'][i]),
+                'daily_demand': round(float(result['daily_demand'][i]), 3),
+                'coverage_days': round(float(coverage), 1) if np.isfinite(coverage) else None,
+                'reorder_level': int(result['reorder_level'][i]),
+                'suggested_qty': int(result['quantity'][i]),
+                'supplier': {
+                    'id': int(rules['supplier_id'][rule]),
+                    'name': rules['supplier_name'][rule],
+                    'moq': int(rules['moq'][rule]),
+                    'lead_time_days': int(rules['lead_time'][rule])
+                } if rule >= 0 else None
+            })
+
+        return {
+            'suggestions': suggestions,
+            'product_count': len(arrays['product_ids']),
+            'parameters': {
+                'warehouse_id': warehouse_id,
+                'demand_days': self.demand_days,
+                'review_days': self.review_days,
+                'default_lead_time_days': self.default_lead_time_days
+            },
+            'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        }
@@ -0,0 +1,143 @@
+"""
+Barcode Scan Index
+In-process hash index of barcode/SKU -> product summary and per-warehouse
+availability for handheld scanner lookups. Entries are loaded on demand with
+batched IN queries and invalidated when products or balances are written.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Product, InventoryBalance
+from app.utils.caching import table_version
+
+class BarcodeScanIndex:
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # product_id -> entry
+        self._codes = {}  # barcode / sku -> product_id
+        self._version = None
+        self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._codes.clear()
+
+    def invalidate_products(self, product_ids):
+        """Drop cached entries for the given products"""
+        with self._lock:
+            for product_id in product_ids:
+                entry = self._entries.pop(product_id, None)
+                if entry:
+                    for code in (entry['product']['sku'], entry['product']['barcode']):
+                        if code and self._codes.get(code) == product_id:
+                            del self._codes[code]
+
+    def _check_version(self):
+        """Clear the index when another worker has written products or balances"""
+        interval = current_app.config.get('BARCODE_INDEX_CHECK_SECONDS', 5)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        version = (table_version(Product), table_version(InventoryBalance))
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self.clear()
+            self._version = version
+            self._checked_at = now
+
+    def _load(self, codes):
+        """Load entries for codes that are not cached, with one query per table"""
+        products = db.session.query(
+            Product.id, Product.sku, Product.barcode, Product.name,
+            Product.unit, Product.category, Product.is_active
+        ).filter(or_(Product.barcode.in_(codes), Product.sku.in_(codes))).all()
+        if not products:
+            return
+
+        availability = {product.id: [] for product in products}
+        balances = db.session.query(
+            InventoryBalance.product_id, InventoryBalance.warehouse_id,
+            InventoryBalance.on_hand_qty, InventoryBalance.reserved_qty,
+            InventoryBalance.available_qty
+        ).filter(InventoryBalance.product_id.in_(list(availability))).all()
+        for balance in balances:
+            availability[balance.product_id].append({
+                'warehouse_id': balance.warehouse_id,
+                'on_hand_qty': balance.on_hand_qty,
+                'reserved_qty': balance.reserved_qty,
+                'available_qty': balance.available_qty
+            })
+
+        with self._lock:
+            for product in products:
+                warehouses = availability[product.id]
+                self._entries[product.id] = {
+                    'product': {
+                        'id': product.id,
+                        'sku': product.sku,
+                        'barcode': product.barcode,
+                        'name': product.name,
+                        'unit': product.unit,
+                        'category': product.category,
+                        'is_active': product.is_active
+                    },
+                    'availability': warehouses,
+                    'total_available': sum(w['available_qty'] for w in warehouses)
+                }
+                self._codes[product.sku] = product.id
+                if product.barcode:
+                    self._codes[product.barcode] = product.id
+            while len(self._entries) > self.max_entries:
+                self.invalidate_products([next(iter(self._entries))])
+
+    def lookup_many(self, codes):
+        """Resolve codes to entries; returns {code: entry} for the codes found"""
+        self._check_version()
+        with self._lock:
+            missing = [code for code in codes if code not in self._codes]
+        if missing:
+            self._load(missing)
+
+        results = {}
+        with self._lock:
+            for code in codes:
+                product_id = self._codes.get(code)
+                if product_id is not None and product_id in self._entries:
+                    self._entries.move_to_end(product_id)
+                    results[code] = self._entries[product_id]
+        return results
+
+    def lookup(self, code):
+        return self.lookup_many([code]).get(code)
+
+scan_index = BarcodeScanIndex()
+
+def mark_products_changed(session, product_ids):
+    """Register products written with bulk statements, which bypass the flush hook"""
+    session.info.setdefault('scan_index_products', set()).update(product_ids)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_scan_index_changes(session, flush_context):
+    changed = session.info.setdefault('scan_index_products', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product) and obj.id is not None:
+            changed.add(obj.id)
+        elif isinstance(obj, InventoryBalance) and obj.product_id is not None:
+            changed.add(obj.product_id)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_scan_index_changes(session):
+    changed = session.info.pop('scan_index_products', None)
+    if changed:
+        scan_index.invalidate_products(changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_scan_index_changes(session):
+    session.info.pop('scan_index_products', None)
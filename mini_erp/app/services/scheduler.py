@@ -0,0 +1,174 @@
+"""
+Scheduler Service
+Cron-like periodic precomputation. Every worker process may run the
+scheduler loop, but only the holder of the DB lease enqueues due tasks, so
+each run happens once across all workers. Due tasks are enqueued as jobs for
+the worker pool, and every run is recorded as a TaskRun.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ScheduledTask, TaskRun, SchedulerLease
+from app.models.job import JobStatus
+from app.services.job_queue import enqueue
+from app.utils.cron import CronExpression
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'scheduler'
+ACTIVE_RUN_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+# Created on first start; schedules can then be changed through /api/scheduler
+DEFAULT_SCHEDULES = [
+    {'name': 'nightly-forecast', 'task': 'predict_weekly_orders', 'cron': '0 2 * * *'},
+    {'name': 'nightly-segmentation', 'task': 'customer_segmentation', 'cron': '30 2 * * *'},
+    {'name': 'nightly-ai-summary', 'task': 'ai_summary', 'cron': '45 2 * * *'},
+    {'name': 'stock-level-rebuild', 'task': 'rebuild_stock_levels', 'cron': '0 3 * * *'},
+    {'name': 'reservation-sync', 'task': 'sync_reservations', 'cron': '15 3 * * *'},
+    {'name': 'replenishment-precompute', 'task': 'replenishment_suggestions', 'cron': '0 5 * * *'},
+    {'name': 'search-index-maintenance', 'task': 'rebuild_search_index', 'cron': '0 4 * * 0'},
+    {'name': 'product-classification', 'task': 'classify_products', 'cron': '30 4 * * 0'},
+    {'name': 'audit-archive', 'task': 'archive_audit_logs', 'cron': '30 1 1 * *'},
+    {'name': 'analytics-store-sync', 'task': 'sync_analytics_store', 'cron': '*/15 * * * *'},
+    {'name': 'movement-archive', 'task': 'archive_stock_movements', 'cron': '0 1 1 * *'},
+    {'name': 'read-snapshot-refresh', 'task': 'refresh_read_snapshot', 'cron': '*/5 * * * *',
+     'read_engine_mode': 'sqlite_snapshot'},
+]
+
+def next_run(cron, after=None):
+    # Cron expressions are evaluated in UTC, like every other scheduler timestamp
+    return CronExpression(cron).next_after(after or datetime.utcnow())
+
+def sync_default_schedules():
+    """Create default schedules that do not exist yet; existing ones are left as edited"""
+    existing = {name for name, in db.session.query(ScheduledTask.name)}
+    for schedule in DEFAULT_SCHEDULES:
+        if schedule['name'] not in existing:
+            db.session.add(ScheduledTask(
+                name=schedule['name'],
+                task=schedule['task'],
+                cron=schedule['cron'],
+                params_json=json.dumps(schedule.get('params', {})),
+                # Schedules tied to a read engine mode start active only in that mode
+                is_active=schedule.get('read_engine_mode') in (None, current_app.config['READ_ENGINE_MODE']),
+                next_run_at=next_run(schedule['cron'])
+            ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # another worker created them first
+
+def acquire_lease(holder, seconds=None):
+    """Take or renew the scheduler lease; returns True while this holder owns it"""
+    seconds = seconds or current_app.config['SCHEDULER_LEASE_SECONDS']
+    now = datetime.utcnow()
+    renewed = db.session.execute(
+        update(SchedulerLease).where(
+            SchedulerLease.name == LEASE_NAME,
+            or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now)
+        ).values(holder=holder, expires_at=now + timedelta(seconds=seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if renewed:
+        db.session.commit()
+        return True
+
+    try:
+        db.session.add(SchedulerLease(name=LEASE_NAME, holder=holder, expires_at=now + timedelta(seconds=seconds)))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def release_lease(holder):
+    db.session.execute(
+        update(SchedulerLease).where(SchedulerLease.name == LEASE_NAME, SchedulerLease.holder == holder)
+        .values(expires_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def start_run(scheduled_task, trigger='schedule', scheduled_for=None, user_id=None):
+    """Enqueue a run of a scheduled task unless its previous run is still active"""
+    active = db.session.query(TaskRun.id).filter(
+        TaskRun.scheduled_task_id == scheduled_task.id, TaskRun.status.in_(ACTIVE_RUN_STATUSES)
+    ).first()
+    if active:
+        run = TaskRun(scheduled_task_id=scheduled_task.id, trigger=trigger, scheduled_for=scheduled_for,
+                      status='Skipped', error='Previous run still active')
+    else:
+        job = enqueue(scheduled_task.task, json.loads(scheduled_task.params_json or '{}'), user_id=user_id)
+        run = TaskRun(scheduled_task_id=scheduled_task.id, job_id=job.id, trigger=trigger,
+                      scheduled_for=scheduled_for, status=JobStatus.QUEUED.value)
+    db.session.add(run)
+    scheduled_task.last_run_at = datetime.utcnow()
+    return run
+
+def tick(holder, now=None):
+    """Enqueue every due task if this process holds the lease; returns the runs started"""
+    if not acquire_lease(holder):
+        return []
+    now = now or datetime.utcnow()
+    due = ScheduledTask.query.filter(
+        ScheduledTask.is_active.is_(True), ScheduledTask.next_run_at <= now
+    ).order_by(ScheduledTask.next_run_at).all()
+
+    runs = []
+    for scheduled_task in due:
+        try:
+            runs.append(start_run(scheduled_task, scheduled_for=scheduled_task.next_run_at))
+        except ValueError as e:
+            logger.warning('Scheduled task %s could not be enqueued: %s', scheduled_task.name, e)
+        # Missed runs are not replayed: the next run is computed from now
+        scheduled_task.next_run_at = next_run(scheduled_task.cron, now)
+    db.session.commit()
+    return runs
+
+def run_scheduler(app, stop, holder):
+    """Scheduler loop for a background thread; stops when ``stop`` is set"""
+    with app.app_context():
+        sync_default_schedules()
+        interval = app.config['SCHEDULER_TICK_SECONDS']
+        while not stop.is_set():
+            try:
+                for run in tick(holder):
+                    logger.info('Scheduled task %s: %s', run.scheduled_task.name, run.status)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Scheduler tick failed')
+            finally:
+                db.session.remove()
+            stop.wait(interval)
+        release_lease(holder)
+
+def serialize_scheduled_task(scheduled_task, last_run=None):
+    return {
+        'id': scheduled_task.id,
+        'name': scheduled_task.name,
+        'task': scheduled_task.task,
+        'cron': scheduled_task.cron,
+        'params': json.loads(scheduled_task.params_json or '{}'),
+        'is_active': scheduled_task.is_active,
+        'last_run_at': scheduled_task.last_run_at,
+        'next_run_at': scheduled_task.next_run_at,
+        'last_run': serialize_task_run(last_run) if last_run else None
+    }
+
+def serialize_task_run(run):
+    return {
+        'id': run.id,
+        'job_id': run.job_id,
+        'trigger': run.trigger,
+        'scheduled_for': run.scheduled_for,
+        'status': run.status,
+        'created_at': run.created_at,
+        'started_at': run.started_at,
+        'finished_at': run.finished_at,
+        'duration_seconds': run.duration_seconds,
+        'error': run.error
+    }
@@ -0,0 +1,240 @@
+"""
+Product Search Service
+Indexed product search: SQLite FTS5 or PostgreSQL tsvector depending on the
+database backend, with an exact SKU/barcode fast path and a LIKE fallback.
+"""
+
+import logging
+import re
+from sqlalchemy import Float, Integer, column, func, or_, select, text
+from app import db
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TOKENS = 8
+# Ranking scores every match of the query, so type-ahead waits for a prefix the FTS
+# prefix index covers; shorter input only gets the exact SKU / barcode hit
+SUGGEST_MIN_CHARS = 2
+
+# Engines whose search index has already been checked in this process
+_ready_engines = set()
+
+SQLITE_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        sku, name, barcode, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, sku, name, barcode, category)
+        VALUES (new.id, new.sku, new.name, new.barcode, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, sku, name, barcode, category)
+        VALUES ('delete', old.id, old.sku, old.name, old.barcode, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF sku, name, barcode, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, sku, name, barcode, category)
+        VALUES ('delete', old.id, old.sku, old.name, old.barcode, old.category);
+        INSERT INTO products_fts(rowid, sku, name, barcode, category)
+        VALUES (new.id, new.sku, new.name, new.barcode, new.category);
+    END
+    """,
+]
+
+POSTGRES_DOCUMENT = (
+    "to_tsvector('simple', coalesce(sku, '') || ' ' || coalesce(name, '') || ' ' || "
+    "coalesce(barcode, '') || ' ' || coalesce(category, ''))"
+)
+
+POSTGRES_INDEX_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_products_search_tsv ON products USING gin ({POSTGRES_DOCUMENT})",
+]
+
+class ProductSearchService:
+    def __init__(self, session=None):
+        self.session = session or db.session
+
+    @property
+    def backend(self):
+        return self.session.get_bind().dialect.name
+
+    def ensure_index(self):
+        """Create the search index for the current backend if it is missing.
+
+        Returns True when an index is available, False when searches have to
+        fall back to LIKE filtering.
+        """
+        engine = self.session.get_bind()
+        key = str(engine.url)
+        if key in _ready_engines:
+            return True
+
+        try:
+            if self.backend == 'sqlite':
+                with engine.begin() as conn:
+                    exists = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                    )).first()
+                    for statement in SQLITE_INDEX_DDL:
+                        conn.execute(text(statement))
+                    if not exists:
+                        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            elif self.backend == 'postgresql':
+                with engine.begin() as conn:
+                    for statement in POSTGRES_INDEX_DDL:
+                        conn.execute(text(statement))
+            else:
+                return False
+        except Exception as e:
+            logger.warning('Product search index unavailable, using LIKE search: %s', e)
+            return False
+
+        _ready_engines.add(key)
+        return True
+
+    def rebuild_index(self):
+        """Rebuild the index from the products table"""
+        if self.ensure_index() and self.backend == 'sqlite':
+            with self.session.get_bind().begin() as conn:
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+    def exact_match(self, term, active_only=False, within=None):
+        """Exact SKU / barcode lookup, served by the unique indexes"""
+        query = Product.query.filter(or_(Product.sku == term, Product.barcode == term))
+        if active_only:
+            query = query.filter(Product.is_active.is_(True))
+        if within is not None:
+            query = query.filter(Product.id.in_(within))
+        return query.first()
+
+    def _match_expression(self, tokens):
+        if self.backend == 'sqlite':
+            return ' '.join('"%s"*' % token for token in tokens)
+        return ' & '.join('%s:*' % token for token in tokens)
+
+    def search_ids(self, term, limit, offset=0, count=True, exclude_id=None, within=None):
+        """Return (ranked product ids, total matches) for a search term.
+
+        Every token is matched as a prefix, so partial input works for
+        type-ahead. Ranking scores every match before the page is cut, so the
+        cost grows with the number of matches, not with ``limit``. With
+        ``count`` false the total is not counted (None). ``exclude_id`` leaves
+        one product out (an exact hit shown first); ``within`` is a select of
+        product ids the matches are restricted to before ranking and paging.
+        Returns None when no index is available.
+        """
+        tokens = TOKEN_RE.findall(term)[:MAX_TOKENS]
+        if not tokens:
+            return [], 0
+        if not self.ensure_index():
+            return None
+
+        params = {'match': self._match_expression(tokens)}
+        if self.backend == 'sqlite':
+            condition = "products_fts MATCH :match"
+            if exclude_id is not None:
+                condition += " AND rowid != :exclude_id"
+            matches = f"SELECT rowid AS id, rank FROM products_fts WHERE {condition}"
+            descending = False
+        else:
+            condition = f"{POSTGRES_DOCUMENT} @@ to_tsquery('simple', :match)"
+            if exclude_id is not None:
+                condition += " AND id != :exclude_id"
+            matches = (
+                f"SELECT id, ts_rank({POSTGRES_DOCUMENT}, to_tsquery('simple', :match)) AS rank "
+                f"FROM products WHERE {condition}"
+            )
+            descending = True
+        if exclude_id is not None:
+            params['exclude_id'] = exclude_id
+
+        matches = text(matches).bindparams(**params).columns(
+            column('id', Integer), column('rank', Float)
+        ).subquery('matches')
+        query = select(matches.c.id)
+        if within is not None:
+            query = query.where(matches.c.id.in_(within))
+        rank = matches.c.rank.desc() if descending else matches.c.rank
+
+        ids = self.session.execute(
+            query.order_by(rank, matches.c.id).limit(limit).offset(offset)
+        ).scalars().all()
+        total = self.session.execute(
+            select(func.count()).select_from(query.subquery())
+        ).scalar() if count else None
+
+        return ids, total
+
+    def _load_in_order(self, ids):
+        if not ids:
+            return []
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(ids))}
+        return [products[product_id] for product_id in ids if product_id in products]
+
+    def suggest(self, term, limit=10):
+        """Type-ahead suggestions: exact SKU/barcode hit first, then ranked prefix matches.
+
+        Terms shorter than SUGGEST_MIN_CHARS only look up the exact hit.
+        """
+        exact = self.exact_match(term)
+        exclude_id = exact.id if exact else None
+        ranked_limit = limit - 1 if exact else limit
+        if ranked_limit <= 0 or len(term.strip()) < SUGGEST_MIN_CHARS:
+            return [exact] if exact else []
+
+        result = self.search_ids(term, ranked_limit, count=False, exclude_id=exclude_id)
+        if result is None:
+            products = self._like_query(term, exclude_id).limit(ranked_limit).all()
+        else:
+            products = self._load_in_order(result[0])
+        return ([exact] if exact else []) + products
+
+    def _like_query(self, term, exclude_id=None, within=None):
+        query = Product.query.filter(
+            (Product.name.contains(term)) |
+            (Product.sku.contains(term)) |
+            (Product.barcode.contains(term))
+        )
+        if exclude_id is not None:
+            query = query.filter(Product.id != exclude_id)
+        if within is not None:
+            query = query.filter(Product.id.in_(within))
+        return query.order_by(Product.id)
+
+    def search(self, term, page=1, per_page=10, within=None):
+        """Search products; returns (products in rank order, total matches).
+
+        An exact SKU / barcode hit comes first on page one, followed by the
+        ranked matches without it. ``within`` (a select of product ids)
+        restricts both.
+        """
+        page, per_page = max(page, 1), max(per_page, 1)
+        exact = self.exact_match(term, within=within)
+        exclude_id = exact.id if exact else None
+        # The exact hit takes the first slot, shifting the ranked matches by one
+        shift = 1 if exact else 0
+        offset = max((page - 1) * per_page - shift, 0)
+        limit = per_page - shift if page == 1 else per_page
+
+        result = self.search_ids(term, limit, offset, exclude_id=exclude_id, within=within)
+        if result is None:
+            query = self._like_query(term, exclude_id, within)
+            products = query.offset(offset).limit(limit).all()
+            total = query.count()
+        else:
+            ids, total = result
+            products = self._load_in_order(ids)
+
+        if exact and page == 1:
+            products = [exact] + products
+        return products, total + shift
@@ -0,0 +1,66 @@
+"""
+Stock Level Service
+Set-based maintenance of InventoryBalance.stock_level for changes that do not
+go through InventoryBalance.update_available_qty(): product threshold edits,
+bulk postings and backfills. Only rows whose level actually changes are
+touched, and each crossing is recorded as a StockLevelEvent.
+"""
+
+from sqlalchemy import case, insert, literal, type_coerce, update
+from app import db
+from app.models import InventoryBalance, Product, StockLevelEvent
+from app.models.stock_level_event import StockLevel
+
+def stock_level_expression():
+    """SQL equivalent of InventoryBalance.classify_stock_level"""
+    # Typed as the column's Enum so values bind and load as StockLevel members
+    level_type = InventoryBalance.stock_level.type
+    return type_coerce(case(
+        (InventoryBalance.available_qty < Product.safety_stock, literal(StockLevel.CRITICAL, level_type)),
+        (InventoryBalance.available_qty <= Product.reorder_point, literal(StockLevel.LOW, level_type)),
+        else_=literal(StockLevel.NORMAL, level_type)
+    ), level_type)
+
+def refresh_stock_levels(product_ids=None, record_events=True):
+    """Recompute stock levels for the given products (all when None).
+
+    Returns the number of balances whose level changed. The caller commits.
+    """
+    expression = stock_level_expression()
+    level = expression.label('level')
+    query = db.session.query(
+        InventoryBalance.id, InventoryBalance.product_id, InventoryBalance.warehouse_id,
+        InventoryBalance.available_qty, InventoryBalance.stock_level,
+        Product.reorder_point, Product.safety_stock, level
+    ).join(Product, InventoryBalance.product_id == Product.id).filter(
+        InventoryBalance.stock_level != expression
+    )
+
+    if product_ids is not None:
+        if not product_ids:
+            return 0
+        query = query.filter(InventoryBalance.product_id.in_(list(product_ids)))
+
+    changed = query.all()
+    if not changed:
+        return 0
+
+    db.session.execute(update(InventoryBalance), [
+        {'id': row.id, 'stock_level': row.level} for row in changed
+    ])
+
+    if record_events:
+        db.session.execute(insert(StockLevelEvent), [
+            {
+                'product_id': row.product_id,
+                'warehouse_id': row.warehouse_id,
+                'previous_level': row.stock_level,
+                'new_level': row.level,
+                'available_qty': row.available_qty,
+                'reorder_point': row.reorder_point,
+                'safety_stock': row.safety_stock
+            }
+            for row in changed
+        ])
+
+    return len(changed)
@@ -0,0 +1,104 @@
+"""
+Stock Posting Service
+Posts batches of stock movements with set-based statements: one INSERT for
+the movements, one INSERT for missing balance rows and one executemany
+UPDATE applying per (product, warehouse) deltas in SQL, so concurrent
+postings never overwrite each other's quantities.
+"""
+
+from sqlalchemy import bindparam, case, insert, or_, update
+from app import db
+from app.models import InventoryBalance, StockMovement
+from app.models.stock_movement import MovementDirection
+from app.services.scan_index import mark_products_changed
+from app.services.inventory_valuation import apply_movements
+from app.services.stock_levels import refresh_stock_levels
+
+balances_table = InventoryBalance.__table__
+
+class InsufficientStockError(ValueError):
+    """A guarded posting would have taken a balance below zero available"""
+
+def ensure_balances(keys):
+    """Create zero balances for (product_id, warehouse_id) pairs that have none"""
+    keys = set(keys)
+    if not keys:
+        return
+    existing = set(db.session.query(InventoryBalance.product_id, InventoryBalance.warehouse_id).filter(
+        InventoryBalance.product_id.in_({product_id for product_id, _ in keys}),
+        InventoryBalance.warehouse_id.in_({warehouse_id for _, warehouse_id in keys})
+    ).all())
+    missing = keys - existing
+    if missing:
+        db.session.execute(insert(InventoryBalance), [
+            {'product_id': product_id, 'warehouse_id': warehouse_id,
+             'on_hand_qty': 0, 'reserved_qty': 0, 'available_qty': 0}
+            for product_id, warehouse_id in sorted(missing)
+        ])
+
+def apply_balance_deltas(deltas, guard=False):
+    """Apply {(product_id, warehouse_id): (on_hand_delta, reserved_delta)} in SQL.
+
+    available_qty is recomputed from the updated columns in the same statement,
+    matching InventoryBalance.available_qty_calculated. With ``guard`` set,
+    rows that would lose availability are only updated while enough stock is
+    left, and InsufficientStockError is raised if any row was skipped; the
+    caller should roll back.
+    """
+    deltas = {key: value for key, value in deltas.items() if any(value)}
+    if not deltas:
+        return
+    ensure_balances(deltas)
+
+    on_hand = balances_table.c.on_hand_qty + bindparam('on_hand_delta')
+    reserved = balances_table.c.reserved_qty + bindparam('reserved_delta')
+    statement = update(balances_table).where(
+        balances_table.c.product_id == bindparam('b_product_id'),
+        balances_table.c.warehouse_id == bindparam('b_warehouse_id')
+    ).values(
+        on_hand_qty=on_hand,
+        reserved_qty=reserved,
+        available_qty=case((on_hand - reserved > 0, on_hand - reserved), else_=0)
+    )
+    if guard:
+        statement = statement.where(or_(
+            bindparam('on_hand_delta') - bindparam('reserved_delta') >= 0,
+            on_hand - reserved >= 0
+        ))
+    result = db.session.execute(statement, [
+        {'b_product_id': product_id, 'b_warehouse_id': warehouse_id,
+         'on_hand_delta': on_hand_delta, 'reserved_delta': reserved_delta}
+        for (product_id, warehouse_id), (on_hand_delta, reserved_delta) in deltas.items()
+    ])
+    if guard and result.supports_sane_multi_rowcount() and result.rowcount != len(deltas):
+        raise InsufficientStockError('Stock changed while posting, not enough available quantity')
+
+def post_movements(movements, reserved_deltas=None, guard=False):
+    """Insert movements and apply their balance effects in bulk.
+
+    ``movements`` are dicts of StockMovement columns; IN adds to on-hand and
+    OUT subtracts. ``reserved_deltas`` optionally adjusts reserved quantities
+    in the same UPDATE and ``guard`` is passed to apply_balance_deltas. Cost
+    layers and valuations are updated in the same transaction, and stock
+    levels and the scan index are refreshed for the touched products. The
+    caller commits.
+    """
+    deltas = {}
+    for movement in movements:
+        sign = 1 if movement['direction'] == MovementDirection.IN else -1
+        key = (movement['product_id'], movement['warehouse_id'])
+        on_hand_delta, reserved_delta = deltas.get(key, (0, 0))
+        deltas[key] = (on_hand_delta + sign * movement['quantity'], reserved_delta)
+    for key, reserved_delta in (reserved_deltas or {}).items():
+        on_hand_delta, current = deltas.get(key, (0, 0))
+        deltas[key] = (on_hand_delta, current + reserved_delta)
+
+    if movements:
+        db.session.execute(insert(StockMovement), movements)
+    apply_balance_deltas(deltas, guard)
+    apply_movements(db.session.connection(), movements)
+
+    product_ids = {product_id for product_id, _ in deltas}
+    refresh_stock_levels(product_ids)
+    mark_products_changed(db.session, product_ids)
+    return product_ids
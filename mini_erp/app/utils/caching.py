@@ -0,0 +1,47 @@
+"""
+HTTP caching helpers
+Conditional GET support for reference-data endpoints. Responses carry a strong
+ETag derived from the version of the tables they are built from, so repeat
+loads are answered with 304 after a single aggregate query.
+"""
+
+import hashlib
+from functools import wraps
+from flask import request, make_response, current_app
+from sqlalchemy import func
+from app import db
+
+def table_version(model):
+    """Return a version token for a table: row count, max id and last update"""
+    count, max_id, last_updated = db.session.query(
+        func.count(model.id), func.max(model.id), func.max(model.updated_at)
+    ).one()
+    return f"{model.__tablename__}:{count}:{max_id or 0}:{last_updated.isoformat() if last_updated else ''}"
+
+def compute_etag(*models):
+    """Build a strong ETag for the current request from the given tables' versions"""
+    parts = [request.endpoint or '', request.query_string.decode('utf-8', 'replace')]
+    parts.extend(table_version(model) for model in models)
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def conditional_get(*models):
+    """Decorator adding ETag / If-None-Match handling to a GET endpoint"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = compute_etag(*models)
+            max_age = current_app.config.get('REFERENCE_DATA_MAX_AGE', 0)
+            cache_control = f'private, max-age={max_age}, must-revalidate'
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
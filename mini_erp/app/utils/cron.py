@@ -0,0 +1,80 @@
+"""
+Cron Expressions
+Minimal five-field cron parser (minute hour day-of-month month day-of-week)
+supporting '*', lists, ranges and steps, e.g. '*/15 * * * *' or '0 2 * * 1-5'.
+Day of week is 0-6 with 0 = Sunday (7 is also accepted for Sunday).
+"""
+
+from datetime import timedelta
+
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+def _parse_field(value, low, high):
+    values = set()
+    for part in value.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError(f"Invalid step in '{value}'")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(bound) for bound in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Value out of range in '{value}'")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronExpression:
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError('Cron expression must have 5 fields: minute hour day month weekday')
+        try:
+            fields = [_parse_field(part, low, high) for part, (_, low, high) in zip(parts, FIELDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {day % 7 for day in weekdays}
+        # Like cron: when both day fields are restricted, either may match
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt):
+        """First matching minute strictly after dt"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
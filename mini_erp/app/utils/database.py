@@ -0,0 +1,191 @@
+"""
+Database Engine Setup
+Connection pool sizing from Config, connect-event pragmas for file-backed
+SQLite databases (WAL so readers do not block the writer, a busy timeout
+instead of immediate "database is locked" errors, synchronous=NORMAL, which
+is safe with WAL, and memory-mapped reads) and read/write routing of
+read-only work to a replica or SQLite snapshot.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config, uri=None):
+    """Engine options for a database URI: configured options plus pool sizing.
+
+    In-memory SQLite uses a single static connection, so pool sizing is skipped.
+    """
+    uri = uri or config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not is_memory_sqlite(uri):
+        options.setdefault('pool_size', config.get('DB_POOL_SIZE', 10))
+        options.setdefault('max_overflow', config.get('DB_MAX_OVERFLOW', 10))
+        options.setdefault('pool_timeout', config.get('DB_POOL_TIMEOUT', 30))
+        options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 1800))
+        options.setdefault('pool_pre_ping', True)
+    return options
+
+def configure_sqlite(engine, config, read_only=False):
+    """Register the pragma listener on a SQLite engine; other backends are left alone"""
+    if engine.dialect.name != 'sqlite' or not config.get('SQLITE_TUNING', True):
+        return False
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA mmap_size = {int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA cache_size = {int(config.get('SQLITE_CACHE_SIZE', -64000))}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = 1")
+    in_memory = is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory and not read_only:
+                cursor.execute("PRAGMA journal_mode = WAL")
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return True
+
+class ReadRouter:
+    """Routes read-only work to a separate read engine when it is fresh enough.
+
+    READ_ENGINE_MODE selects the read engine:
+        primary          no routing, everything uses the primary engine
+        replica          READ_DATABASE_URL, e.g. a PostgreSQL streaming replica
+        sqlite_readonly  the primary SQLite file opened read-only (WAL readers never block the writer)
+        sqlite_snapshot  a copy of the primary SQLite file refreshed by refresh_snapshot()
+    """
+    def __init__(self, app, primary_engine):
+        self.config = app.config
+        self.mode = app.config.get('READ_ENGINE_MODE', 'primary')
+        self.primary_engine = primary_engine
+        self.engine = None
+        self._lag = None
+        self._lag_checked_at = 0.0
+
+        if self.mode == 'replica':
+            uri = app.config.get('READ_DATABASE_URL')
+            if not uri:
+                raise ValueError('READ_ENGINE_MODE=replica requires READ_DATABASE_URL')
+            self.engine = create_engine(uri, **engine_options(app.config, uri))
+            configure_sqlite(self.engine, app.config)
+        elif self.mode in ('sqlite_readonly', 'sqlite_snapshot'):
+            if primary_engine.dialect.name != 'sqlite' or is_memory_sqlite(primary_engine.url):
+                raise ValueError(f'READ_ENGINE_MODE={self.mode} requires a file-backed SQLite database')
+            path = primary_engine.url.database
+            if self.mode == 'sqlite_snapshot':
+                path = app.config.get('READ_SNAPSHOT_PATH') or f'{path}.read-snapshot'
+            self.path = path
+            self.engine = create_engine(
+                f'sqlite:///file:{path}?mode=ro&uri=true', **engine_options(app.config, f'sqlite:///{path}')
+            )
+            configure_sqlite(self.engine, app.config, read_only=True)
+        elif self.mode != 'primary':
+            raise ValueError(f"Unknown READ_ENGINE_MODE '{self.mode}'")
+
+    def lag_seconds(self):
+        """How far the read engine is behind the primary, checked at most every READ_LAG_CHECK_SECONDS"""
+        if self.mode == 'sqlite_readonly':
+            return 0.0
+        if self.mode == 'sqlite_snapshot':
+            return time.time() - os.path.getmtime(self.path) if os.path.exists(self.path) else float('inf')
+
+        now = time.monotonic()
+        if self._lag is None or now - self._lag_checked_at > self.config.get('READ_LAG_CHECK_SECONDS', 5):
+            try:
+                with self.engine.connect() as conn:
+                    if self.engine.dialect.name == 'postgresql':
+                        lag = conn.execute(text(
+                            "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                        )).scalar()
+                    else:
+                        conn.execute(text('SELECT 1'))
+                        lag = 0.0
+                self._lag = float(lag)
+            except Exception as e:
+                logger.warning('Read engine unavailable, using primary: %s', e)
+                self._lag = float('inf')
+            self._lag_checked_at = now
+        return self._lag
+
+    def engine_for(self, max_staleness):
+        """The read engine if it is within max_staleness seconds of the primary, else None"""
+        if self.engine is None or max_staleness is None:
+            return None
+        return self.engine if self.lag_seconds() <= max_staleness else None
+
+    def refresh_snapshot(self):
+        """Copy the primary SQLite database onto the read snapshot with the online backup API"""
+        if self.mode != 'sqlite_snapshot':
+            return False
+        temp_path = f'{self.path}.tmp'
+        source = sqlite3.connect(self.primary_engine.url.database)
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target)
+            target.execute('PRAGMA journal_mode = DELETE')  # a single file that read-only connections can open
+        finally:
+            target.close()
+            source.close()
+        os.replace(temp_path, self.path)
+        self.engine.dispose()  # new connections open the new file
+        return True
+
+def get_read_router():
+    return current_app.extensions.get('read_router')
+
+def read_staleness(key):
+    """Tolerated staleness in seconds for a kind of read-only work (READ_STALENESS_SECONDS)"""
+    staleness = current_app.config.get('READ_STALENESS_SECONDS', {})
+    return staleness.get(key, staleness.get('default'))
+
+@contextmanager
+def read_only(key):
+    """Route queries in this block to the read engine when it is fresh enough for ``key``"""
+    previous = g.get('read_staleness')
+    g.read_staleness = read_staleness(key)
+    try:
+        yield
+    finally:
+        g.read_staleness = previous
+
+def route_blueprint_reads(blueprint, key):
+    """Send every request of a read-only blueprint to the read engine"""
+    @blueprint.before_request
+    def use_read_engine():
+        g.read_staleness = read_staleness(key)
+
+class RoutingSession(Session):
+    """Session that sends reads to the read engine inside read_only blocks and routed blueprints.
+
+    Flushes, and sessions holding pending changes, always use the primary.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('read_staleness') is not None \
+                and not self._flushing and not (self.new or self.dirty or self.deleted):
+            router = get_read_router()
+            engine = router.engine_for(g.read_staleness) if router else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
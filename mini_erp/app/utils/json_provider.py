@@ -0,0 +1,84 @@
+"""
+Fast JSON provider
+Serializes API responses with orjson when it is installed and falls back to
+the standard library otherwise. Decimal, date, datetime and Enum values are
+handled natively so routes can return model values without converting them.
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+from enum import Enum
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(o):
+    """Convert values the encoders don't support natively"""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    if hasattr(o, 'item') and callable(o.item):  # NumPy / pandas scalars
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson with a pure-Python fallback"""
+
+    default = staticmethod(_default)
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def _orjson_options(self, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Serialize ``obj`` to UTF-8 encoded JSON bytes"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(**kwargs))
+        return self.dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args = {'indent': 2}
+        else:
+            dump_args = {'separators': (',', ':')}
+        return self._app.response_class(self.dumps_bytes(obj, **dump_args), mimetype=self.mimetype)
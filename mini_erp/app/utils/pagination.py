@@ -0,0 +1,115 @@
+"""
+Pagination helpers
+Shared request parsing and offset / keyset paging for list endpoints.
+"""
+
+import base64
+import json
+from flask import request, jsonify, current_app
+from sqlalchemy import or_, and_
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+def parse_bool_arg(name):
+    """Parse a boolean query parameter; returns None when it is absent or empty"""
+    value = request.args.get(name)
+    if value is None or value.strip() == '':
+        return None
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid boolean value for '{name}'")
+
+def get_per_page(default=None):
+    """Read per_page from the request, capped at MAX_PER_PAGE"""
+    default = default or current_app.config.get('LIST_PER_PAGE', 100)
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, current_app.config.get('MAX_PER_PAGE', 500)))
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+def after_key(columns, values):
+    """Filter for rows strictly after ``values`` in ``columns`` order"""
+    conditions = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        conditions.append(and_(*equal_prefix, column > values[i]))
+    return or_(*conditions)
+
+def select_schema(schema):
+    """Return a schema restricted to the ``fields`` query parameter, if any"""
+    requested = request.args.get('fields')
+    if not requested:
+        return schema
+    only = [name.strip() for name in requested.split(',') if name.strip() in schema.fields]
+    if not only:
+        return schema
+    return schema.__class__(many=True, only=only)
+
+def list_by_name(model, schema, collection_key):
+    """Paged, filtered listing of a named entity (customers, suppliers, warehouses).
+
+    Supports ``is_active`` and ``name`` (prefix) filters, ``fields`` selection
+    and either offset (``page`` / ``per_page``) or keyset (``cursor``) paging
+    over the ``(name, id)`` index. Without paging parameters every matching
+    row is returned, as the dropdowns and list pages expect.
+    """
+    try:
+        is_active = parse_bool_arg('is_active')
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+
+    schema = select_schema(schema)
+    query = model.query
+
+    if is_active is not None:
+        query = query.filter(model.is_active == is_active)
+
+    name_prefix = request.args.get('name', '')
+    if name_prefix:
+        # Range scan instead of LIKE so the name index is used
+        query = query.filter(model.name >= name_prefix, model.name < name_prefix + '\U0010ffff')
+
+    query = query.order_by(model.name, model.id)
+
+    if not {'page', 'per_page', 'cursor'} & set(request.args):
+        return jsonify({collection_key: schema.dump(query.all())})
+
+    per_page = get_per_page()
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        if cursor:
+            try:
+                name, last_id = decode_cursor(cursor)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(after_key([model.name, model.id], [name, last_id]))
+
+        rows = query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        return jsonify({
+            collection_key: schema.dump(rows),
+            'next_cursor': encode_cursor(rows[-1].name, rows[-1].id) if has_more else None,
+            'per_page': per_page
+        })
+
+    page = request.args.get('page', 1, type=int)
+    items = query.paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        collection_key: schema.dump(items.items),
+        'total': items.total,
+        'pages': items.pages,
+        'current_page': page,
+        'per_page': per_page
+    })
@@ -0,0 +1,55 @@
+"""
+Time buckets
+Day / week (Monday start) / month bucketing shared by SQL aggregation and
+Python gap filling. date_bucket() labels rows as YYYY-MM-DD strings, the
+same form bucket_periods() produces with date.isoformat().
+"""
+
+from datetime import timedelta
+from sqlalchemy import func
+from app import db
+
+BUCKETS = ('day', 'week', 'month')
+
+def date_bucket(column, bucket):
+    """SQL expression truncating a timestamp to the start of its day / week (Monday) / month, as YYYY-MM-DD"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(func.date_trunc(bucket, column), 'YYYY-MM-DD')
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    if bucket == 'month':
+        return func.strftime('%Y-%m-01', column)
+    return func.date(column)
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+def bucket_count(start, end, bucket):
+    """Number of buckets covering [start, end], without generating them"""
+    if end < start:
+        return 0
+    if bucket == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    days = (bucket_start(end, bucket) - bucket_start(start, bucket)).days
+    return days // 7 + 1 if bucket == 'week' else days + 1
+
+def bucket_periods(start, end, bucket):
+    """Bucket start dates covering [start, end]"""
+    periods, day = [], bucket_start(start, bucket)
+    for index in range(bucket_count(start, end, bucket)):
+        if index:
+            # Only step to buckets that exist, so ranges ending at date.max do not overflow
+            day = next_bucket(day, bucket)
+        periods.append(day)
+    return periods
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Archive stock movements
+Moves movements older than the cutoff into stock_movements_archive and
+writes opening balances at the cutoff. The cutoff defaults to
+MOVEMENT_ARCHIVE_AFTER_DAYS days ago (midnight UTC).
+
+Usage: python archive_stock_movements.py [--before YYYY-MM-DD | --days N] [--dry-run]
+"""
+
+import sys
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.services.movement_archive import archive_movements
+
+def default_cutoff(days):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if '--before' in sys.argv:
+            cutoff = datetime.fromisoformat(sys.argv[sys.argv.index('--before') + 1])
+        else:
+            days = app.config['MOVEMENT_ARCHIVE_AFTER_DAYS']
+            if '--days' in sys.argv:
+                days = int(sys.argv[sys.argv.index('--days') + 1])
+            cutoff = default_cutoff(days)
+        
+        dry_run = '--dry-run' in sys.argv
+        summary = archive_movements(cutoff, dry_run=dry_run)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        print(f"Cutoff: {summary['cutoff']}")
+        print(f"Movements {'to archive' if dry_run else 'archived'}: {summary['archived']}")
+        print(f"Opening balances: {summary['opening_balances']}")
+        if summary.get('message'):
+            print(summary['message'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Audit log partitions
+setup    PostgreSQL: converts audit_logs into a table partitioned by month on
+         created_at (existing rows are copied into their partitions; the
+         primary key becomes (id, created_at) and the users FK is dropped).
+         SQLite: moves rows written before partitioning into the monthly
+         tables. Both create the current and next month's partitions.
+list     Show partitions and archived months.
+archive  Export partitions older than AUDIT_RETENTION_MONTHS (or
+         --retention-months N) to AUDIT_ARCHIVE_DIR and drop them.
+
+Usage: python audit_partitions.py setup | list | archive [--retention-months N]
+"""
+
+import sys
+from datetime import datetime
+from sqlalchemy import func, select, text
+from app import create_app, db
+from app.services.audit_log import get_audit_storage
+from app.services.audit_storage import audit_table, month_keys, next_month_key, month_key
+
+def convert_postgresql(storage):
+    """Replace a plain audit_logs table with a partitioned one holding the same rows"""
+    with db.engine.begin() as conn:
+        if storage.mode(conn) == 'native':
+            print("audit_logs is already partitioned")
+            return
+        first, last = conn.execute(select(func.min(audit_table.c.created_at), func.max(audit_table.c.created_at))).one()
+        print("Converting audit_logs to a partitioned table...")
+        conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_legacy"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_audit_logs_entity RENAME TO ix_audit_logs_legacy_entity"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_audit_logs_user RENAME TO ix_audit_logs_legacy_user"))
+        conn.execute(text(
+            "CREATE TABLE audit_logs (LIKE audit_logs_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text("ALTER TABLE audit_logs ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id"))
+        conn.execute(text("CREATE INDEX ix_audit_logs_entity ON audit_logs (entity, entity_id, created_at)"))
+        conn.execute(text("CREATE INDEX ix_audit_logs_user ON audit_logs (user_id, created_at)"))
+        storage.reset()
+        for key in month_keys(first, last) if first else []:
+            storage.ensure_partition(conn, key)
+        conn.execute(text("INSERT INTO audit_logs SELECT * FROM audit_logs_legacy"))
+        conn.execute(text("DROP TABLE audit_logs_legacy"))
+
+def setup(storage):
+    db.create_all()
+    if db.engine.dialect.name == 'postgresql':
+        convert_postgresql(storage)
+    else:
+        # create_all does not add indexes to an existing table
+        with db.engine.begin() as conn:
+            for index in audit_table.indexes:
+                index.create(conn, checkfirst=True)
+        moved = storage.migrate_legacy()
+        print(f"Moved {moved} audit rows into monthly partitions")
+
+    storage.reset()
+    current = month_key(datetime.utcnow())
+    with db.engine.begin() as conn:
+        if storage.mode(conn) != 'single':
+            for key in (current, next_month_key(current)):
+                storage.ensure_partition(conn, key)
+    print(f"Audit storage mode: {storage.mode()}, partitions: {', '.join(storage.partitions()) or '-'}")
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    app = create_app()
+    with app.app_context():
+        storage = get_audit_storage()
+        if command == 'setup':
+            setup(storage)
+        elif command == 'archive':
+            retention = app.config['AUDIT_RETENTION_MONTHS']
+            if '--retention-months' in sys.argv:
+                retention = int(sys.argv[sys.argv.index('--retention-months') + 1])
+            result = storage.archive(retention)
+            for month in result['archived']:
+                print(f"Archived {month['month']}: {month['rows']} rows -> {month['file']}")
+            print(f"Partitions before {result['cutoff']} archived: {len(result['archived'])}")
+        elif command == 'list':
+            print(f"Mode: {storage.mode()}")
+            print(f"Partitions: {', '.join(storage.partitions()) or '-'}")
+            print(f"Archived: {', '.join(storage.archives()) or '-'}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Backfill order totals
+Adds total_qty, total_value and line_count to sales_orders and
+purchase_orders in an existing database if needed and recomputes them from
+the order lines, in batches of order ids. Afterwards they are kept up to
+date as lines are written.
+
+Usage: python backfill_order_totals.py [--batch-size N]
+"""
+
+import sys
+from sqlalchemy import func, inspect, text
+from app import create_app, db
+from app.models import PurchaseOrder, SalesOrder
+from app.services.order_totals import refresh_order_totals
+
+TOTAL_COLUMNS = (
+    ('total_qty', 'INTEGER NOT NULL DEFAULT 0'),
+    ('total_value', 'NUMERIC(14, 2) NOT NULL DEFAULT 0'),
+    ('line_count', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+def ensure_schema():
+    """Create new tables and add the total columns to the order headers"""
+    db.create_all()
+    for table in ('sales_orders', 'purchase_orders'):
+        columns = {column['name'] for column in inspect(db.engine).get_columns(table)}
+        with db.engine.begin() as conn:
+            for name, definition in TOTAL_COLUMNS:
+                if name not in columns:
+                    print(f"Adding {table}.{name}...")
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+
+def backfill(order_model, batch_size):
+    last_id = db.session.query(func.max(order_model.id)).scalar() or 0
+    updated = 0
+    for start in range(0, last_id, batch_size):
+        ids = [row[0] for row in db.session.query(order_model.id).filter(
+            order_model.id > start, order_model.id <= start + batch_size
+        )]
+        updated += refresh_order_totals(db.session.connection(), order_model, ids)
+        db.session.commit()
+    return updated
+
+def main():
+    batch_size = 5000
+    if '--batch-size' in sys.argv:
+        batch_size = int(sys.argv[sys.argv.index('--batch-size') + 1])
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        for order_model in (SalesOrder, PurchaseOrder):
+            updated = backfill(order_model, batch_size)
+            print(f"{order_model.__tablename__}: totals recomputed for {updated} orders")
+
+if __name__ == "__main__":
+    main()
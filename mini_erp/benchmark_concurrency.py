@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Concurrent throughput benchmark
+Drives a mixed workload (80% inventory page reads, 20% stock movement posts)
+from many client threads and reports requests/s, p95 latency and errors.
+
+In-process mode compares SQLite with default settings against the tuned
+pragmas (WAL, busy_timeout, synchronous=NORMAL, mmap) on a fresh database:
+
+    python benchmark_concurrency.py [--threads 16] [--seconds 10]
+
+URL mode drives a running server, e.g. the dev server (python app.py) and
+then gunicorn (gunicorn -c gunicorn.conf.py wsgi:app), on the same database:
+
+    python benchmark_concurrency.py --url http://127.0.0.1:5001 --username admin --password ...
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from config import Config
+
+READ_SHARE = 0.8
+
+def seed(app, products=300, warehouses=3):
+    from app import db
+    from app.models import User, Product, Warehouse, InventoryBalance
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', role='admin')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.add_all([Warehouse(name=f'Depo {i}', code=f'B{i}') for i in range(warehouses)])
+        db.session.add_all([
+            Product(sku=f'BENCH-{i:05d}', name=f'Bench product {i}', unit='adet', reorder_point=10, safety_stock=5)
+            for i in range(products)
+        ])
+        db.session.flush()
+        db.session.add_all([
+            InventoryBalance(product_id=p, warehouse_id=w, on_hand_qty=100, reserved_qty=0, available_qty=100)
+            for p in range(1, products + 1) for w in range(1, warehouses + 1)
+        ])
+        db.session.commit()
+
+def request_mix(rng, products, warehouses):
+    if rng.random() < READ_SHARE:
+        return 'GET', f'/api/stock/inventory?page={rng.randint(1, 10)}&per_page=50', None
+    return 'POST', '/api/stock/movements', {
+        'product_id': rng.randint(1, products),
+        'warehouse_id': rng.randint(1, warehouses),
+        'direction': 'IN',
+        'quantity': 1,
+        'movement_type': 'Adjustment',
+        'note': 'benchmark'
+    }
+
+def run_clients(send, threads, seconds, products=300, warehouses=3):
+    """Run send(method, path, body) -> status from many threads; returns stats"""
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            method, path, body = request_mix(rng, products, warehouses)
+            start = time.perf_counter()
+            status = send(method, path, body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status >= 400:
+                    errors.append(status)
+                else:
+                    latencies.append(elapsed)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else None
+    }
+
+def in_process(tuned, threads, seconds):
+    from app import create_app
+
+    directory = tempfile.mkdtemp(prefix='erp-bench-')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        SQLITE_TUNING = tuned
+        DB_POOL_SIZE = threads
+
+    app = create_app(BenchConfig)
+    seed(app)
+    login = app.test_client().post('/api/auth/login', json={'username': 'bench', 'password': 'bench'})
+    headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    local = threading.local()
+
+    def send(method, path, body):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        try:
+            response = local.client.open(path, method=method, json=body, headers=headers)
+            return response.status_code
+        except Exception:
+            return 599  # e.g. "database is locked" raised out of the handler
+
+    return run_clients(send, threads, seconds)
+
+def against_url(url, username, password, threads, seconds):
+    def call(method, path, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(url.rstrip('/') + path, data=data, method=method, headers={
+            'Content-Type': 'application/json', **(headers or {})
+        })
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, response.read()
+
+    _, payload = call('POST', '/api/auth/login', {'username': username, 'password': password})
+    headers = {'Authorization': f"Bearer {json.loads(payload)['access_token']}"}
+
+    def send(method, path, body):
+        try:
+            return call(method, path, body, headers)[0]
+        except urllib.error.HTTPError as e:
+            return e.code
+        except Exception:
+            return 599
+
+    return run_clients(send, threads, seconds)
+
+def report(name, stats):
+    p95 = f"{stats['p95_ms']:8.1f} ms" if stats['p95_ms'] is not None else '       n/a'
+    print(f"{name:<28} {stats['rps']:8.1f} req/s  p95 {p95}  ok {stats['requests']:6d}  errors {stats['errors']:5d}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--url')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    args = parser.parse_args()
+
+    print(f"Threads: {args.threads}, duration: {args.seconds}s, {int(READ_SHARE * 100)}% reads")
+    print("=" * 80)
+    if args.url:
+        report(args.url, against_url(args.url, args.username, args.password, args.threads, args.seconds))
+    else:
+        report('sqlite default', in_process(False, args.threads, args.seconds))
+        report('sqlite tuned (WAL)', in_process(True, args.threads, args.seconds))
+
+if __name__ == "__main__":
+    main()
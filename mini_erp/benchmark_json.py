@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+JSON encoder benchmark
+Compares Flask's default JSON provider with FastJSONProvider on a payload
+shaped like the /api/stock/inventory and movement ledger responses.
+
+Usage: python benchmark_json.py [rows] [repeat]
+"""
+
+import sys
+import time
+from datetime import datetime, date
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.utils import json_provider
+from app.utils.json_provider import FastJSONProvider
+from app.models.stock_movement import MovementDirection, MovementType
+
+def build_payload(rows):
+    """Build rows the way routes produce them today and the way the fast provider accepts them"""
+    native_rows = []
+    converted_rows = []
+    now = datetime.now()
+    for i in range(rows):
+        row = {
+            'id': i,
+            'product': {'id': i % 5000, 'sku': f'SKU-{i % 5000:05d}', 'name': f'Ürün {i % 5000}'},
+            'warehouse': {'id': i % 7, 'name': f'Depo {i % 7}', 'code': f'D{i % 7}'},
+            'on_hand_qty': i % 400,
+            'reserved_qty': i % 13,
+            'available_qty': i % 400 - i % 13,
+            'unit_price': Decimal('12.50') + i % 100,
+            'direction': MovementDirection.IN if i % 2 else MovementDirection.OUT,
+            'movement_type': MovementType.PURCHASE,
+            'order_date': date.today(),
+            'created_at': now,
+        }
+        native_rows.append(row)
+        converted = dict(row)
+        converted['unit_price'] = float(row['unit_price'])
+        converted['direction'] = row['direction'].value
+        converted['movement_type'] = row['movement_type'].value
+        converted['order_date'] = row['order_date'].isoformat()
+        converted['created_at'] = row['created_at'].isoformat()
+        converted_rows.append(converted)
+    return {'inventory_balances': native_rows}, {'inventory_balances': converted_rows}
+
+def time_response(app, payload, repeat):
+    with app.test_request_context():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = app.json.response(payload)
+            best = min(best, time.perf_counter() - start)
+    return best, len(response.get_data())
+
+def run_benchmark(rows=20000, repeat=5):
+    native, converted = build_payload(rows)
+
+    default_app = Flask(__name__)
+    default_app.json = DefaultJSONProvider(default_app)
+
+    fast_app = Flask(__name__)
+    fast_app.json = FastJSONProvider(fast_app)
+
+    results = [
+        ('flask default (pre-converted rows)', *time_response(default_app, converted, repeat)),
+        (f'fast provider [{fast_app.json.backend}]', *time_response(fast_app, native, repeat)),
+    ]
+
+    if json_provider.orjson is not None:
+        orjson_module = json_provider.orjson
+        json_provider.orjson = None
+        try:
+            results.append(('fast provider [json fallback]', *time_response(fast_app, native, repeat)))
+        finally:
+            json_provider.orjson = orjson_module
+
+    print(f"Rows: {rows}, best of {repeat}")
+    print("=" * 60)
+    baseline = results[0][1]
+    for name, seconds, size in results:
+        print(f"{name:<38} {seconds * 1000:8.1f} ms  {size / 1024:8.0f} KB  x{baseline / seconds:.1f}")
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(rows, repeat)
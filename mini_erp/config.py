@@ -13,8 +13,92 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///mini_erp.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool per process (app/utils/database.py); size it to the server's threads per worker
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    
+    # Read/write routing (app/utils/database.py): reports, AI data loads and exports read from
+    # READ_ENGINE_MODE = primary | replica (READ_DATABASE_URL) | sqlite_readonly | sqlite_snapshot
+    READ_ENGINE_MODE = os.environ.get('READ_ENGINE_MODE', 'primary')
+    READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL')
+    READ_SNAPSHOT_PATH = os.environ.get('READ_SNAPSHOT_PATH')
+    READ_LAG_CHECK_SECONDS = int(os.environ.get('READ_LAG_CHECK_SECONDS', 5))
+    # Seconds of staleness each kind of read tolerates before falling back to the primary
+    READ_STALENESS_SECONDS = {
+        'reports': int(os.environ.get('READ_STALENESS_REPORTS', 300)),
+        'ai': int(os.environ.get('READ_STALENESS_AI', 3600)),
+        'exports': int(os.environ.get('READ_STALENESS_EXPORTS', 3600)),
+        'default': 60,
+    }
+    
+    # SQLite connection pragmas (app/utils/database.py); ignored for other databases
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') not in ('0', 'false', 'False')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+    
     # CORS configuration
     CORS_ORIGINS = ['http://localhost:5000', 'http://localhost:5001', 'http://127.0.0.1:5000', 'http://127.0.0.1:5001']
     
     # Pagination
     POSTS_PER_PAGE = 10
+    LIST_PER_PAGE = 100
+    MAX_PER_PAGE = 500
+    
+    # HTTP caching for reference data (seconds clients may reuse a response before revalidating)
+    REFERENCE_DATA_MAX_AGE = int(os.environ.get('REFERENCE_DATA_MAX_AGE', 0))
+    
+    # Barcode scan index: how often workers check for writes made by other workers
+    BARCODE_INDEX_CHECK_SECONDS = int(os.environ.get('BARCODE_INDEX_CHECK_SECONDS', 5))
+    
+    # Audit log (app/services/audit_log.py): changes are queued at commit and bulk-inserted
+    # by a background thread every AUDIT_BATCH_SIZE rows or AUDIT_FLUSH_SECONDS
+    AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', '1') not in ('0', 'false', 'False')
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', 1))
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 100000))
+    # Monthly audit partitions older than this are compressed into AUDIT_ARCHIVE_DIR and dropped
+    AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', 12))
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', 'audit_archive')
+    
+    # Stock movements older than this move to stock_movements_archive (archive_stock_movements.py)
+    MOVEMENT_ARCHIVE_AFTER_DAYS = int(os.environ.get('MOVEMENT_ARCHIVE_AFTER_DAYS', 365))
+    
+    # Inventory valuation (app/services/inventory_valuation.py): both methods are kept up to
+    # date; this one is reported unless ?method= asks for the other (average | fifo)
+    INVENTORY_VALUATION_METHOD = os.environ.get('INVENTORY_VALUATION_METHOD', 'average')
+    
+    # ABC / XYZ classification (app/services/classification_service.py): consumption value
+    # and demand variability over the lookback window, in day / week / month periods
+    CLASSIFICATION_LOOKBACK_DAYS = int(os.environ.get('CLASSIFICATION_LOOKBACK_DAYS', 365))
+    CLASSIFICATION_PERIOD = os.environ.get('CLASSIFICATION_PERIOD', 'month')
+    CLASSIFICATION_A_SHARE = float(os.environ.get('CLASSIFICATION_A_SHARE', 0.8))
+    CLASSIFICATION_B_SHARE = float(os.environ.get('CLASSIFICATION_B_SHARE', 0.95))
+    CLASSIFICATION_X_CV = float(os.environ.get('CLASSIFICATION_X_CV', 0.5))
+    CLASSIFICATION_Y_CV = float(os.environ.get('CLASSIFICATION_Y_CV', 1.0))
+    
+    # Parquet analytics sidecar (app/services/analytics_store.py): fact exports for analytics;
+    # each sync re-scans ANALYTICS_SYNC_WINDOW_SECONDS before the watermark for rows whose
+    # transaction committed after later rows were exported (keep it above the longest transaction)
+    ANALYTICS_STORE_DIR = os.environ.get('ANALYTICS_STORE_DIR', 'analytics_store')
+    ANALYTICS_SYNC_WINDOW_SECONDS = int(os.environ.get('ANALYTICS_SYNC_WINDOW_SECONDS', 3600))
+    
+    # Background jobs (worker.py): seconds to keep results, idle poll interval,
+    # how long a running job may go without a heartbeat before it is requeued and
+    # how often a running job's heartbeat is sent (must stay well below the stale limit)
+    JOB_RESULT_TTL_SECONDS = int(os.environ.get('JOB_RESULT_TTL_SECONDS', 24 * 3600))
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1))
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 600))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+    # Directory the export_excel job writes to
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', 'excel_exports')
+    
+    # Periodic scheduler: runs in worker.py; the DB lease keeps it to one runner at a time
+    SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS', 30))
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', 120))
+    # Serve precomputed AI results when a scheduled job produced one within this window
+    PRECOMPUTED_RESULT_MAX_AGE = int(os.environ.get('PRECOMPUTED_RESULT_MAX_AGE', 24 * 3600))
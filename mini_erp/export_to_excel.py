@@ -8,21 +8,22 @@ import pandas as pd
 from datetime import datetime
 import os
 from app import create_app, db
+from app.utils.database import read_only
 from app.models import (
     Customer, Product, Supplier, Warehouse, User, 
     SalesOrder, SalesOrderLine, PurchaseOrder, PurchaseOrderLine,
-    StockMovement, InventoryBalance, ReorderRule, AuditLog
+    StockMovement, InventoryBalance, ReorderRule
 )
+from app.services.audit_log import get_audit_storage
 
-def export_all_data():
-    """Export all ERP data to Excel files"""
+def export_all_data(export_dir="excel_exports"):
+    """Export all ERP data to Excel files; returns the export summary"""
     
     # Create Flask app context
     app = create_app()
-    with app.app_context():
+    with app.app_context(), read_only('exports'):
         
         # Create export directory
-        export_dir = "excel_exports"
         if not os.path.exists(export_dir):
             os.makedirs(export_dir)
         
@@ -206,13 +207,12 @@ def export_all_data():
         
         # 13. Audit Logs
         print("Exporting audit logs...")
-        audit_logs = AuditLog.query.all()
-        audit_logs_data = []
-        for log in audit_logs:
-            log_dict = log.to_dict()
+        # Audit entries live in monthly partitions; read the newest that fit on a sheet
+        usernames = dict(db.session.query(User.id, User.username))
+        audit_logs_data = get_audit_storage().query(limit=1048575)
+        for log_dict in audit_logs_data:
             # Add user info for better readability
-            log_dict['user_username'] = log.user.username if log.user else None
-            audit_logs_data.append(log_dict)
+            log_dict['user_username'] = usernames.get(log_dict['user_id'])
         
         if audit_logs_data:
             audit_logs_df = pd.DataFrame(audit_logs_data)
@@ -252,6 +252,12 @@ def export_all_data():
                 print(f"{sheet_name.replace('_', ' ').title()}: {len(df)} records")
             else:
                 print(f"{sheet_name.replace('_', ' ').title()}: No data")
+        
+        return {
+            'file': excel_filename,
+            'export_dir': export_dir,
+            'sheets': {sheet_name: len(df) for sheet_name, df in exports.items()}
+        }
 
 if __name__ == "__main__":
     export_all_data()
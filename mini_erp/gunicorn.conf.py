@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is preloaded once in the master (GUNICORN_PRELOAD, default on) and
+forked into WEB_CONCURRENCY worker processes, each serving GUNICORN_THREADS
+threads. Keep DB_POOL_SIZE at or above the thread count.
+
+Deploying new code: a preloaded master keeps the code it imported, so SIGHUP
+only restarts workers on the old code. Restart the service, or send SIGUSR2
+to start a new master on the new code and then SIGTERM the old one once the
+new workers are up. With GUNICORN_PRELOAD=0 each worker imports the app
+itself and SIGHUP gracefully reloads code (new workers start before old ones
+finish their requests), at the cost of a slower start and no memory shared
+between workers. SIGTERM stops after in-flight requests complete.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no', 'off')
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+def post_fork(server, worker):
+    """Start each worker with its own connection pool"""
+    if not server.cfg.preload_app:
+        return  # the worker imports the app after the fork and opens its own pool
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
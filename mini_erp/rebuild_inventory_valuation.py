@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Rebuild inventory valuation
+Replays the stock movement ledger (archive included) into cost layers and
+per (product, warehouse) valuations, then adds opening adjustments at the
+latest purchase price for stock that was loaded without movements. Run it
+once after upgrading, or after editing movements or purchase prices by hand;
+afterwards valuations are kept up to date as movements are posted.
+
+Usage: python rebuild_inventory_valuation.py
+"""
+
+from app import create_app, db
+from app.services.inventory_valuation import rebuild_valuation
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        summary = rebuild_valuation(db.session.connection())
+        db.session.commit()
+        print(f"Movements replayed: {summary['movements']}")
+        print(f"Opening adjustments: {summary['opening_adjustments']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Rebuild stock reservations
+Creates the reservation ledger table if needed, reserves stock for approved
+orders that were approved before reservations existed, and resets every
+balance's reserved_qty / available_qty from the ledger.
+
+Usage: python rebuild_reservations.py [--reserve-open]
+"""
+
+import sys
+from sqlalchemy import func, update
+from app import create_app, db
+from app.models import InventoryBalance, SalesOrder, StockReservation
+from app.services.allocation_service import AllocationService, SHIPPABLE_STATUSES
+from app.services.stock_levels import refresh_stock_levels
+
+def sync_reserved_quantities():
+    """Set reserved_qty to the ledger total of each balance; returns balances changed"""
+    ledger = {
+        (product_id, warehouse_id): qty
+        for product_id, warehouse_id, qty in db.session.query(
+            StockReservation.product_id, StockReservation.warehouse_id, func.sum(StockReservation.qty)
+        ).group_by(StockReservation.product_id, StockReservation.warehouse_id)
+    }
+    changes = []
+    for balance_id, product_id, warehouse_id, on_hand, reserved in db.session.query(
+        InventoryBalance.id, InventoryBalance.product_id, InventoryBalance.warehouse_id,
+        InventoryBalance.on_hand_qty, InventoryBalance.reserved_qty
+    ):
+        expected = max(ledger.get((product_id, warehouse_id), 0), 0)
+        if expected != reserved:
+            changes.append({'id': balance_id, 'reserved_qty': expected, 'available_qty': max(0, on_hand - expected)})
+    if changes:
+        db.session.execute(update(InventoryBalance), changes)
+    return len(changes)
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        changed = sync_reserved_quantities()
+        print(f"Reserved quantities synced from ledger: {changed} balances updated")
+        
+        if '--reserve-open' in sys.argv:
+            order_ids = [order_id for order_id, in db.session.query(SalesOrder.id).filter(
+                SalesOrder.status.in_(SHIPPABLE_STATUSES)
+            )]
+            plans = AllocationService().reserve(order_ids)
+            reserved = sum(len(plan['allocations']) for plan in plans)
+            print(f"Reserved stock for {len(plans)} open orders ({reserved} allocations)")
+        
+        refresh_stock_levels()
+        db.session.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rebuild inventory stock levels
+Adds the stock_level column to an existing database if needed and recomputes
+the low-stock state of every inventory balance.
+
+Usage: python rebuild_stock_levels.py [--record-events]
+"""
+
+import sys
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.services.stock_levels import refresh_stock_levels
+
+def ensure_schema():
+    """Create new tables and add the stock_level column to inventory_balances"""
+    db.create_all()
+    columns = {column['name'] for column in inspect(db.engine).get_columns('inventory_balances')}
+    if 'stock_level' not in columns:
+        print("Adding inventory_balances.stock_level...")
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE inventory_balances ADD COLUMN stock_level VARCHAR(8) NOT NULL DEFAULT 'NORMAL'"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_inventory_balances_stock_level "
+                "ON inventory_balances (stock_level, warehouse_id)"
+            ))
+
+def main():
+    record_events = '--record-events' in sys.argv
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        changed = refresh_stock_levels(record_events=record_events)
+        db.session.commit()
+        print(f"Stock levels rebuilt: {changed} balances updated")
+
+if __name__ == "__main__":
+    main()
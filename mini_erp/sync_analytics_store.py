@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Sync the Parquet analytics store
+Exports fact rows changed since the last sync to ANALYTICS_STORE_DIR.
+
+Usage: python sync_analytics_store.py [fact ...] [--compact] [--status]
+"""
+
+import sys
+from app import create_app, db
+from app.services.analytics_store import FACTS, get_analytics_store
+
+def main():
+    facts = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    unknown = [fact for fact in facts if fact not in FACTS]
+    if unknown:
+        print(f"Unknown facts: {', '.join(unknown)}; choose from {', '.join(FACTS)}")
+        sys.exit(1)
+    
+    app = create_app()
+    with app.app_context():
+        store = get_analytics_store()
+        if '--status' in sys.argv:
+            for fact, state in store.status()['facts'].items():
+                print(f"{fact}: watermark {state.get('updated_at') or '-'}, "
+                      f"{state.get('rows_exported', 0)} rows exported, {state['partitions']} partitions")
+            return
+        
+        db.create_all()
+        for fact, result in store.sync(facts or None).items():
+            print(f"{fact}: {result['rows']} rows in {result['files']} files, {result['compacted']} partitions compacted")
+        if '--compact' in sys.argv:
+            for fact in facts or FACTS:
+                print(f"{fact}: {store.compact(fact, min_files=2)} partitions compacted")
+
+if __name__ == "__main__":
+    main()
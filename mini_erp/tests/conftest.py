@@ -0,0 +1,147 @@
+import os
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app, db
+from app.models import (
+    Customer, InventoryBalance, Product, PurchaseOrder, PurchaseOrderLine,
+    SalesOrder, SalesOrderLine, Supplier, User, Warehouse
+)
+from app.models.purchase_order import PurchaseOrderStatus
+from app.models.sales_order import SalesOrderStatus
+
+@pytest.fixture
+def config_overrides():
+    """Extra config for the app fixture; override in a test module to change it"""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, config_overrides):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        AUDIT_ENABLED = False
+        AUDIT_ARCHIVE_DIR = str(tmp_path / 'audit_archive')
+        ANALYTICS_STORE_DIR = str(tmp_path / 'analytics_store')
+
+    for name, value in config_overrides.items():
+        setattr(TestConfig, name, value)
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', email='admin@example.com', role='admin')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def headers(client):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'secret'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+@pytest.fixture
+def viewer_headers(app, client):
+    """Authorization headers of a non-admin user"""
+    with app.app_context():
+        user = User(username='viewer', email='viewer@example.com', role='viewer')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    response = client.post('/api/auth/login', json={'username': 'viewer', 'password': 'secret'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+@pytest.fixture
+def catalog(app):
+    """Two warehouses, one product without stock, a supplier and a customer"""
+    with app.app_context():
+        warehouses = [Warehouse(name='Main', code='MAIN'), Warehouse(name='Branch', code='BR')]
+        product = Product(sku='P-1', name='Widget', unit='adet', reorder_point=0, safety_stock=0)
+        supplier = Supplier(name='Supplier', tax_no='1')
+        customer = Customer(name='Customer', tax_no='2')
+        db.session.add_all(warehouses + [product, supplier, customer])
+        db.session.commit()
+        return SimpleNamespace(
+            warehouse_id=warehouses[0].id, other_warehouse_id=warehouses[1].id, product_id=product.id,
+            supplier_id=supplier.id, customer_id=customer.id
+        )
+
+@pytest.fixture
+def set_stock(app):
+    """Set a balance's on-hand quantity directly (no movement, no valuation)"""
+    def set_stock(product_id, warehouse_id, quantity):
+        with app.app_context():
+            balance = InventoryBalance.query.filter_by(product_id=product_id, warehouse_id=warehouse_id).first()
+            if balance is None:
+                balance = InventoryBalance(product_id=product_id, warehouse_id=warehouse_id, reserved_qty=0)
+                db.session.add(balance)
+            balance.on_hand_qty = quantity
+            balance.update_available_qty()
+            db.session.commit()
+    return set_stock
+
+@pytest.fixture
+def purchase_order(app, catalog):
+    """Create a draft purchase order from (product_id, qty, unit_price) lines; returns (order id, line ids)"""
+    def purchase_order(*lines):
+        with app.app_context():
+            order = PurchaseOrder(
+                supplier_id=catalog.supplier_id, order_no=f'PO-{PurchaseOrder.query.count() + 1}',
+                order_date=date.today(), status=PurchaseOrderStatus.DRAFT
+            )
+            db.session.add(order)
+            db.session.flush()
+            order_lines = [
+                PurchaseOrderLine(purchase_order_id=order.id, product_id=product_id, qty=qty, unit_price=unit_price)
+                for product_id, qty, unit_price in lines
+            ]
+            db.session.add_all(order_lines)
+            db.session.commit()
+            return order.id, [line.id for line in order_lines]
+    return purchase_order
+
+@pytest.fixture
+def sales_order(app, catalog):
+    """Create a draft sales order from (product_id, qty, unit_price) lines; returns (order id, line ids)"""
+    def sales_order(*lines):
+        with app.app_context():
+            order = SalesOrder(
+                customer_id=catalog.customer_id, order_no=f'SO-{SalesOrder.query.count() + 1}',
+                order_date=date.today(), status=SalesOrderStatus.DRAFT
+            )
+            db.session.add(order)
+            db.session.flush()
+            order_lines = [
+                SalesOrderLine(sales_order_id=order.id, product_id=product_id, qty=qty, unit_price=unit_price)
+                for product_id, qty, unit_price in lines
+            ]
+            db.session.add_all(order_lines)
+            db.session.commit()
+            return order.id, [line.id for line in order_lines]
+    return sales_order
+
+@pytest.fixture
+def receive(client, headers, catalog):
+    """Approve a purchase order and receive (line_id, qty) pairs into the main warehouse"""
+    def receive(order_id, *receipts):
+        client.post(f'/api/orders/purchase/{order_id}/approve', headers=headers)
+        response = client.post(f'/api/orders/purchase/{order_id}/receipts', headers=headers, json={
+            'warehouse_id': catalog.warehouse_id,
+            'lines': [{'line_id': line_id, 'received_qty': qty} for line_id, qty in receipts]
+        })
+        assert response.status_code == 201, response.get_json()
+        return response
+    return receive
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.models import SalesOrder, SalesOrderLine
+from app.models.sales_order import SalesOrderStatus
+from app.services.analytics_store import get_analytics_store
+
+pytest.importorskip('pyarrow')
+
+def sync(app):
+    with app.app_context():
+        return get_analytics_store().sync(['sales_order_lines'])['sales_order_lines']['rows']
+
+def exported_lines(app):
+    with app.app_context():
+        frame = get_analytics_store().load_frame('sales_order_lines', ['id', 'sales_order_id', 'order_status'])
+        return {row.id: (row.sales_order_id, row.order_status) for row in frame.itertuples()}
+
+def test_sync_round_trip_picks_up_late_commits_and_dedupes(app, catalog, sales_order):
+    first, (first_line,) = sales_order((catalog.product_id, 4, 20))
+    second, (second_line,) = sales_order((catalog.product_id, 2, 20))
+    draft = SalesOrderStatus.DRAFT.value
+
+    assert sync(app) == 2
+    assert sync(app) == 0
+    assert exported_lines(app) == {first_line: (first, draft), second_line: (second, draft)}
+
+    # A transaction that flushed before the last sync but committed after it
+    late, (late_line,) = sales_order((catalog.product_id, 1, 20))
+    with app.app_context():
+        stamp = datetime.fromisoformat(get_analytics_store().manifest()['sales_order_lines']['updated_at'])
+        stamp -= timedelta(seconds=60)
+        db.session.execute(update(SalesOrder).where(SalesOrder.id == late).values(updated_at=stamp))
+        db.session.execute(update(SalesOrderLine).where(SalesOrderLine.id == late_line).values(updated_at=stamp))
+        db.session.commit()
+    assert sync(app) == 1
+
+    # Approval touches the header, so the line is exported again and readers keep the newer copy
+    with app.app_context():
+        db.session.get(SalesOrder, first).status = SalesOrderStatus.APPROVED
+        db.session.commit()
+    assert sync(app) == 1
+    assert exported_lines(app) == {
+        first_line: (first, SalesOrderStatus.APPROVED.value), second_line: (second, draft), late_line: (late, draft)
+    }
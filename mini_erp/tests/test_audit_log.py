@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import InventoryBalance, SalesOrder, SalesOrderLine, StockMovement, StockReservation
+from app.services.movement_archive import archive_movements
+
+@pytest.fixture
+def config_overrides():
+    return {'AUDIT_ENABLED': True}
+
+def entries(app, entity, action):
+    with app.app_context():
+        app.extensions['audit_writer'].flush()
+        rows = app.extensions['audit_storage'].query(entity=entity, action=action, limit=1000)
+        return {row['entity_id']: json.loads(row['diff_json']) for row in rows}
+
+def test_bulk_postings_are_audited_with_row_ids(app, catalog, purchase_order, receive):
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 5))
+    receive(order_id, (line_id, 4))
+
+    with app.app_context():
+        movement_id = StockMovement.query.one().id
+        balance_id = InventoryBalance.query.one().id
+    created = entries(app, 'stock_movements', 'CREATE')
+    assert list(created) == [movement_id]
+    assert created[movement_id]['quantity'] == 4 and created[movement_id]['bulk'] is True
+
+    # The balance row is created empty, then moved by the keyed delta UPDATE
+    assert list(entries(app, 'inventory_balances', 'CREATE')) == [balance_id]
+    updated = entries(app, 'inventory_balances', 'UPDATE')
+    assert updated[balance_id]['on_hand_qty'] == [0, 4]
+    assert updated[balance_id]['available_qty'] == [0, 4]
+
+def test_bulk_orders_and_reservations_are_audited_with_row_ids(app, client, headers, catalog, set_stock):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    response = client.post('/api/orders/sales/bulk', headers=headers, json={'orders': [
+        {'customer_id': catalog.customer_id, 'order_no': f'SO-B{i}', 'order_date': '2026-01-05',
+         'lines': [{'product_id': catalog.product_id, 'qty': i + 1, 'unit_price': 3}]}
+        for i in range(3)
+    ]})
+    assert response.status_code == 201, response.get_json()
+    order_id = response.get_json()['results'][0]['id']
+    assert client.post(f'/api/orders/sales/{order_id}/approve', headers=headers).status_code == 200
+
+    with app.app_context():
+        order_ids = {order.id: order.order_no for order in SalesOrder.query}
+        line_ids = {line.id: line.qty for line in SalesOrderLine.query}
+        reservation_ids = [reservation.id for reservation in StockReservation.query]
+    assert {entity_id: diff['order_no'] for entity_id, diff in entries(app, 'sales_orders', 'CREATE').items()} == order_ids
+    assert {entity_id: diff['qty'] for entity_id, diff in entries(app, 'sales_order_lines', 'CREATE').items()} == line_ids
+    assert list(entries(app, 'stock_reservations', 'CREATE')) == reservation_ids
+
+def test_archived_movements_are_audited_as_deleted_rows(app, catalog):
+    with app.app_context():
+        db.session.add_all([
+            StockMovement(product_id=catalog.product_id, warehouse_id=catalog.warehouse_id, direction=direction,
+                          quantity=2, movement_type='ADJUSTMENT', created_at=datetime(2025, 1, day))
+            for direction, day in (('IN', 5), ('OUT', 6))
+        ])
+        db.session.commit()
+        movement_ids = sorted(movement.id for movement in StockMovement.query)
+        archive_movements(datetime(2025, 2, 1))
+        db.session.commit()
+    deleted = entries(app, 'stock_movements', 'DELETE')
+    assert sorted(deleted) == movement_ids
+    assert {diff['direction'] for diff in deleted.values()} == {'IN', 'OUT'}
@@ -0,0 +1,47 @@
+from datetime import date
+
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import SalesOrder
+from app.models.sales_order import SalesOrderStatus
+
+def bulk_order(catalog, order_no):
+    return {'customer_id': catalog.customer_id, 'order_no': order_no, 'order_date': date.today().isoformat(),
+            'lines': [{'product_id': catalog.product_id, 'qty': 2, 'unit_price': '10'}]}
+
+def test_atomic_must_be_a_boolean(app, client, headers, catalog):
+    response = client.post('/api/orders/sales/bulk', headers=headers, json={
+        'orders': [bulk_order(catalog, 'SO-1')], 'atomic': 'false'
+    })
+    assert response.status_code == 400
+    with app.app_context():
+        assert SalesOrder.query.count() == 0
+
+def test_order_no_taken_after_the_duplicate_check_is_a_conflict(app, client, headers, catalog):
+    taken = []
+
+    def take_order_no(conn, cursor, statement, parameters, context, executemany):
+        # Another request commits the same order number between the check and the bulk INSERT
+        if taken or not statement.startswith('INSERT INTO sales_orders'):
+            return
+        taken.append(True)
+        with db.engine.begin() as other:
+            other.execute(insert(SalesOrder).values(
+                customer_id=catalog.customer_id, order_no='SO-2', order_date=date.today(),
+                status=SalesOrderStatus.DRAFT
+            ))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', take_order_no)
+    try:
+        response = client.post('/api/orders/sales/bulk', headers=headers, json={
+            'orders': [bulk_order(catalog, 'SO-1'), bulk_order(catalog, 'SO-2')]
+        })
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', take_order_no)
+
+    assert response.status_code == 409
+    with app.app_context():
+        assert [order.order_no for order in SalesOrder.query] == ['SO-2']
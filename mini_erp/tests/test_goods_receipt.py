@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import event, update
+
+from app import db
+from app.models import InventoryBalance, PurchaseOrder, PurchaseOrderLine
+from app.models.purchase_order import PurchaseOrderStatus
+
+def receipt_state(app, order_id, catalog):
+    with app.app_context():
+        order = db.session.get(PurchaseOrder, order_id)
+        received = [line.received_qty for line in PurchaseOrderLine.query.filter_by(
+            purchase_order_id=order_id
+        ).order_by(PurchaseOrderLine.id)]
+        balance = InventoryBalance.query.filter_by(
+            product_id=catalog.product_id, warehouse_id=catalog.warehouse_id
+        ).first()
+        return order.status, received, balance.on_hand_qty if balance else 0
+
+def test_partial_receipts_until_closed(app, client, headers, catalog, purchase_order):
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 5))
+    url = f'/api/orders/purchase/{order_id}/receive'
+
+    def receive(quantity):
+        return client.post(url, headers=headers, json={
+            'line_id': line_id, 'received_qty': quantity, 'warehouse_id': catalog.warehouse_id
+        })
+
+    assert receive(4).status_code == 400  # draft orders cannot receive goods
+    client.post(f'/api/orders/purchase/{order_id}/approve', headers=headers)
+
+    assert receive(4).status_code == 200
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.PARTIALLY_RECEIVED, [4], 4)
+
+    response = receive(7)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Received quantity exceeds remaining quantity'
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.PARTIALLY_RECEIVED, [4], 4)
+
+    assert receive(6).status_code == 200
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.CLOSED, [10], 10)
+    assert receive(1).status_code == 400
+
+def test_goods_receipt_posts_all_lines_or_none(app, client, headers, catalog, purchase_order):
+    order_id, line_ids = purchase_order((catalog.product_id, 10, 5), (catalog.product_id, 6, 5))
+    client.post(f'/api/orders/purchase/{order_id}/approve', headers=headers)
+    url = f'/api/orders/purchase/{order_id}/receipts'
+
+    response = client.post(url, headers=headers, json={'warehouse_id': catalog.warehouse_id, 'lines': [
+        {'line_id': line_ids[0], 'received_qty': 10}, {'line_id': line_ids[1], 'received_qty': 7}
+    ]})
+    assert response.status_code == 400
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.APPROVED, [0, 0], 0)
+
+    response = client.post(url, headers=headers, json={'grn_no': 'GRN-1', 'warehouse_id': catalog.warehouse_id, 'lines': [
+        {'line_id': line_ids[0], 'received_qty': 10}, {'line_id': line_ids[1], 'received_qty': 2}
+    ]})
+    assert response.status_code == 201
+    assert response.get_json()['total_received_qty'] == 12
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.PARTIALLY_RECEIVED, [10, 2], 12)
+
+    response = client.post(url, headers=headers, json={'warehouse_id': catalog.warehouse_id, 'lines': [
+        {'line_id': line_ids[1], 'received_qty': 4}
+    ]})
+    assert response.status_code == 201
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.CLOSED, [10, 6], 16)
+
+@pytest.mark.parametrize('quantity', [-1, 0, '3', 2.5, True])
+def test_invalid_received_qty_is_rejected_by_both_endpoints(app, client, headers, catalog, purchase_order, quantity):
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 5))
+    client.post(f'/api/orders/purchase/{order_id}/approve', headers=headers)
+
+    single = client.post(f'/api/orders/purchase/{order_id}/receive', headers=headers, json={
+        'line_id': line_id, 'received_qty': quantity, 'warehouse_id': catalog.warehouse_id
+    })
+    grn = client.post(f'/api/orders/purchase/{order_id}/receipts', headers=headers, json={
+        'warehouse_id': catalog.warehouse_id, 'lines': [{'line_id': line_id, 'received_qty': quantity}]
+    })
+    assert single.status_code == 400
+    assert grn.status_code == 400
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.APPROVED, [0], 0)
+
+def test_receipt_committed_after_the_check_cannot_over_receive(app, client, headers, catalog, purchase_order):
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 5))
+    client.post(f'/api/orders/purchase/{order_id}/approve', headers=headers)
+    received = []
+
+    def receive_concurrently(conn, cursor, statement, parameters, context, executemany):
+        # Another receipt of 6 commits between the remaining-quantity check and the line UPDATE
+        if received or not statement.startswith('UPDATE purchase_order_lines'):
+            return
+        received.append(True)
+        with db.engine.begin() as other:
+            other.execute(update(PurchaseOrderLine).where(PurchaseOrderLine.id == line_id).values(received_qty=6))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', receive_concurrently)
+    try:
+        response = client.post(f'/api/orders/purchase/{order_id}/receipts', headers=headers, json={
+            'warehouse_id': catalog.warehouse_id, 'lines': [{'line_id': line_id, 'received_qty': 5}]
+        })
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', receive_concurrently)
+
+    assert response.status_code == 409
+    assert receipt_state(app, order_id, catalog) == (PurchaseOrderStatus.APPROVED, [6], 0)
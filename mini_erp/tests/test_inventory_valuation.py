@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from app.models import CostLayer, InventoryValuation
+
+def valuation(app, catalog):
+    with app.app_context():
+        return InventoryValuation.query.filter_by(
+            product_id=catalog.product_id, warehouse_id=catalog.warehouse_id
+        ).one()
+
+def issue(client, headers, catalog, quantity):
+    return client.post('/api/stock/movements', headers=headers, json={
+        'product_id': catalog.product_id, 'warehouse_id': catalog.warehouse_id,
+        'direction': 'OUT', 'quantity': quantity, 'movement_type': 'Adjustment'
+    })
+
+def test_average_cost_after_receipts(app, catalog, purchase_order, receive):
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 5))
+    receive(order_id, (line_id, 10))
+    position = valuation(app, catalog)
+    assert position.quantity == 10
+    assert position.average_cost == Decimal('5')
+    assert position.average_value == Decimal('50')
+
+    order_id, (line_id,) = purchase_order((catalog.product_id, 10, 8))
+    receive(order_id, (line_id, 10))
+    position = valuation(app, catalog)
+    assert position.quantity == 20
+    assert position.average_cost == Decimal('6.5')
+    assert position.average_value == Decimal('130')
+
+def test_average_cost_blends_receipt_into_remaining_stock(app, client, headers, catalog, purchase_order, receive):
+    order_id, line_ids = purchase_order((catalog.product_id, 10, 5), (catalog.product_id, 10, 8))
+    receive(order_id, *[(line_id, 10) for line_id in line_ids])
+    assert issue(client, headers, catalog, 15).status_code == 201
+
+    # 5 units left at 6.50, then 5 more at 10.00
+    order_id, (line_id,) = purchase_order((catalog.product_id, 5, 10))
+    receive(order_id, (line_id, 5))
+    position = valuation(app, catalog)
+    assert position.quantity == 10
+    assert position.average_value == Decimal('82.5')
+    assert position.average_cost == Decimal('8.25')
+
+def test_fifo_issue_consumes_oldest_layers_first(app, client, headers, catalog, purchase_order, receive):
+    for unit_price in (5, 8, 11):
+        order_id, (line_id,) = purchase_order((catalog.product_id, 10, unit_price))
+        receive(order_id, (line_id, 10))
+    assert valuation(app, catalog).fifo_value == Decimal('240')
+
+    # Empties the 5.00 layer and takes 5 units of the 8.00 layer
+    assert issue(client, headers, catalog, 15).status_code == 201
+    with app.app_context():
+        layers = CostLayer.query.filter_by(product_id=catalog.product_id).order_by(CostLayer.id).all()
+        assert [(layer.unit_cost, layer.remaining_qty) for layer in layers] == [
+            (Decimal('5'), 0), (Decimal('8'), 5), (Decimal('11'), 10)
+        ]
+    position = valuation(app, catalog)
+    assert position.quantity == 15
+    assert position.fifo_value == Decimal('150')
+
+    # Crosses the remaining 8.00 units into the 11.00 layer
+    assert issue(client, headers, catalog, 7).status_code == 201
+    position = valuation(app, catalog)
+    assert position.quantity == 8
+    assert position.fifo_value == Decimal('88')
+
+def test_inventory_value_report_uses_requested_method(app, client, headers, catalog, purchase_order, receive):
+    order_id, line_ids = purchase_order((catalog.product_id, 10, 5), (catalog.product_id, 10, 8))
+    receive(order_id, *[(line_id, 10) for line_id in line_ids])
+    assert issue(client, headers, catalog, 15).status_code == 201
+
+    fifo = client.get(f'/api/reports/inventory-value?method=fifo&product_id={catalog.product_id}', headers=headers)
+    average = client.get(f'/api/reports/inventory-value?method=average&product_id={catalog.product_id}', headers=headers)
+    assert fifo.status_code == 200 and average.status_code == 200
+    assert [group['value'] for group in fifo.get_json()['groups']] == [40.0]
+    assert [group['value'] for group in average.get_json()['groups']] == [32.5]
+    assert client.get('/api/reports/inventory-value?method=lifo', headers=headers).status_code == 400
@@ -0,0 +1,17 @@
+from app.models import Job
+
+def test_job_params_must_match_the_task(app, client, headers):
+    response = client.post('/api/jobs', headers=headers, json={
+        'task': 'export_excel', 'params': {'export_dir': '/tmp/elsewhere'}
+    })
+    assert response.status_code == 400
+    with app.app_context():
+        assert Job.query.count() == 0
+
+def test_non_admins_may_only_enqueue_user_tasks(client, headers, viewer_headers):
+    for task in ('archive_stock_movements', 'archive_audit_logs', 'rebuild_stock_levels', 'export_excel'):
+        response = client.post('/api/jobs', headers=viewer_headers, json={'task': task})
+        assert response.status_code == 403, task
+    assert client.post('/api/jobs', headers=viewer_headers, json={'task': 'ai_summary'}).status_code == 202
+    assert client.post('/api/jobs', headers=headers, json={'task': 'rebuild_stock_levels'}).status_code == 202
+    assert client.post('/api/jobs', headers=viewer_headers, json={'task': 'no_such_task'}).status_code == 400
@@ -0,0 +1,35 @@
+import pytest
+
+from app import db
+from app.models import Customer
+
+@pytest.fixture
+def config_overrides():
+    return {'LIST_PER_PAGE': 2}
+
+@pytest.fixture
+def customers(app):
+    with app.app_context():
+        db.session.add_all([Customer(name=name, tax_no=str(i)) for i, name in enumerate(['Cedar', 'Alder', 'Birch'])])
+        db.session.commit()
+
+def names(response):
+    assert response.status_code == 200
+    return [row['name'] for row in response.get_json()['customers']]
+
+def test_unpaged_listing_returns_every_row(client, headers, customers):
+    response = client.get('/api/customers/', headers=headers)
+    assert names(response) == ['Alder', 'Birch', 'Cedar']
+    assert 'total' not in response.get_json()
+
+def test_paged_listings(client, headers, customers):
+    response = client.get('/api/customers/?page=2', headers=headers)
+    assert names(response) == ['Cedar']
+    assert response.get_json()['total'] == 3
+
+    response = client.get('/api/customers/?cursor=', headers=headers)
+    assert names(response) == ['Alder', 'Birch']
+    cursor = response.get_json()['next_cursor']
+    response = client.get(f'/api/customers/?cursor={cursor}', headers=headers)
+    assert names(response) == ['Cedar']
+    assert response.get_json()['next_cursor'] is None
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import OpeningBalance, StockMovement, StockMovementArchive
+from app.models.stock_movement import MovementDirection, MovementType
+from app.services.movement_archive import archive_movements, stock_as_of
+
+FIRST_CUTOFF = datetime(2025, 2, 1)
+SECOND_CUTOFF = datetime(2025, 3, 1)
+
+@pytest.fixture
+def ledger(app, catalog):
+    """One product in two warehouses with movements spread over four months"""
+    movements = [
+        (catalog.warehouse_id, MovementDirection.IN, 10, datetime(2025, 1, 10)),
+        (catalog.other_warehouse_id, MovementDirection.IN, 4, datetime(2025, 1, 20)),
+        (catalog.warehouse_id, MovementDirection.OUT, 3, datetime(2025, 2, 10)),
+        (catalog.warehouse_id, MovementDirection.IN, 5, datetime(2025, 3, 10)),
+        (catalog.other_warehouse_id, MovementDirection.OUT, 1, datetime(2025, 3, 15)),
+        (catalog.warehouse_id, MovementDirection.OUT, 4, datetime(2025, 4, 10)),
+    ]
+    with app.app_context():
+        db.session.add_all([
+            StockMovement(
+                product_id=catalog.product_id, warehouse_id=warehouse_id, direction=direction,
+                quantity=quantity, movement_type=MovementType.ADJUSTMENT, created_at=created_at
+            )
+            for warehouse_id, direction, quantity, created_at in movements
+        ])
+        db.session.commit()
+    return catalog
+
+def on_hand(at, catalog):
+    quantities = stock_as_of(at, product_id=catalog.product_id)
+    return (quantities.get((catalog.product_id, catalog.warehouse_id), 0),
+            quantities.get((catalog.product_id, catalog.other_warehouse_id), 0))
+
+CHECKPOINTS = [
+    (datetime(2025, 1, 5), (0, 0)),
+    (datetime(2025, 1, 15), (10, 0)),
+    (datetime(2025, 1, 31), (10, 4)),
+    (datetime(2025, 2, 15), (7, 4)),
+    (datetime(2025, 3, 12), (12, 4)),
+    (datetime(2025, 3, 20), (12, 3)),
+    (datetime(2025, 4, 30), (8, 3)),
+]
+
+def test_opening_balances_carry_forward_across_archive_runs(app, ledger):
+    with app.app_context():
+        first = archive_movements(FIRST_CUTOFF)
+        db.session.commit()
+        second = archive_movements(SECOND_CUTOFF)
+        db.session.commit()
+
+        assert first['archived'] == 2 and first['previous_cutoff'] is None
+        assert second['archived'] == 1 and second['previous_cutoff'] == FIRST_CUTOFF
+        openings = {
+            (row.as_of, row.warehouse_id): row.quantity
+            for row in OpeningBalance.query.filter_by(product_id=ledger.product_id)
+        }
+        # The second set carries the branch warehouse forward although it had no movement in February
+        assert openings == {
+            (FIRST_CUTOFF, ledger.warehouse_id): 10, (FIRST_CUTOFF, ledger.other_warehouse_id): 4,
+            (SECOND_CUTOFF, ledger.warehouse_id): 7, (SECOND_CUTOFF, ledger.other_warehouse_id): 4,
+        }
+        assert StockMovement.query.count() == 3
+        assert StockMovementArchive.query.count() == 3
+
+@pytest.mark.parametrize('at, expected', CHECKPOINTS)
+def test_stock_as_of_is_unchanged_by_archiving(app, ledger, at, expected):
+    with app.app_context():
+        assert on_hand(at, ledger) == expected
+        archive_movements(FIRST_CUTOFF)
+        db.session.commit()
+        assert on_hand(at, ledger) == expected
+        archive_movements(SECOND_CUTOFF)
+        db.session.commit()
+        assert on_hand(at, ledger) == expected
+
+def test_archiving_an_earlier_cutoff_again_is_a_no_op(app, ledger):
+    with app.app_context():
+        archive_movements(SECOND_CUTOFF)
+        db.session.commit()
+        result = archive_movements(FIRST_CUTOFF)
+        assert result['archived'] == 0
+        assert result['cutoff'] == SECOND_CUTOFF
+        assert OpeningBalance.query.count() == 2
+
+def test_stock_as_of_endpoint_after_archiving(app, client, headers, ledger):
+    with app.app_context():
+        archive_movements(FIRST_CUTOFF)
+        archive_movements(SECOND_CUTOFF)
+        db.session.commit()
+
+    response = client.get(f'/api/stock/as-of?at=2025-02-15&product_id={ledger.product_id}', headers=headers)
+    assert response.status_code == 200
+    assert {(row['warehouse_id'], row['on_hand_qty']) for row in response.get_json()['balances']} == {
+        (ledger.warehouse_id, 7), (ledger.other_warehouse_id, 4)
+    }
+    assert client.get('/api/stock/as-of', headers=headers).status_code == 400
@@ -0,0 +1,46 @@
+from app import db
+from app.models import Product, ProductClassification
+
+def test_suggestions_wait_for_a_two_character_prefix(app, client, headers):
+    with app.app_context():
+        db.session.add_all([
+            Product(sku=f'B-{i}', name=f'Bolt {i}', unit='adet', reorder_point=0, safety_stock=0) for i in range(12)
+        ])
+        db.session.commit()
+
+    def suggest(term):
+        response = client.get(f'/api/products/search?q={term}&limit=3', headers=headers)
+        assert response.status_code == 200
+        return [product['sku'] for product in response.get_json()['products']]
+
+    assert suggest('b') == []
+    assert suggest('bo') == ['B-0', 'B-1', 'B-2']
+    assert suggest('bolt 1') == ['B-1', 'B-10', 'B-11']
+    assert suggest('B-7') == ['B-7']
+
+def test_class_filtered_search_stays_ranked(app, client, headers):
+    with app.app_context():
+        products = [
+            Product(sku=f'B-{i}', name=name, unit='adet', reorder_point=0, safety_stock=0)
+            for i, name in enumerate(['Bolt', 'Hex bolt washer set', 'Bolt nut', 'Bolt cutter'])
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+        db.session.add_all([
+            ProductClassification(product_id=product.id, abc_class=abc, xyz_class='X')
+            for product, abc in zip(products, 'ACAA')
+        ])
+        db.session.commit()
+
+    def search(query):
+        response = client.get(f'/api/products/?{query}', headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        return [product['sku'] for product in body['products']], body['total']
+
+    ranked, _ = search('search=bolt')
+    assert search('search=bolt&abc_class=A') == ([sku for sku in ranked if sku != 'B-1'], 3)
+    assert search('search=bolt&abc_class=A&per_page=2&page=2') == ([sku for sku in ranked if sku != 'B-1'][2:], 3)
+    assert search('search=B-1&abc_class=A') == ([], 0)
+    assert search('search=B-1&abc_class=C') == (['B-1'], 1)
+    assert client.get('/api/products/?search=bolt&abc_class=Q', headers=headers).status_code == 400
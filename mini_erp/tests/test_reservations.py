@@ -0,0 +1,96 @@
+from sqlalchemy import func
+
+from app import db
+from app.models import InventoryBalance, SalesOrder, SalesOrderLine, StockReservation
+from app.models.sales_order import SalesOrderStatus
+
+def balance(app, catalog):
+    with app.app_context():
+        row = InventoryBalance.query.filter_by(product_id=catalog.product_id, warehouse_id=catalog.warehouse_id).one()
+        return row.on_hand_qty, row.reserved_qty, row.available_qty
+
+def order_state(app, order_id):
+    with app.app_context():
+        order = db.session.get(SalesOrder, order_id)
+        shipped = db.session.query(func.sum(SalesOrderLine.shipped_qty)).filter_by(sales_order_id=order_id).scalar()
+        reserved = db.session.query(func.coalesce(func.sum(StockReservation.qty), 0)).filter_by(
+            sales_order_id=order_id
+        ).scalar()
+        return order.status, shipped, reserved
+
+def test_approval_reserves_stock(app, client, headers, catalog, set_stock, sales_order):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    order_id, _ = sales_order((catalog.product_id, 4, 20))
+
+    response = client.post(f'/api/orders/sales/{order_id}/approve', headers=headers)
+    assert response.status_code == 200
+    assert order_state(app, order_id) == (SalesOrderStatus.APPROVED, 0, 4)
+    assert balance(app, catalog) == (10, 4, 6)
+    assert client.post(f'/api/orders/sales/{order_id}/approve', headers=headers).status_code == 400
+
+def test_manual_issue_cannot_take_reserved_stock(app, client, headers, catalog, set_stock, sales_order):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    order_id, _ = sales_order((catalog.product_id, 4, 20))
+    client.post(f'/api/orders/sales/{order_id}/approve', headers=headers)
+
+    def issue(quantity):
+        return client.post('/api/stock/movements', headers=headers, json={
+            'product_id': catalog.product_id, 'warehouse_id': catalog.warehouse_id,
+            'direction': 'OUT', 'quantity': quantity, 'movement_type': 'Adjustment'
+        })
+
+    assert issue(7).status_code == 400
+    assert balance(app, catalog) == (10, 4, 6)
+    assert issue(6).status_code == 201
+    assert balance(app, catalog) == (4, 4, 0)
+
+def test_shipment_consumes_reservation_and_closes_order(app, client, headers, catalog, set_stock, sales_order):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    order_id, _ = sales_order((catalog.product_id, 4, 20))
+    assert client.post(f'/api/orders/sales/{order_id}/ship', headers=headers).status_code == 400  # still draft
+    client.post(f'/api/orders/sales/{order_id}/approve', headers=headers)
+
+    response = client.post(f'/api/orders/sales/{order_id}/ship', headers=headers)
+    assert response.status_code == 200
+    assert order_state(app, order_id) == (SalesOrderStatus.CLOSED, 4, 0)
+    assert balance(app, catalog) == (6, 0, 6)
+    assert client.post(f'/api/orders/sales/{order_id}/ship', headers=headers).status_code == 400
+
+def test_backorder_is_reserved_and_shipped_when_stock_arrives(app, client, headers, catalog, set_stock,
+                                                              sales_order, purchase_order, receive):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    order_id, _ = sales_order((catalog.product_id, 15, 20))
+
+    client.post(f'/api/orders/sales/{order_id}/approve', headers=headers)
+    assert order_state(app, order_id) == (SalesOrderStatus.APPROVED, 0, 10)
+    assert balance(app, catalog) == (10, 10, 0)
+
+    response = client.post(f'/api/orders/sales/{order_id}/ship', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['message'] == 'Goods partially shipped'
+    assert order_state(app, order_id) == (SalesOrderStatus.PARTIALLY_SHIPPED, 10, 0)
+    assert balance(app, catalog) == (0, 0, 0)
+    assert client.post(f'/api/orders/sales/{order_id}/ship', headers=headers).status_code == 409
+
+    po_id, (line_id,) = purchase_order((catalog.product_id, 5, 7))
+    receive(po_id, (line_id, 5))
+    assert client.post(f'/api/orders/sales/{order_id}/reserve', headers=headers).status_code == 200
+    assert order_state(app, order_id) == (SalesOrderStatus.PARTIALLY_SHIPPED, 10, 5)
+    assert balance(app, catalog) == (5, 5, 0)
+
+    assert client.post(f'/api/orders/sales/{order_id}/ship', headers=headers).status_code == 200
+    assert order_state(app, order_id) == (SalesOrderStatus.CLOSED, 15, 0)
+    assert balance(app, catalog) == (0, 0, 0)
+
+def test_wave_rejects_malformed_body(client, headers, catalog, set_stock, sales_order):
+    set_stock(catalog.product_id, catalog.warehouse_id, 10)
+    order_id, _ = sales_order((catalog.product_id, 4, 20))
+    client.post(f'/api/orders/sales/{order_id}/approve', headers=headers)
+
+    for body in ({'order_ids': ['x', order_id]}, {'order_ids': [True]}, {'order_ids': order_id},
+                 {'order_ids': [order_id], 'dry_run': 'false'}):
+        assert client.post('/api/orders/sales/waves', headers=headers, json=body).status_code == 400, body
+
+    response = client.post('/api/orders/sales/waves', headers=headers, json={'order_ids': [order_id], 'dry_run': True})
+    assert response.status_code == 200
+    assert response.get_json()['dry_run'] is True
@@ -0,0 +1,20 @@
+def test_schedule_changes_require_admin(client, headers, viewer_headers):
+    body = {'name': 'nightly-stock', 'task': 'rebuild_stock_levels', 'cron': '0 3 * * *'}
+    assert client.post('/api/scheduler/tasks', headers=viewer_headers, json=body).status_code == 403
+    response = client.post('/api/scheduler/tasks', headers=headers, json=body)
+    assert response.status_code == 201
+    task_id = response.get_json()['scheduled_task']['id']
+
+    assert client.put(f'/api/scheduler/tasks/{task_id}', headers=viewer_headers, json={'cron': '* * * * *'}).status_code == 403
+    assert client.post(f'/api/scheduler/tasks/{task_id}/run', headers=viewer_headers).status_code == 403
+    assert client.get('/api/scheduler/tasks', headers=viewer_headers).status_code == 200
+
+def test_schedule_params_are_validated(client, headers):
+    body = {'name': 'export', 'task': 'export_excel', 'cron': '0 3 * * *', 'params': {'export_dir': '/tmp/x'}}
+    assert client.post('/api/scheduler/tasks', headers=headers, json=body).status_code == 400
+    response = client.post('/api/scheduler/tasks', headers=headers, json=dict(body, params={}))
+    task_id = response.get_json()['scheduled_task']['id']
+
+    assert client.put(f'/api/scheduler/tasks/{task_id}', headers=headers, json={'params': ['x']}).status_code == 400
+    assert client.put(f'/api/scheduler/tasks/{task_id}', headers=headers, json={'params': {'export_dir': '/'}}).status_code == 400
+    assert client.put(f'/api/scheduler/tasks/{task_id}', headers=headers, json={'params': {}}).status_code == 200
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Background job worker
+Runs a pool of worker processes that take jobs from the database queue
+(see app/services/job_queue.py). The first process also runs the periodic
+scheduler in a thread; the DB lease keeps it to one runner across hosts.
+Stop with Ctrl+C or SIGTERM; running jobs finish before the processes exit.
+
+Usage: python worker.py [--processes N] [--once] [--no-scheduler]
+"""
+
+import argparse
+import multiprocessing
+import signal
+import threading
+import time
+from app import create_app, db
+from app.services.job_queue import claim_next, run_job, requeue_stale, purge_expired, worker_name
+from app.services.scheduler import run_scheduler
+
+MAINTENANCE_SECONDS = 60
+
+def work_loop(index, stop, once=False, scheduler=False):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles shutdown
+    app = create_app()
+    if scheduler:
+        threading.Thread(
+            target=run_scheduler, args=(app, stop, worker_name(index)), name='scheduler', daemon=True
+        ).start()
+    with app.app_context():
+        name = worker_name(index)
+        poll_seconds = app.config['JOB_POLL_SECONDS']
+        last_maintenance = 0.0
+        print(f"Worker {name} started")
+        
+        while not stop.is_set():
+            if index == 0 and time.monotonic() - last_maintenance > MAINTENANCE_SECONDS:
+                requeued, purged = requeue_stale(), purge_expired()
+                if requeued or purged:
+                    print(f"Requeued {requeued} stale jobs, purged {purged} expired jobs")
+                last_maintenance = time.monotonic()
+            
+            job_id = claim_next(name)
+            if job_id is None:
+                if once:
+                    break
+                stop.wait(poll_seconds)
+                continue
+            
+            status = run_job(job_id)
+            print(f"Job {job_id}: {status.value}")
+            db.session.remove()
+        
+        print(f"Worker {name} stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--processes', type=int, default=max(1, multiprocessing.cpu_count() // 2))
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    parser.add_argument('--no-scheduler', action='store_true', help='do not run the periodic scheduler')
+    args = parser.parse_args()
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    processes = [
+        multiprocessing.Process(
+            target=work_loop, args=(index, stop, args.once, index == 0 and not args.once and not args.no_scheduler)
+        )
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
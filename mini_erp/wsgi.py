@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app, db
+from app.services.search_service import ProductSearchService
+
+app = create_app()
+
+with app.app_context():
+    db.create_all()
+    ProductSearchService().ensure_index()
+    # With preload_app the master imports this module before forking; workers must not share its connections
+    db.engine.dispose()